@@ -0,0 +1,9 @@
+def configurar_sqlite(sender, connection, **kwargs):
+    """Usa el modo WAL de SQLite, en el que las lecturas no esperan a las escrituras ni las bloquean (solo las escrituras se hacen de a una). Con WAL basta sincronizar el disco en cada checkpoint, lo que no arriesga la integridad de la base de datos"""
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
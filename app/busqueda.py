@@ -0,0 +1,300 @@
+import re
+from typing import Callable, Iterable, NamedTuple, Type
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.urls import reverse
+from app.util import normalizar_busqueda, vn
+from app.vistas import nombre_url_editar_auto, nombre_url_lista_auto
+from estudios.modelos.gestion.personas import Estudiante, Profesor
+from estudios.modelos.parametros import Materia, Seccion
+from usuarios.models import Usuario
+
+# tabla virtual FTS5 de SQLite con el texto de los objetos que se pueden buscar desde la barra lateral
+TABLA_BUSQUEDA = "busqueda_global"
+
+CANTIDAD_RESULTADOS = 10
+
+# cantidad máxima de palabras de la búsqueda que se usan
+MAXIMO_PALABRAS = 8
+
+
+class FuenteBusqueda(NamedTuple):
+    """Modelo cuyos objetos se añaden al índice de búsqueda"""
+
+    modelo: Type[models.Model]
+    texto: Callable[[models.Model], str]
+    titulo: Callable[[models.Model], str]
+    subtitulo: Callable[[models.Model], str]
+
+    @property
+    def tipo(self):
+        return self.modelo._meta.label_lower
+
+    def permiso(self, accion: str):
+        return f"{self.modelo._meta.app_label}.{accion}_{self.modelo._meta.model_name}"
+
+
+FUENTES = (
+    FuenteBusqueda(
+        Estudiante,
+        texto=lambda e: f"{e.nombres} {e.apellidos} {e.cedula}",  # type: ignore
+        titulo=str,
+        subtitulo=lambda e: f"C.I. {e.cedula}",  # type: ignore
+    ),
+    FuenteBusqueda(
+        Profesor,
+        texto=lambda p: f"{p.nombres} {p.apellidos} {p.cedula}",  # type: ignore
+        titulo=str,
+        subtitulo=lambda p: f"C.I. {p.cedula}",  # type: ignore
+    ),
+    FuenteBusqueda(
+        Seccion,
+        texto=lambda s: s.nombre,  # type: ignore
+        titulo=lambda s: s.nombre,  # type: ignore
+        subtitulo=lambda s: f"Capacidad: {s.capacidad}",  # type: ignore
+    ),
+    FuenteBusqueda(
+        Materia,
+        texto=lambda m: m.nombre,  # type: ignore
+        titulo=lambda m: m.nombre,  # type: ignore
+        subtitulo=lambda m: "",
+    ),
+    FuenteBusqueda(
+        Usuario,
+        texto=lambda u: f"{u.username} {u.email}",  # type: ignore
+        titulo=lambda u: u.username,  # type: ignore
+        subtitulo=lambda u: u.email,  # type: ignore
+    ),
+)
+
+FUENTES_POR_MODELO = {fuente.modelo: fuente for fuente in FUENTES}
+FUENTES_POR_TIPO = {fuente.tipo: fuente for fuente in FUENTES}
+
+
+class ResultadoBusqueda(NamedTuple):
+    tipo: str
+    etiqueta_tipo: str
+    id: int
+    titulo: str
+    subtitulo: str
+    url: str
+
+
+def indice_disponible() -> bool:
+    return connection.vendor == "sqlite"
+
+
+_indice_verificado = False
+
+
+def asegurar_indice():
+    """Si la tabla del índice no existe (ej: base de datos migrada antes de añadir el índice), se crea y se llena. Solo se verifica una vez por proceso"""
+
+    global _indice_verificado
+
+    if _indice_verificado:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            (TABLA_BUSQUEDA,),
+        )
+        existe = cursor.fetchone() is not None
+
+    _indice_verificado = True
+
+    if not existe:
+        reconstruir_indice()
+
+
+def obtener_rowid(fuente: FuenteBusqueda, pk: int) -> int:
+    """El rowid de cada fila se calcula a partir del pk y el modelo, para poder reemplazarla o eliminarla sin buscarla"""
+    return pk * len(FUENTES) + FUENTES.index(fuente)
+
+
+def crear_tabla_busqueda():
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA} USING fts5(
+                texto,
+                tipo UNINDEXED,
+                objeto_id UNINDEXED,
+                titulo UNINDEXED,
+                subtitulo UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '1 2 3'
+            )
+            """)
+
+
+def indexar(objetos: "Iterable[models.Model]"):
+    """Añade o reemplaza los objetos en el índice. Se debe llamar luego de las operaciones masivas (bulk_create, update...), que no envían señales"""
+
+    if not indice_disponible():
+        return
+
+    filas = []
+
+    for objeto in objetos:
+        fuente = FUENTES_POR_MODELO[type(objeto)]
+        filas.append(
+            (
+                obtener_rowid(fuente, objeto.pk),
+                normalizar_busqueda(fuente.texto(objeto)),
+                fuente.tipo,
+                objeto.pk,
+                fuente.titulo(objeto),
+                fuente.subtitulo(objeto),
+            )
+        )
+
+    if not filas:
+        return
+
+    asegurar_indice()
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {TABLA_BUSQUEDA} (rowid, texto, tipo, objeto_id, titulo, subtitulo) VALUES (%s, %s, %s, %s, %s, %s)",
+            filas,
+        )
+
+
+def desindexar(modelo: Type[models.Model], pks: "Iterable[int]"):
+    if not indice_disponible():
+        return
+
+    fuente = FUENTES_POR_MODELO[modelo]
+
+    asegurar_indice()
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {TABLA_BUSQUEDA} WHERE rowid = %s",
+            [(obtener_rowid(fuente, pk),) for pk in pks],
+        )
+
+
+def reconstruir_indice(tamaño_lote: int = 1000) -> int:
+    """Crea la tabla si no existe y vuelve a llenarla con todos los objetos. Retorna la cantidad de objetos indexados"""
+
+    global _indice_verificado
+
+    if not indice_disponible():
+        return 0
+
+    _indice_verificado = True
+    cantidad = 0
+
+    with transaction.atomic():
+        crear_tabla_busqueda()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA_BUSQUEDA}")
+
+        for fuente in FUENTES:
+            lote = []
+
+            for objeto in fuente.modelo._default_manager.order_by("pk").iterator(
+                chunk_size=tamaño_lote
+            ):
+                lote.append(objeto)
+
+                if len(lote) >= tamaño_lote:
+                    indexar(lote)
+                    cantidad += len(lote)
+                    lote = []
+
+            indexar(lote)
+            cantidad += len(lote)
+
+    return cantidad
+
+
+def crear_consulta_fts(texto: str) -> "str | None":
+    """Convierte el texto introducido en una consulta FTS5 en la que cada palabra es un prefijo, ej: "jose gar" -> "jose"* "gar"*"""
+
+    palabras = re.findall(r"\w+", normalizar_busqueda(texto))[:MAXIMO_PALABRAS]
+
+    if not palabras:
+        return None
+
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def obtener_url(usuario, fuente: FuenteBusqueda, pk: int) -> str:
+    if usuario.has_perm(fuente.permiso("change")):
+        return reverse(nombre_url_editar_auto(fuente.modelo), args=(pk,))
+
+    return reverse(nombre_url_lista_auto(fuente.modelo))
+
+
+def buscar(
+    usuario, texto: str, cantidad: int = CANTIDAD_RESULTADOS
+) -> "list[ResultadoBusqueda]":
+    """Busca en el índice los objetos de los modelos que el usuario puede ver, ordenados por relevancia"""
+
+    consulta = crear_consulta_fts(texto)
+
+    if consulta is None or not indice_disponible():
+        return []
+
+    fuentes = [f for f in FUENTES if usuario.has_perm(f.permiso("view"))]
+
+    if not fuentes:
+        return []
+
+    sql = f"""
+        SELECT tipo, objeto_id, titulo, subtitulo FROM {TABLA_BUSQUEDA}
+        WHERE {TABLA_BUSQUEDA} MATCH %s AND tipo IN ({", ".join(["%s"] * len(fuentes))})
+        ORDER BY rank
+        LIMIT %s
+    """
+    parametros = (consulta, *(f.tipo for f in fuentes), cantidad)
+
+    asegurar_indice()
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        filas = cursor.fetchall()
+
+    return [
+        ResultadoBusqueda(
+            tipo,
+            vn(FUENTES_POR_TIPO[tipo].modelo).capitalize(),
+            objeto_id,
+            titulo,
+            subtitulo,
+            obtener_url(usuario, FUENTES_POR_TIPO[tipo], objeto_id),
+        )
+        for tipo, objeto_id, titulo, subtitulo in filas
+    ]
+
+
+def actualizar_indice(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar((instance,))
+
+
+def eliminar_del_indice(sender, instance, **kwargs):
+    desindexar(sender, (instance.pk,))
+
+
+# las señales se conectan a cada modelo indexado: una señal post_delete sin remitente impide que Django elimine cualquier modelo con una sola consulta
+for modelo_indexado in FUENTES_POR_MODELO:
+    post_save.connect(
+        actualizar_indice,
+        sender=modelo_indexado,
+        dispatch_uid=f"app.busqueda.guardado.{modelo_indexado._meta.label_lower}",
+    )
+    post_delete.connect(
+        eliminar_del_indice,
+        sender=modelo_indexado,
+        dispatch_uid=f"app.busqueda.eliminado.{modelo_indexado._meta.label_lower}",
+    )
+
+
+def crear_indice_busqueda(**kwargs):
+    """Se ejecuta luego de las migraciones, ya que la tabla virtual no es parte de ningún modelo"""
+    reconstruir_indice()
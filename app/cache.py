@@ -0,0 +1,113 @@
+import secrets
+from functools import lru_cache
+from typing import Type
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+# modelos cuyos registros se eliminan en cascada en grandes cantidades. No reciben la señal post_delete, para que Django los elimine con una sola consulta en vez de cargarlos uno por uno, y su generación se incrementa al eliminar el registro del que dependen o manualmente
+_modelos_eliminacion_masiva: "set[Type[models.Model]]" = set()
+
+
+def eliminacion_masiva(modelo: "Type[models.Model]") -> "Type[models.Model]":
+    """Decorador de los modelos que no deben recibir la señal post_delete (ver _modelos_eliminacion_masiva). Sus eliminaciones directas (QuerySet.delete y Model.delete) deben llamar a incrementar_generacion"""
+
+    _modelos_eliminacion_masiva.add(modelo)
+    return modelo
+
+
+def clave_generacion(modelo: "Type[models.Model]") -> str:
+    return f"generacion:{modelo._meta.label_lower}"
+
+
+def nueva_generacion() -> int:
+    """Las generaciones son valores aleatorios en vez de contadores, para que nunca vuelvan a un valor anterior si la caché descarta la clave (y con ella el contador) o si dos procesos la incrementan a la vez"""
+
+    return secrets.randbits(63)
+
+
+def obtener_generacion(modelo: "Type[models.Model]") -> int:
+    """Obtiene la generación actual de los datos de un modelo. Cambia cada vez que se crea, modifica o elimina un registro del modelo, por lo que se usa en las claves de la caché para invalidar los datos guardados"""
+
+    return cache.get_or_set(clave_generacion(modelo), nueva_generacion, None)  # type: ignore - siempre es un entero
+
+
+def obtener_generaciones(*modelos: "Type[models.Model]") -> "tuple[int, ...]":
+    """Obtiene las generaciones de varios modelos con una sola consulta a la caché"""
+
+    claves = [clave_generacion(modelo) for modelo in modelos]
+    generaciones = cache.get_many(claves)
+
+    return tuple(
+        generaciones[clave] if clave in generaciones else obtener_generacion(modelo)
+        for clave, modelo in zip(claves, modelos)
+    )
+
+
+def incrementar_generacion(*modelos: "Type[models.Model]"):
+    """Invalida los datos en caché de los modelos indicados. Las señales lo hacen automáticamente, pero se debe llamar manualmente luego de operaciones que no las envían (bulk_create, bulk_update, update, y las eliminaciones de los modelos con eliminacion_masiva)"""
+
+    cache.set_many(
+        {clave_generacion(modelo): nueva_generacion() for modelo in modelos}, None
+    )
+
+
+@lru_cache(maxsize=None)
+def modelos_en_cascada(
+    modelo: "Type[models.Model]",
+) -> "tuple[Type[models.Model], ...]":
+    """El modelo y los que Django modifica al eliminar sus registros (en cascada o asignando nulos), directa o indirectamente"""
+
+    encontrados = {modelo}
+    pendientes = [modelo]
+
+    while pendientes:
+        for relacion in get_candidate_relations_to_delete(pendientes.pop()._meta):
+            relacionado = relacion.related_model
+
+            if (
+                relacion.on_delete is not models.DO_NOTHING
+                and relacionado not in encontrados
+            ):
+                encontrados.add(relacionado)
+                pendientes.append(relacionado)
+
+    return tuple(encontrados)
+
+
+# post_save no impide las eliminaciones con una sola consulta, por lo que se recibe de todos los modelos
+
+
+@receiver(post_save, dispatch_uid="app.cache.guardado")
+def invalidar_generacion(sender: "Type[models.Model]", **kwargs):
+    incrementar_generacion(sender)
+
+
+def invalidar_generacion_eliminacion(sender: "Type[models.Model]", **kwargs):
+    """Los registros que se eliminan en cascada con el del modelo pueden no recibir la señal (ver eliminacion_masiva)"""
+
+    incrementar_generacion(*modelos_en_cascada(sender))
+
+
+def registrar_invalidacion_eliminaciones(*etiquetas_apps: str):
+    """Conecta la señal post_delete a los modelos de las aplicaciones indicadas, salvo los de eliminación masiva. Se conecta a cada modelo, ya que una señal sin remitente la reciben todos los modelos y Django no puede eliminar ninguno con una sola consulta"""
+
+    for etiqueta in etiquetas_apps:
+        for modelo in apps.get_app_config(etiqueta).get_models():
+            if modelo not in _modelos_eliminacion_masiva:
+                post_delete.connect(
+                    invalidar_generacion_eliminacion,
+                    sender=modelo,
+                    dispatch_uid=f"app.cache.eliminado.{modelo._meta.label_lower}",
+                )
+
+
+@receiver(m2m_changed, dispatch_uid="app.cache.m2m")
+def invalidar_generacion_m2m(sender, instance, action: str, model, **kwargs):
+    """Los cambios en las relaciones muchos a muchos (ej: los grupos de un usuario) no envían post_save"""
+
+    if action in ("post_add", "post_remove", "post_clear"):
+        incrementar_generacion(sender, type(instance), model)
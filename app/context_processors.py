@@ -2,7 +2,9 @@ from typing import TypedDict
 from typing_extensions import NotRequired
 from django.http import HttpRequest
 from django.conf import settings
-from django.urls import reverse_lazy
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from app.cache import obtener_generaciones
 from app.util import vn, vnp
 from app.vistas import nombre_url_crear_auto, nombre_url_lista_auto
 from estudios.modelos.gestion.calificaciones import Nota, Tarea, TipoTarea
@@ -13,6 +15,7 @@ from estudios.modelos.gestion.personas import (
     Matricula,
 )
 from estudios.modelos.parametros import Lapso, Materia, Seccion, Año
+from usuarios.backends import MODELOS_PERMISOS
 from usuarios.models import Usuario, Grupo
 from app.settings import MEDIA_URL
 
@@ -24,9 +27,18 @@ class Enlace(TypedDict):
     icono_style: NotRequired[str]
 
 
-def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
+# combinaciones de permisos distintas que se guardan en el proceso antes de descartarlas
+LIMITE_ENLACES_PROCESO = 100
+
+# enlaces del proceso por combinación de permisos, con las generaciones de los permisos con las que se calcularon
+_enlaces_proceso: "tuple[tuple[int, ...], dict[tuple, list]] | None" = None
+
+
+def obtener_enlaces(
+    permisos: "frozenset[str]", es_superusuario: bool, es_profesor: bool
+):
     def si_permitido(permiso: str, enlace: Enlace) -> "Enlace | None":
-        return enlace if request.user.is_superuser or permiso in permisos else None  # type: ignore
+        return enlace if es_superusuario or permiso in permisos else None
 
     return [
         {
@@ -38,7 +50,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Añadir profesor",
                         "icono_nombre": "añadir",
-                        "href": reverse_lazy(nombre_url_crear_auto(Profesor)),
+                        "href": reverse(nombre_url_crear_auto(Profesor)),
                     },
                 ),
                 si_permitido(
@@ -46,7 +58,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Lista de profesores",
                         "icono_nombre": "usuarios",
-                        "href": reverse_lazy(nombre_url_lista_auto(Profesor)),
+                        "href": reverse(nombre_url_lista_auto(Profesor)),
                     },
                 ),
                 si_permitido(
@@ -54,7 +66,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Materias impartidas",
                         "icono_nombre": "asignaciones_pm",
-                        "href": reverse_lazy(nombre_url_lista_auto(ProfesorMateria)),
+                        "href": reverse(nombre_url_lista_auto(ProfesorMateria)),
                     },
                 ),
             ],
@@ -68,7 +80,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Añadir estudiante",
                         "icono_nombre": "añadir",
-                        "href": reverse_lazy(nombre_url_crear_auto(Estudiante)),
+                        "href": reverse(nombre_url_crear_auto(Estudiante)),
                     },
                 ),
                 si_permitido(
@@ -76,7 +88,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Lista de estudiantes",
                         "icono_nombre": "tabla",
-                        "href": reverse_lazy(nombre_url_lista_auto(Estudiante)),
+                        "href": reverse(nombre_url_lista_auto(Estudiante)),
                     },
                 ),
                 si_permitido(
@@ -85,7 +97,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                         "label": "Secciones",
                         "icono_nombre": "secciones",
                         "icono_style": "transform: scale(1.1)",
-                        "href": reverse_lazy(nombre_url_lista_auto(Seccion)),
+                        "href": reverse(nombre_url_lista_auto(Seccion)),
                     },
                 ),
                 si_permitido(
@@ -93,7 +105,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Matrículas",
                         "icono_nombre": "matriculas",
-                        "href": reverse_lazy(nombre_url_lista_auto(Matricula)),
+                        "href": reverse(nombre_url_lista_auto(Matricula)),
                     },
                 ),
             ],
@@ -107,7 +119,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": f"Carga de {vnp(Nota)}",
                         "icono_nombre": "añadir",
-                        "href": reverse_lazy(nombre_url_crear_auto(Nota)),
+                        "href": reverse(nombre_url_crear_auto(Nota)),
                     },
                 ),
                 si_permitido(
@@ -115,7 +127,23 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": f"Lista de {vnp(Nota)}",
                         "icono_nombre": "tabla",
-                        "href": reverse_lazy(nombre_url_lista_auto(Nota)),
+                        "href": reverse(nombre_url_lista_auto(Nota)),
+                    },
+                ),
+                si_permitido(
+                    "estudios.view_nota",
+                    {
+                        "label": f"Estadísticas de {vnp(Nota)}",
+                        "icono_nombre": "panel",
+                        "href": reverse("estadisticas_notas"),
+                    },
+                ),
+                si_permitido(
+                    "estudios.view_nota",
+                    {
+                        "label": "Cuadro de honor",
+                        "icono_nombre": "bachilleres",
+                        "href": reverse("cuadro_honor"),
                     },
                 ),
             ],
@@ -129,10 +157,10 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": f"Añadir {vn(Tarea)}",
                         "icono_nombre": "añadir",
-                        "href": reverse_lazy(nombre_url_crear_auto(Tarea)),
+                        "href": reverse(nombre_url_crear_auto(Tarea)),
                     },
                 )
-                if hasattr(request.user, "profesor")
+                if es_profesor
                 else None,
                 si_permitido(
                     "estudios.view_tarea",
@@ -140,17 +168,17 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                         "label": f"Mis {vnp(Tarea)}",
                         "icono_nombre": "tabla",
                         # "href": reverse_lazy("mis_tareas"),
-                        "href": reverse_lazy(nombre_url_lista_auto(Tarea)),
+                        "href": reverse(nombre_url_lista_auto(Tarea)),
                     },
                 )
-                if hasattr(request.user, "profesor")
+                if es_profesor
                 else None,
                 # si_permitido(
                 #     "estudios.view_tarea",
                 #     {
                 #         "label": "Todas las tareas",
                 #         "icono_nombre": "tabla",
-                #         "href": reverse_lazy(nombre_url_lista_auto(Tarea)),
+                #         "href": reverse(nombre_url_lista_auto(Tarea)),
                 #     },
                 # ),
                 si_permitido(
@@ -158,7 +186,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": vnp(TipoTarea),
                         "icono_nombre": "tabla",
-                        "href": reverse_lazy(nombre_url_lista_auto(TipoTarea)),
+                        "href": reverse(nombre_url_lista_auto(TipoTarea)),
                     },
                 ),
             ],
@@ -172,7 +200,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Años",
                         "icono_nombre": "años",
-                        "href": reverse_lazy(nombre_url_lista_auto(Año)),
+                        "href": reverse(nombre_url_lista_auto(Año)),
                     },
                 ),
                 si_permitido(
@@ -180,7 +208,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Lapsos",
                         "icono_nombre": "lapsos",
-                        "href": reverse_lazy(nombre_url_lista_auto(Lapso)),
+                        "href": reverse(nombre_url_lista_auto(Lapso)),
                     },
                 ),
                 si_permitido(
@@ -188,7 +216,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Materias",
                         "icono_nombre": "materias",
-                        "href": reverse_lazy(nombre_url_lista_auto(Materia)),
+                        "href": reverse(nombre_url_lista_auto(Materia)),
                     },
                 ),
             ],
@@ -202,7 +230,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Añadir usuario",
                         "icono_nombre": "añadir",
-                        "href": reverse_lazy(nombre_url_crear_auto(Usuario)),
+                        "href": reverse(nombre_url_crear_auto(Usuario)),
                     },
                 ),
                 si_permitido(
@@ -210,7 +238,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Lista de usuarios",
                         "icono_nombre": "usuarios",
-                        "href": reverse_lazy(nombre_url_lista_auto(Usuario)),
+                        "href": reverse(nombre_url_lista_auto(Usuario)),
                     },
                 ),
                 si_permitido(
@@ -218,7 +246,7 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
                     {
                         "label": "Grupos de permisos",
                         "icono_nombre": "permisos",
-                        "href": reverse_lazy(nombre_url_lista_auto(Grupo)),
+                        "href": reverse(nombre_url_lista_auto(Grupo)),
                     },
                 ),
             ],
@@ -226,15 +254,47 @@ def obtener_enlaces(request: HttpRequest, permisos: "set[str]"):
     ]
 
 
-def contexto(request: HttpRequest):
-    autenticado = request.user.is_authenticated
-    if autenticado:  # type: ignore
-        permisos = request.user.get_all_permissions()  # type: ignore
+def obtener_enlaces_usuario(request: HttpRequest):
+    """Los enlaces solo dependen de los permisos del usuario y de si es profesor, por lo que se calculan una vez por cada combinación y se guardan en el proceso hasta que cambien los grupos o los permisos"""
+
+    global _enlaces_proceso
+
+    usuario = request.user
+    es_superusuario = usuario.is_superuser  # type: ignore - el usuario está autenticado
+    permisos: "frozenset[str]" = frozenset()
+
+    if not es_superusuario:
+        permisos = frozenset(usuario.get_all_permissions())  # type: ignore - el usuario está autenticado
+
+    es_profesor = hasattr(usuario, "profesor")
+    clave = (permisos, es_superusuario, es_profesor)
+
+    generaciones = obtener_generaciones(*MODELOS_PERMISOS)
+    proceso = _enlaces_proceso
 
+    if (
+        proceso is None
+        or proceso[0] != generaciones
+        or len(proceso[1]) >= LIMITE_ENLACES_PROCESO
+    ):
+        proceso = _enlaces_proceso = (generaciones, {})
+
+    enlaces = proceso[1].get(clave)
+
+    if enlaces is None:
+        enlaces = proceso[1][clave] = obtener_enlaces(
+            permisos, es_superusuario, es_profesor
+        )
+
+    return enlaces
+
+
+def contexto(request: HttpRequest):
+    # los enlaces se calculan al mostrar la barra lateral, por lo que no se calculan en las respuestas parciales (ej: las de htmx)
     return {
         "DEBUG": settings.DEBUG,
-        "enlaces": obtener_enlaces(request, permisos)  # type: ignore - sí se define permisos
-        if autenticado
+        "enlaces": SimpleLazyObject(lambda: obtener_enlaces_usuario(request))
+        if request.user.is_authenticated
         else [],
         "media_url": MEDIA_URL,
     }
@@ -0,0 +1,355 @@
+import copy
+from typing import Any, Callable, Iterable, Mapping, Type
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from app.campos import FiltrosConjuntoOpciones
+from app.util import normalizar_busqueda, obtener_filtro_bool_o_nulo
+
+# equivalentes de los lookups que no distinguen mayúsculas, para las columnas ya normalizadas
+LOOKUPS_SENSIBLES = {
+    "icontains": "contains",
+    "istartswith": "startswith",
+    "iendswith": "endswith",
+}
+
+
+class Filtro:
+    """Filtro declarativo asociado a un campo del form de filtros. Convierte el valor del campo en un Q, o en None si no se debe filtrar"""
+
+    def __init__(self, campo: str):
+        self.campo = campo
+
+    def obtener_q(self, datos_form: "dict[str, Any] | Mapping[str, Any]") -> "Q | None":
+        raise NotImplementedError
+
+    def para_modelo(self, modelo: "Type[models.Model]") -> "Filtro":
+        """Retorna el filtro a usar con los querysets del modelo. Por defecto es el mismo filtro"""
+        return self
+
+
+class FiltroTexto(Filtro):
+    """Búsqueda textual sobre una columna, según el tipo de búsqueda escogido en el campo "tipo_" + nombre del campo"""
+
+    def __init__(self, campo: str, columna: str, tipo_por_defecto: str = "icontains"):
+        super().__init__(campo)
+        self.columna = columna
+        self.campo_tipo = f"tipo_{campo}"
+        self.tipo_por_defecto = tipo_por_defecto
+
+    def obtener_q(self, datos_form):
+        q = datos_form.get(self.campo)
+
+        if not isinstance(q, str) or not (q := q.strip()):
+            return None
+
+        tipo_q = datos_form.get(self.campo_tipo) or self.tipo_por_defecto
+
+        return Q(**{f"{self.columna}__{tipo_q}": q})
+
+    def para_modelo(self, modelo):
+        """Si la columna tiene una columna de búsqueda normalizada (ver "columnas_normalizadas" en los modelos), se busca sobre ella"""
+
+        if columna := obtener_columna_normalizada(modelo, self.columna):
+            return FiltroTextoNormalizado(
+                self.campo, columna, self.tipo_por_defecto, self.campo_tipo
+            )
+
+        return self
+
+
+class FiltroTextoNormalizado(FiltroTexto):
+    """Búsqueda textual sobre una columna normalizada (sin diacríticos y en minúsculas). Las búsquedas "igual a" y "empieza con" se convierten en comparaciones que pueden usar el índice de la columna"""
+
+    def __init__(
+        self, campo: str, columna: str, tipo_por_defecto: str, campo_tipo: str
+    ):
+        super().__init__(campo, columna, tipo_por_defecto)
+        self.campo_tipo = campo_tipo
+
+    def obtener_q(self, datos_form):
+        q = datos_form.get(self.campo)
+
+        if not isinstance(q, str) or not (q := normalizar_busqueda(q)):
+            return None
+
+        tipo_q = datos_form.get(self.campo_tipo) or self.tipo_por_defecto
+
+        if tipo_q in ("exact", "iexact"):
+            return Q(**{self.columna: q})
+
+        if tipo_q in ("startswith", "istartswith") and ord(q[-1]) < 0x10FFFF:
+            # LIKE 'q%' no usa el índice en SQLite, pero un rango sí: q <= columna < siguiente(q)
+            siguiente = q[:-1] + chr(ord(q[-1]) + 1)
+            return Q(**{f"{self.columna}__gte": q, f"{self.columna}__lt": siguiente})
+
+        # la columna ya está en minúsculas, no hace falta comparar sin distinguir mayúsculas
+        tipo_q = LOOKUPS_SENSIBLES.get(tipo_q, tipo_q)
+
+        return Q(**{f"{self.columna}__{tipo_q}": q})
+
+
+class FiltroEn(Filtro):
+    """Filtra los registros cuya columna esté entre los valores seleccionados"""
+
+    def __init__(self, campo: str, columna: str):
+        super().__init__(campo)
+        self.columna = columna
+
+    def obtener_q(self, datos_form):
+        if valores := datos_form.get(self.campo):
+            return Q(**{f"{self.columna}__in": valores})
+
+
+class FiltroIgual(FiltroEn):
+    """Filtra los registros cuya columna sea igual al valor escogido"""
+
+    def obtener_q(self, datos_form):
+        if valor := datos_form.get(self.campo):
+            return Q(**{self.columna: valor})
+
+
+class FiltroBooleano(Filtro):
+    """Filtro para los campos booleanos o nulos (CampoBooleanoONulo). Si se escoge "sí" se aplica la condición, si se escoge "no" se aplica su negación. La condición puede ser una función, para cuando depende de datos que cambian (como el lapso actual)"""
+
+    def __init__(self, campo: str, condicion: "Q | Callable[[], Q]"):
+        super().__init__(campo)
+        self.condicion = condicion
+
+    def obtener_q(self, datos_form):
+        valor = obtener_filtro_bool_o_nulo(self.campo, datos_form)
+
+        if valor is None:
+            return None
+
+        condicion = self.condicion() if callable(self.condicion) else self.condicion
+
+        return condicion if valor else ~condicion
+
+
+class FiltroOpciones(Filtro):
+    """Aplica la condición correspondiente a la opción escogida"""
+
+    def __init__(self, campo: str, opciones: "Mapping[str, Q]"):
+        super().__init__(campo)
+        self.opciones = opciones
+
+    def obtener_q(self, datos_form):
+        return self.opciones.get(datos_form.get(self.campo))  # type: ignore - puede ser None
+
+
+class FiltroConjunto(Filtro):
+    """Filtro para los campos de ConjuntoOpcionesForm. Compara los valores seleccionados con los registros de una relación (ej: los años asignados a una materia), según el tipo de filtro escogido. Usa subconsultas, por lo que no añade joins a la consulta principal"""
+
+    def __init__(
+        self, campo: str, relacion: str, columna: str, sufijo_tipo_q: str = "_tipo_q"
+    ):
+        super().__init__(campo)
+        self.relacion = relacion
+        self.columna = columna
+        self.campo_tipo = f"{campo}{sufijo_tipo_q}"
+        self.modelo: "Type[models.Model] | None" = None
+
+    def para_modelo(self, modelo):
+        """Obtiene el modelo de la relación y la columna que apunta al modelo principal. Retorna una copia, ya que el mismo filtro se puede usar con varios modelos"""
+
+        relacion = modelo._meta.get_field(self.relacion)
+        filtro = copy.copy(self)
+        filtro.modelo = relacion.related_model  # type: ignore - sí es un modelo
+        filtro.columna_padre = relacion.field.name  # type: ignore - es una relación inversa
+
+        return filtro
+
+    def subconsulta(self, **kwargs):
+        return self.modelo._default_manager.filter(  # type: ignore - ya se preparó
+            **{self.columna_padre: OuterRef("pk")}, **kwargs
+        )
+
+    def obtener_q(self, datos_form):
+        if not (valores := datos_form.get(self.campo)):
+            return None
+
+        tipo = datos_form.get(self.campo_tipo)
+
+        alguna = Q(Exists(self.subconsulta(**{f"{self.columna}__in": valores})))
+
+        if tipo == FiltrosConjuntoOpciones.CONTIENE_ALGUNA.value[0]:
+            return alguna
+
+        if tipo == FiltrosConjuntoOpciones.NO_CONTIENE_ALGUNA.value[0]:
+            return ~alguna
+
+        if tipo not in (
+            FiltrosConjuntoOpciones.CONTIENE_TODAS.value[0],
+            FiltrosConjuntoOpciones.NO_CONTIENE_TODAS.value[0],
+        ):
+            return None
+
+        # debe tener exactamente las opciones seleccionadas: todas ellas y ninguna otra
+        todas = Q(
+            *(
+                Q(Exists(self.subconsulta(**{self.columna: valor})))
+                for valor in valores
+            ),
+            ~Q(Exists(self.subconsulta().exclude(**{f"{self.columna}__in": valores}))),
+        )
+
+        if tipo == FiltrosConjuntoOpciones.CONTIENE_TODAS.value[0]:
+            return todas
+
+        return ~todas
+
+
+def obtener_columna_normalizada(
+    modelo: "Type[models.Model]", ruta: str
+) -> "str | None":
+    """Si la ruta (ej: "estudiante__nombres") termina en una columna con una versión normalizada en su modelo, retorna la ruta a esa versión (ej: "estudiante__nombres_busqueda")"""
+
+    *relaciones, columna = ruta.split("__")
+
+    for parte in relaciones:
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+
+        if not campo.is_relation:
+            return None
+
+        modelo = campo.related_model  # type: ignore - sí es un modelo
+
+    normalizada = getattr(modelo, "columnas_normalizadas", {}).get(columna)
+
+    return "__".join((*relaciones, normalizada)) if normalizada else None
+
+
+def obtener_campo(modelo: "Type[models.Model]", ruta: str) -> "models.Field | None":
+    """Obtiene el campo al que apunta una ruta (ej: "estudiante__sexo"), o None si no es un campo del modelo"""
+
+    campo = None
+
+    for parte in ruta.split("__"):
+        if modelo is None:
+            return None
+
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return None
+
+        modelo = campo.related_model  # type: ignore - puede ser None
+
+    return campo  # type: ignore - sí es un campo
+
+
+def es_ruta_multiple(modelo: "Type[models.Model]", ruta: str) -> bool:
+    """Indica si la ruta de una columna (ej: "matricula__seccion__nombre") pasa por una relación a muchos, lo que hace que un registro pueda repetirse en los resultados"""
+
+    for parte in ruta.split("__"):
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            # anotaciones o lookups (ej: "in", "icontains")
+            return False
+
+        if not campo.is_relation:
+            return False
+
+        if campo.many_to_many or campo.one_to_many:
+            return True
+
+        modelo = campo.related_model  # type: ignore - sí es un modelo
+
+    return False
+
+
+def obtener_rutas(q: Q, negado: bool = False) -> "Iterable[tuple[str, bool]]":
+    """Obtiene las rutas de las columnas usadas en un Q, indicando si se usan negadas"""
+
+    negado = negado != q.negated
+
+    for hijo in q.children:
+        if isinstance(hijo, Q):
+            yield from obtener_rutas(hijo, negado)
+        elif isinstance(hijo, tuple):
+            yield hijo[0], negado
+
+
+class PlanFiltros:
+    """Plan compilado a partir de los filtros declarados en un form. Combina en un solo Q los filtros que no pasan por relaciones a muchos, de forma que las relaciones se unen una sola vez, y solo usa .distinct() cuando se filtra por una relación a muchos"""
+
+    def __init__(self, filtros: "Iterable[Filtro]"):
+        self.filtros = tuple(filtros)
+        self._compilados: "dict[Type[models.Model], tuple[Filtro, ...]]" = {}
+        self._rutas_multiples: "dict[tuple[Type[models.Model], str], bool]" = {}
+
+    def preparar(self, modelo: "Type[models.Model]") -> "tuple[Filtro, ...]":
+        """Obtiene los filtros adaptados al modelo del queryset. Se calculan una sola vez por modelo"""
+
+        if modelo not in self._compilados:
+            self._compilados[modelo] = tuple(
+                filtro.para_modelo(modelo) for filtro in self.filtros
+            )
+
+        return self._compilados[modelo]
+
+    def ruta_multiple(self, modelo: "Type[models.Model]", ruta: str) -> bool:
+        clave = (modelo, ruta)
+
+        if clave not in self._rutas_multiples:
+            self._rutas_multiples[clave] = es_ruta_multiple(modelo, ruta)
+
+        return self._rutas_multiples[clave]
+
+    def obtener_qs(
+        self,
+        modelo: "Type[models.Model]",
+        datos_form: "dict[str, Any] | Mapping[str, Any]",
+        filtros: "Iterable[Filtro]",
+    ) -> "list[Q]":
+        """Los Q que se aplican, cada uno con su propio .filter(): uno con todos los filtros que no pasan por relaciones a muchos, y uno por cada filtro que sí. Combinadas en un mismo .filter(), las condiciones sobre una relación a muchos las debe cumplir el mismo registro relacionado, mientras que en filtros separados cada una puede cumplirla un registro distinto"""
+
+        q = Q()
+        multiples = []
+
+        for filtro in filtros:
+            if (q_filtro := filtro.obtener_q(datos_form)) is None:
+                continue
+
+            if any(
+                self.ruta_multiple(modelo, ruta) for ruta, _ in obtener_rutas(q_filtro)
+            ):
+                multiples.append(q_filtro)
+            else:
+                q &= q_filtro
+
+        return [q, *multiples] if q else multiples
+
+    def necesita_distinct(self, modelo: "Type[models.Model]", q: Q) -> bool:
+        """Las relaciones a muchos negadas se resuelven con subconsultas, por lo que solo las no negadas pueden repetir registros"""
+
+        return any(
+            not negada and self.ruta_multiple(modelo, ruta)
+            for ruta, negada in obtener_rutas(q)
+        )
+
+    def aplicar(
+        self,
+        queryset: models.QuerySet,
+        datos_form: "dict[str, Any] | Mapping[str, Any]",
+        solo_busqueda: bool = False,
+    ) -> models.QuerySet:
+        filtros = self.preparar(queryset.model)
+
+        if solo_busqueda:
+            filtros = tuple(f for f in filtros if isinstance(f, FiltroTexto))
+
+        qs = self.obtener_qs(queryset.model, datos_form, filtros)
+
+        for q in qs:
+            queryset = queryset.filter(q)
+
+        if any(self.necesita_distinct(queryset.model, q) for q in qs):
+            queryset = queryset.distinct()
+
+        return queryset
@@ -9,6 +9,7 @@ from app.campos import (
     OPCIONES_TIPO_BUSQUEDA_TEXTUAL,
     FiltrosConjuntoOpciones,
 )
+from app.filtros import Filtro, FiltroTexto, PlanFiltros
 
 
 class CookieFormMixin:
@@ -147,6 +148,25 @@ class PaginacionFormMixin(forms.Form):
     )
 
 
+class FiltrosFormMixin:
+    """Permite declarar los filtros que aplica el form sobre el queryset de la vista. Estos se compilan una sola vez por clase en un plan de filtros"""
+
+    filtros: "tuple[Filtro, ...]" = ()
+
+    def obtener_filtros(self) -> "tuple[Filtro, ...]":
+        return self.filtros
+
+    @property
+    def plan_filtros(self) -> PlanFiltros:
+        clase = type(self)
+
+        # se guarda en la propia clase (no en las clases padre), ya que cada form tiene sus filtros
+        if "_plan_filtros" not in clase.__dict__:
+            clase._plan_filtros = PlanFiltros(self.obtener_filtros())  # type: ignore - se añade a la clase
+
+        return clase.__dict__["_plan_filtros"]
+
+
 class ColumnaBusqueda(TypedDict):
     columna_db: str
     nombre_campo: str
@@ -154,7 +174,7 @@ class ColumnaBusqueda(TypedDict):
     opciones_tipo_busqueda: NotRequired["tuple[tuple[str, str], ...]"]
 
 
-class BusquedaFormMixin(CookieFormMixin, PaginacionFormMixin):
+class BusquedaFormMixin(FiltrosFormMixin, CookieFormMixin, PaginacionFormMixin):
     """Crea un formulario para realizar búsquedas. Genera los campos de búsqueda automáticamente a partir de las columnas indicadas"""
 
     def __init__(self, *args, **kwargs):
@@ -202,6 +222,17 @@ class BusquedaFormMixin(CookieFormMixin, PaginacionFormMixin):
 
     columnas_busqueda: "tuple[ColumnaBusqueda, ...]"
 
+    def obtener_filtros(self):
+        """Además de los filtros declarados, se añade una búsqueda textual por cada columna de búsqueda"""
+
+        return (
+            *(
+                FiltroTexto(f"q_{columna['nombre_campo']}", columna["columna_db"])
+                for columna in self.columnas_busqueda
+            ),
+            *super().obtener_filtros(),
+        )
+
 
 class DireccionesOrden(Enum):
     DESC = "1", "Descendente"
@@ -235,7 +266,7 @@ class OrdenFormMixin:
         self.campos_orden = campos_orden
 
 
-class ConjuntoOpcionesForm(forms.Form):
+class ConjuntoOpcionesForm(FiltrosFormMixin, forms.Form):
     campos_opciones: "list[tuple[str, forms.MultipleChoiceField | forms.ModelMultipleChoiceField]] | tuple[tuple[str, forms.MultipleChoiceField | forms.ModelMultipleChoiceField], ...]"
     sufijo_tipo_q = "_tipo_q"
 
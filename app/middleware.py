@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import re
+import os
+import time
+from collections import Counter
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler, WatchedFileHandler
+from typing import Callable
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+# informe de las consultas de cada petición, en una línea JSON
+logger_informes = logging.getLogger("app.consultas")
+logger_presupuesto = logging.getLogger("app.presupuesto_consultas")
+
+
+class PresupuestoConsultasExcedido(Exception):
+    pass
+
+
+class CrearDirectorioInformes:
+    """Crea el archivo de los informes (junto con su directorio) al escribir el primero, no al cargar la configuración"""
+
+    baseFilename: str
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()  # type: ignore - se combina con un FileHandler
+
+
+class ManejadorArchivoInformes(CrearDirectorioInformes, RotatingFileHandler):
+    """Rota el archivo al llegar a "maxBytes". Solo sirve si escribe un único proceso (runserver o Waitress): si otro proceso tiene abierto el archivo, no se puede renombrar (en Windows) o sigue escribiendo en el anterior"""
+
+
+class ManejadorArchivoInformesCompartido(CrearDirectorioInformes, WatchedFileHandler):
+    """Para los procesos de Gunicorn, que escriben en el mismo archivo sin rotarlo: se rota desde afuera (ej: logrotate), y cada proceso lo vuelve a abrir al detectar que cambió"""
+
+
+def presupuesto_consultas(cantidad: int):
+    """Indica el presupuesto de consultas de una vista basada en una función. En las vistas basadas en clases se indica con el atributo "presupuesto_consultas" """
+
+    def decorador(vista: Callable):
+        vista.presupuesto_consultas = cantidad  # type: ignore - se agrega el atributo
+        return vista
+
+    return decorador
+
+
+def huella_sql(sql: str) -> str:
+    """Normaliza una consulta para agrupar las que solo difieren en sus parámetros (ej: las de un N+1)"""
+
+    sql = re.sub(r"\s+", " ", sql.strip())
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"%s|\b\d+\b", "?", sql)
+
+    # listas de IN de distinto largo
+    return re.sub(r"\((?:\?, )+\?\)", "(...)", sql)
+
+
+class ContadorConsultas:
+    """Envoltura de la ejecución de consultas (connection.execute_wrapper) que cuenta las consultas, su tiempo y cuántas veces se repite cada una"""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.huellas: "Counter[str]" = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.huellas[huella_sql(sql)] += 1
+
+    def repetidas(self, limite: int = 5) -> "list[dict]":
+        return [
+            {
+                "huella": hashlib.md5(huella.encode()).hexdigest()[:12],
+                "cantidad": cantidad,
+                "sql": huella[:300],
+            }
+            for huella, cantidad in self.huellas.most_common(limite)
+            if cantidad > 1
+        ]
+
+
+class PresupuestoConsultasMiddleware:
+    """Cuenta las consultas de cada petición y escribe un informe por vista (cantidad, tiempo y consultas repetidas). Si la vista indica "presupuesto_consultas" y se excede, advierte o lanza un error según PRESUPUESTO_CONSULTAS_ACCION"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        contador = ContadorConsultas()
+
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(contador))
+
+            respuesta = self.get_response(request)
+
+        # las peticiones que no llegan a una vista (ej: archivos estáticos) no se registran
+        if vista := getattr(request, "vista_consultas", None):
+            self.registrar(request, respuesta, vista, contador)
+
+        return respuesta
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        request.vista_consultas = getattr(view_func, "view_class", view_func)  # type: ignore - se agrega el atributo
+
+    def registrar(
+        self,
+        request: HttpRequest,
+        respuesta: HttpResponse,
+        vista,
+        contador: ContadorConsultas,
+    ):
+        nombre = f"{vista.__module__}.{vista.__qualname__}"
+        presupuesto: "int | None" = getattr(vista, "presupuesto_consultas", None)
+
+        logger_informes.info(
+            json.dumps(
+                {
+                    "vista": nombre,
+                    "metodo": request.method,
+                    "ruta": request.path,
+                    "estado": respuesta.status_code,
+                    "consultas": contador.cantidad,
+                    "tiempo_ms": round(contador.tiempo * 1000, 2),
+                    "presupuesto": presupuesto,
+                    "repetidas": contador.repetidas(),
+                },
+                ensure_ascii=False,
+            )
+        )
+
+        if presupuesto is None or contador.cantidad <= presupuesto:
+            return
+
+        mensaje = f"{nombre} ({request.method} {request.path}) hizo {contador.cantidad} consultas, su presupuesto es de {presupuesto}"
+        accion = getattr(settings, "PRESUPUESTO_CONSULTAS_ACCION", None)
+
+        if accion == "error":
+            raise PresupuestoConsultasExcedido(mensaje)
+
+        if accion == "advertir":
+            logger_presupuesto.warning(mensaje)
@@ -0,0 +1,146 @@
+import zlib
+from typing import Literal
+
+# tamaño carta, en puntos (1/72 de pulgada)
+ANCHO_PAGINA = 612
+ALTO_PAGINA = 792
+
+Fuente = Literal["normal", "negrita"]
+
+# fuentes estándar de PDF, que no hace falta incrustar en el documento
+FUENTES: "dict[Fuente, tuple[str, str]]" = {
+    "normal": ("F1", "Helvetica"),
+    "negrita": ("F2", "Helvetica-Bold"),
+}
+
+
+def escapar_texto(texto: str) -> bytes:
+    """Codifica el texto para las fuentes estándar (WinAnsiEncoding, que incluye los acentos y la ñ) y escapa los caracteres especiales de las cadenas de PDF"""
+
+    codificado = texto.encode("cp1252", errors="replace")
+
+    return (
+        codificado.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    )
+
+
+def ancho_aproximado(texto: str, tamaño: float) -> float:
+    """Ancho aproximado del texto en Helvetica, suficiente para centrar o alinear a la derecha"""
+
+    return len(texto) * tamaño * 0.5
+
+
+class DocumentoPDF:
+    """Documento PDF mínimo con texto y líneas, sin dependencias. Las coordenadas se indican desde la esquina superior izquierda de la página"""
+
+    def __init__(self, titulo: str = ""):
+        self.titulo = titulo
+        self.paginas: "list[list[bytes]]" = []
+        self.nueva_pagina()
+
+    @property
+    def pagina(self) -> "list[bytes]":
+        return self.paginas[-1]
+
+    def nueva_pagina(self):
+        self.paginas.append([])
+
+    def texto(
+        self,
+        x: float,
+        y: float,
+        texto: str,
+        tamaño: float = 10,
+        fuente: Fuente = "normal",
+        alineacion: Literal["izquierda", "centro", "derecha"] = "izquierda",
+    ):
+        if alineacion == "centro":
+            x -= ancho_aproximado(texto, tamaño) / 2
+        elif alineacion == "derecha":
+            x -= ancho_aproximado(texto, tamaño)
+
+        nombre_fuente = FUENTES[fuente][0]
+
+        self.pagina.append(
+            b"BT /%s %.1f Tf %.2f %.2f Td (%s) Tj ET"
+            % (
+                nombre_fuente.encode(),
+                tamaño,
+                x,
+                ALTO_PAGINA - y,
+                escapar_texto(texto),
+            )
+        )
+
+    def linea(self, x1: float, y1: float, x2: float, y2: float, grosor: float = 0.5):
+        self.pagina.append(
+            b"%.2f w %.2f %.2f m %.2f %.2f l S"
+            % (grosor, x1, ALTO_PAGINA - y1, x2, ALTO_PAGINA - y2)
+        )
+
+    def a_bytes(self) -> bytes:
+        # objetos: 1 catálogo, 2 páginas, 3 información, una fuente por estilo, y luego una página y su contenido por cada página
+        objetos: "list[bytes]" = []
+        primera_fuente = 4
+        primera_pagina = primera_fuente + len(FUENTES)
+
+        referencias_fuentes = b" ".join(
+            b"/%s %d 0 R" % (nombre.encode(), primera_fuente + i)
+            for i, (nombre, _) in enumerate(FUENTES.values())
+        )
+        referencias_paginas = b" ".join(
+            b"%d 0 R" % (primera_pagina + i * 2) for i in range(len(self.paginas))
+        )
+
+        objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+        objetos.append(
+            b"<< /Type /Pages /Kids [%s] /Count %d >>"
+            % (referencias_paginas, len(self.paginas))
+        )
+        objetos.append(b"<< /Title (%s) >>" % escapar_texto(self.titulo))
+
+        for _, base in FUENTES.values():
+            objetos.append(
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                % base.encode()
+            )
+
+        for i, operaciones in enumerate(self.paginas):
+            contenido = zlib.compress(b"\n".join(operaciones))
+
+            objetos.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents %d 0 R >>"
+                % (
+                    ANCHO_PAGINA,
+                    ALTO_PAGINA,
+                    referencias_fuentes,
+                    primera_pagina + i * 2 + 1,
+                )
+            )
+            objetos.append(
+                b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+                % (len(contenido), contenido)
+            )
+
+        salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        posiciones = []
+
+        for numero, objeto in enumerate(objetos, start=1):
+            posiciones.append(len(salida))
+            salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+
+        inicio_xref = len(salida)
+        salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+
+        for posicion in posiciones:
+            salida += b"%010d 00000 n \n" % posicion
+
+        salida += (
+            b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (
+                len(objetos) + 1,
+                inicio_xref,
+            )
+        )
+
+        return bytes(salida)
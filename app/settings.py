@@ -11,7 +11,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 secretos = dotenv_values(".env")
 SECRET_KEY = secretos["SECRET_KEY"]
 
-DEV = True
+# se activa al iniciar el servidor de producción (python run.py --produccion)
+PRODUCCION = os.environ.get("PRODUCCION") == "1"
+
+DEV = not PRODUCCION
 DEBUG = DEV
 
 ALLOWED_HOSTS = ["*"]
@@ -35,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.middleware.PresupuestoConsultasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -47,6 +51,12 @@ MIDDLEWARE = [
 if DEBUG:
     INSTALLED_APPS.append("django_browser_reload")
     MIDDLEWARE.append("django_browser_reload.middleware.BrowserReloadMiddleware")
+else:
+    # sin DEBUG, Django no sirve los archivos estáticos
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+        "whitenoise.middleware.WhiteNoiseMiddleware",
+    )
 
 ROOT_URLCONF = "app.urls"
 
@@ -77,22 +87,82 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "app.wsgi.application"
 
-if DEBUG:
-    LOGGING = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "handlers": {
-            "null": {
-                "class": "logging.NullHandler",
-            },
+# se crea al escribir el primer registro (ver app.middleware.CrearDirectorioInformes)
+DIRECTORIO_LOGS = BASE_DIR / "logs"
+
+# qué hacer cuando una vista excede su "presupuesto_consultas": "advertir", "error" o None
+PRESUPUESTO_CONSULTAS_ACCION = "advertir" if DEV else None
+
+# lo define servidor_produccion al iniciar Gunicorn, cuyos procesos escriben a la vez en los mismos archivos
+VARIOS_PROCESOS = os.environ.get("VARIOS_PROCESOS") == "1"
+
+# con un solo proceso el informe de consultas se rota al llegar a 5 MB. Con varios no se puede rotar desde adentro, así que solo se escribe si se pide (INFORME_CONSULTAS=1) y se debe rotar desde afuera (ej: logrotate)
+INFORME_CONSULTAS = not VARIOS_PROCESOS or os.environ.get("INFORME_CONSULTAS") == "1"
+MANEJADOR_INFORME_CONSULTAS = (
+    {"class": "app.middleware.ManejadorArchivoInformesCompartido"}
+    if VARIOS_PROCESOS
+    else {
+        "class": "app.middleware.ManejadorArchivoInformes",
+        "maxBytes": 5 * 1024 * 1024,
+        "backupCount": 5,
+    }
+)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "mensaje": {
+            "format": "{message}",
+            "style": "{",
         },
-        "loggers": {
-            "django.server": {
-                "handlers": ["null"],
-                "level": "INFO",
-                "propagate": False,
-            },
+    },
+    "handlers": {
+        "null": {
+            "class": "logging.NullHandler",
+        },
+        "consola": {
+            "class": "logging.StreamHandler",
+        },
+        # un informe (JSON) por línea con las consultas de cada petición (ver app.middleware)
+        "consultas": {
+            "filename": DIRECTORIO_LOGS / "consultas.log",
+            "encoding": "utf-8",
+            "delay": True,
+            "formatter": "mensaje",
+            **MANEJADOR_INFORME_CONSULTAS,
         },
+    },
+    "loggers": {
+        "app.consultas": {
+            "handlers": ["consultas" if INFORME_CONSULTAS else "null"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "app.presupuesto_consultas": {
+            "handlers": ["consola"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+if DEBUG:
+    LOGGING["loggers"]["django.server"] = {
+        "handlers": ["null"],
+        "level": "INFO",
+        "propagate": False,
+    }
+
+if PRODUCCION:
+    # los procesos del servidor comparten la caché, para que las generaciones (ver app.cache) invaliden los datos guardados en todos
+    # FileBasedCache descarta claves al azar al pasar de MAX_ENTRIES y su incr no es atómico entre procesos. No afecta a las generaciones, que son valores aleatorios que se reemplazan en vez de contadores: si se descarta una, la siguiente es otro valor y los datos guardados con la anterior dejan de usarse
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": BASE_DIR / "cache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
     }
 
 DATABASES = {
@@ -102,6 +172,10 @@ DATABASES = {
     }
 }
 
+if PRODUCCION:
+    # los procesos e hilos del servidor (peticiones, autoguardado y trabajos en segundo plano) escriben a la vez en el mismo archivo, por lo que cada conexión espera hasta 30 segundos a que se libere antes de fallar con "database is locked". Además se usa el modo WAL (ver app.basedatos)
+    DATABASES["default"]["OPTIONS"] = {"timeout": 30}
+
 AUTH_PASSWORD_VALIDATORS = (
     []
     if DEV
@@ -135,6 +209,9 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
 
+# WhiteNoise busca los archivos en las mismas carpetas que Django, por lo que no hace falta ejecutar collectstatic
+WHITENOISE_USE_FINDERS = True
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_URL = "login"
@@ -143,6 +220,12 @@ LOGOUT_URL = "logout"
 AUTH_USER_MODEL = "usuarios.Usuario"
 AUTH_GROUP_MODEL = "usuarios.Grupo"
 
+# igual que el de Django, pero guarda los permisos de los usuarios en caché. ModelBackend se mantiene para que sigan válidas las sesiones iniciadas con él, y no consulta los permisos ya que BackendPermisos se los asigna
+AUTHENTICATION_BACKENDS = [
+    "usuarios.backends.BackendPermisos",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
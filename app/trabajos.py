@@ -0,0 +1,207 @@
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.db.models import Exists, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from usuarios.models import EstadosTrabajo, Trabajo
+
+logger = logging.getLogger(__name__)
+
+# un trabajo sin terminar que no avanza en este tiempo se considera interrumpido (ej: se reinició el proceso que lo ejecutaba) y se puede continuar. Debe ser mayor que lo que tarda el lote más lento
+TIEMPO_INTERRUMPIDO = datetime.timedelta(minutes=5)
+# tiempo que se guardan los trabajos terminados
+TIEMPO_TRABAJOS_TERMINADOS = datetime.timedelta(days=1)
+
+
+class MensajesTrabajo:
+    """Reemplaza el almacenamiento de mensajes de la petición en los trabajos, que terminan luego de enviar la respuesta. Los mensajes se guardan en el trabajo y se muestran al consultar su progreso"""
+
+    def __init__(self, mensajes: "list[tuple[int, str]] | None" = None):
+        self.mensajes: "list[tuple[int, str]]" = list(mensajes or ())
+
+    def add(self, level: int, message, extra_tags=""):
+        self.mensajes.append((level, str(message)))
+
+
+class ErrorTrabajo(Exception):
+    """Error esperado al procesar un lote (ej: datos inválidos). Su mensaje se muestra al usuario"""
+
+
+class TrabajoContinuado(Exception):
+    """Otro proceso continuó el trabajo mientras se procesaba un lote (ver TIEMPO_INTERRUMPIDO)"""
+
+
+# un solo hilo por proceso. Cada proceso del servidor tiene el suyo, por lo que reservar_trabajo es lo que impide que varios trabajos escriban a la vez en la base de datos. Se crea al iniciar el primer trabajo
+_ejecutor: "ThreadPoolExecutor | None" = None
+
+
+def obtener_ejecutor() -> ThreadPoolExecutor:
+    global _ejecutor
+
+    if _ejecutor is None:
+        _ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trabajos")
+
+    return _ejecutor
+
+
+def iniciar_trabajo(
+    vista: str,
+    argumentos: dict,
+    tipo: str,
+    descripcion: str,
+    elementos: "Sequence[str]",
+    datos: str,
+    tamaño_lote: int,
+    usuario,
+) -> Trabajo:
+    """Guarda el trabajo y lo ejecuta en segundo plano luego de confirmar la transacción. "vista" es la ruta de una clase cuyas instancias tienen el método "procesar_lote_trabajo(trabajo, lote)", que procesa un lote acumulando lo necesario en "trabajo.resultado" o lanza ErrorTrabajo para detener el trabajo"""
+
+    Trabajo.objects.filter(
+        estado__in=(EstadosTrabajo.COMPLETADO, EstadosTrabajo.ERROR),
+        fecha_actualizacion__lt=timezone.now() - TIEMPO_TRABAJOS_TERMINADOS,
+    ).delete()
+
+    trabajo = Trabajo.objects.create(
+        usuario=usuario,
+        vista=vista,
+        argumentos=argumentos,
+        tipo=tipo,
+        descripcion=descripcion,
+        elementos=list(elementos),
+        datos=datos,
+        tamaño_lote=tamaño_lote,
+    )
+
+    transaction.on_commit(
+        lambda: obtener_ejecutor().submit(ejecutar_trabajo, trabajo.pk)
+    )
+
+    return trabajo
+
+
+def filtro_ejecutables() -> Q:
+    """Los trabajos pendientes y los interrumpidos"""
+
+    limite = timezone.now() - TIEMPO_INTERRUMPIDO
+
+    return Q(estado=EstadosTrabajo.PENDIENTE) | Q(
+        estado=EstadosTrabajo.EN_CURSO, fecha_actualizacion__lt=limite
+    )
+
+
+def obtener_trabajo(id_trabajo: str, usuario) -> "Trabajo | None":
+    """Obtiene el trabajo si lo inició el usuario. Si se interrumpió, se vuelve a ejecutar en este proceso"""
+
+    try:
+        trabajo = Trabajo.objects.get(pk=id_trabajo, usuario=usuario.pk)
+    except (Trabajo.DoesNotExist, ValidationError):
+        return None
+
+    if (
+        not trabajo.terminado
+        and trabajo.fecha_actualizacion < timezone.now() - TIEMPO_INTERRUMPIDO
+    ):
+        obtener_ejecutor().submit(ejecutar_trabajo, trabajo.pk)
+
+    return trabajo
+
+
+def reservar_trabajo(id_trabajo) -> bool:
+    """Marca el trabajo como en curso si se puede ejecutar y ningún otro está en curso, en cualquier proceso. Es una sola consulta, por lo que dos procesos no pueden reservar trabajos a la vez. Los que no se reservan siguen pendientes hasta que termine el que está en curso"""
+
+    en_curso = Trabajo.objects.filter(
+        estado=EstadosTrabajo.EN_CURSO,
+        fecha_actualizacion__gte=timezone.now() - TIEMPO_INTERRUMPIDO,
+    ).exclude(pk=id_trabajo)
+
+    return bool(
+        Trabajo.objects.filter(
+            filtro_ejecutables(), ~Exists(en_curso), pk=id_trabajo
+        ).update(estado=EstadosTrabajo.EN_CURSO, fecha_actualizacion=timezone.now())
+    )
+
+
+def siguiente_trabajo():
+    """Id del trabajo pendiente o interrumpido más antiguo, o None si no hay"""
+
+    return (
+        Trabajo.objects.filter(filtro_ejecutables())
+        .order_by("fecha_creacion")
+        .values_list("pk", flat=True)
+        .first()
+    )
+
+
+def ejecutar_trabajo(id_trabajo):
+    """Ejecuta el trabajo si lo puede reservar y luego, en orden, los que esperaban a que terminara"""
+
+    try:
+        while id_trabajo is not None and procesar_trabajo(id_trabajo):
+            id_trabajo = siguiente_trabajo()
+    finally:
+        # el hilo abre sus propias conexiones, que no cierra el ciclo de las peticiones
+        connections.close_all()
+
+
+def procesar_trabajo(id_trabajo) -> bool:
+    """Procesa los lotes que faltan del trabajo. Cada lote se procesa en la misma transacción que guarda el avance, por lo que al continuar un trabajo interrumpido no se repite ni se salta ningún lote. Los lotes ya procesados no se revierten. Retorna False si no se pudo reservar el trabajo o si otro proceso lo continuó"""
+
+    if not reservar_trabajo(id_trabajo):
+        return False
+
+    trabajo = Trabajo.objects.get(pk=id_trabajo)
+
+    try:
+        vista = import_string(trabajo.vista)()
+
+        while trabajo.procesados < trabajo.total:
+            inicio = trabajo.procesados
+            lote = trabajo.elementos[inicio : inicio + trabajo.tamaño_lote]
+
+            with transaction.atomic():
+                vista.procesar_lote_trabajo(trabajo, lote)
+
+                trabajo.procesados += len(lote)
+
+                # si otro proceso ya guardó este lote, se revierte y se deja que él termine el trabajo
+                if not Trabajo.objects.filter(pk=trabajo.pk, procesados=inicio).update(
+                    procesados=trabajo.procesados,
+                    resultado=trabajo.resultado,
+                    fecha_actualizacion=timezone.now(),
+                ):
+                    raise TrabajoContinuado
+
+        trabajo.estado = EstadosTrabajo.COMPLETADO
+    except TrabajoContinuado:
+        return False
+    except ErrorTrabajo as e:
+        trabajo.estado = EstadosTrabajo.ERROR
+        trabajo.error = str(e)[:255]
+    except Exception:
+        logger.exception("Error en el trabajo %s", id_trabajo)
+
+        trabajo.estado = EstadosTrabajo.ERROR
+        trabajo.error = "Ocurrió un error inesperado"
+
+    trabajo.save(update_fields=["estado", "error", "fecha_actualizacion"])
+
+    return True
+
+
+def ejecutar_pendientes() -> int:
+    """Ejecuta en este proceso los trabajos pendientes y los interrumpidos. Retorna cuántos encontró"""
+
+    ids = list(
+        Trabajo.objects.filter(filtro_ejecutables())
+        .order_by("fecha_creacion")
+        .values_list("pk", flat=True)
+    )
+
+    for id_trabajo in ids:
+        ejecutar_trabajo(id_trabajo)
+
+    return len(ids)
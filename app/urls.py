@@ -1,10 +1,13 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from app.vistas.archivos import archivo_subido
+from app.vistas.busqueda import busqueda_global
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("buscar/", busqueda_global, name="busqueda_global"),
     path("", include("usuarios.urls")),
     path("", include("estudios.urls.parametros")),
     path("", include("estudios.urls.gestion")),
@@ -15,3 +18,12 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += [path("__reload__/", include("django_browser_reload.urls"))]
+else:
+    # WhiteNoise solo sirve los archivos estáticos, no los subidos por los usuarios (ej: las fotos de perfil). django.views.static.serve no es para producción, por lo que se sirven con una vista que exige sesión. Si hay un proxy inverso (ej: nginx) delante del servidor, puede servir MEDIA_URL directamente desde MEDIA_ROOT y esta ruta ya no se usa
+    urlpatterns += [
+        re_path(
+            r"^{}(?P<ruta>.+)$".format(settings.MEDIA_URL.lstrip("/")),
+            archivo_subido,
+            name="archivo_subido",
+        )
+    ]
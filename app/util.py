@@ -1,4 +1,5 @@
 from typing import TYPE_CHECKING, Any, Mapping, Type
+from unicodedata import normalize
 from django.db import models
 from app.campos import TextosBooleanos
 
@@ -38,3 +39,19 @@ def vn(modelo: Type[models.Model]) -> str:
 def vnp(modelo: Type[models.Model]) -> str:
     """Retorna el verbose name plural del modelo"""
     return str(modelo._meta.verbose_name_plural)
+
+
+def quitar_diacriticos(texto):
+    # Normaliza la cadena en forma descompuesta (NFD)
+    texto_nfd = normalize("NFD", texto)
+    # Elimina los caracteres diacríticos (rangos U+0300 a U+036F)
+    texto_sin_diacriticos = "".join(
+        char for char in texto_nfd if ord(char) < 0x0300 or ord(char) > 0x036F
+    )
+    # Vuelve a normalizar a forma compuesta (NFC)
+    return normalize("NFC", texto_sin_diacriticos)
+
+
+def normalizar_busqueda(texto: Any) -> str:
+    """Normaliza un texto para las búsquedas: sin diacríticos, en minúsculas y sin espacios a los lados. Así "José" y "jose" se consideran iguales"""
+    return quitar_diacriticos(str(texto)).lower().strip()
@@ -77,3 +77,6 @@ class VistaLocalizadaMixin:
 
 class Vista(VistaProtegidaMixin, VistaLocalizadaMixin):
     """Vista genérica que combina el mixin de vistas localizadas y de vistas protegidas."""
+
+    # cantidad máxima de consultas por petición, que verifica app.middleware.PresupuestoConsultasMiddleware. None para no verificarla
+    presupuesto_consultas: "int | None" = None
@@ -24,6 +24,7 @@ class VistaListaContexto(TypedDict):
     form_con_orden: bool
     permisos: PermisosVistaLista
     no_hay_objetos: bool
+    sin_resultados: bool
     modelos_relacionados: "list[str]"
     lista_reemplazada_por_htmx: NotRequired[bool]
     mensajes_recibidos: NotRequired[bool]
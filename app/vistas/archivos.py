@@ -0,0 +1,31 @@
+import os
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpRequest
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+# tiempo que el navegador puede reutilizar un archivo subido sin volver a pedirlo
+TIEMPO_CACHE_ARCHIVOS = 60 * 60
+
+
+@login_required
+@require_GET
+def archivo_subido(request: HttpRequest, ruta: str):
+    """Sirve los archivos subidos por los usuarios (ej: las fotos de perfil) a los usuarios que iniciaron sesión. Solo se sirven archivos dentro de MEDIA_ROOT, y el archivo se envía por partes sin cargarlo en memoria"""
+
+    try:
+        ruta_completa = safe_join(settings.MEDIA_ROOT, ruta)
+    except SuspiciousFileOperation:
+        raise Http404
+
+    if not os.path.isfile(ruta_completa):
+        raise Http404
+
+    respuesta = FileResponse(open(ruta_completa, "rb"))
+    # el archivo solo lo pueden ver los usuarios con sesión, por lo que no se guarda en cachés compartidas
+    patch_cache_control(respuesta, private=True, max_age=TIEMPO_CACHE_ARCHIVOS)
+
+    return respuesta
@@ -0,0 +1,29 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, JsonResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+from app.busqueda import buscar
+
+
+@login_required
+@require_GET
+def busqueda_global(request: HttpRequest):
+    """Búsqueda de la barra lateral. Retorna los resultados como fragmento HTML, o como JSON si se pide con "formato=json" o con el header Accept"""
+
+    texto = request.GET.get("q", "")
+    resultados = buscar(request.user, texto)
+
+    # no se usa request.accepts, ya que también acepta JSON con "Accept: */*"
+    pide_json = request.GET.get("formato") == "json"
+    pide_json |= "application/json" in request.headers.get("Accept", "")
+
+    if pide_json:
+        return JsonResponse(
+            {"resultados": [resultado._asdict() for resultado in resultados]}
+        )
+
+    return render(
+        request,
+        "componentes/barra-lateral/resultados-busqueda.html",
+        {"resultados": resultados, "texto": texto.strip()},
+    )
@@ -0,0 +1,108 @@
+import hashlib
+from typing import NamedTuple
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import models
+from django.db.models import Count, Q
+from app.cache import obtener_generacion
+
+
+# tiempo máximo que se guarda un total, por si se modifican los registros sin enviar señales
+TIEMPO_CACHE_TOTALES = 60 * 10
+
+
+class EstadisticasLista(NamedTuple):
+    """Cantidades de una lista de objetos: el total sin filtrar y la cantidad luego de aplicar los filtros"""
+
+    total: int
+    filtradas: int
+
+    @property
+    def no_hay_objetos(self):
+        return self.total == 0
+
+    @property
+    def sin_resultados(self):
+        return self.filtradas == 0
+
+
+def clave_total(queryset: models.QuerySet) -> "str | None":
+    """Clave de la caché para el total del queryset. Incluye la generación del modelo, por lo que cambia al modificarse sus registros"""
+
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        return None
+
+    return "lista:total:{}:{}:{}".format(
+        queryset.model._meta.label_lower,
+        obtener_generacion(queryset.model),
+        hashlib.md5(sql.encode()).hexdigest(),
+    )
+
+
+def obtener_total_en_cache(queryset: models.QuerySet) -> int:
+    """Obtiene la cantidad de registros del queryset, guardándola en caché hasta que se modifique el modelo"""
+
+    clave = clave_total(queryset)
+
+    if clave is None:
+        return 0
+
+    total = cache.get(clave)
+
+    if total is None:
+        total = queryset.count()
+        cache.set(clave, total, TIEMPO_CACHE_TOTALES)
+
+    return total
+
+
+def hay_registros_en_cache(queryset: models.QuerySet) -> bool:
+    """Indica si el queryset tiene al menos un registro. Usa el total si ya está en caché y, si no, guarda el resultado de exists() hasta que se modifique el modelo, para no contar todos los registros"""
+
+    clave = clave_total(queryset)
+
+    if clave is None:
+        return False
+
+    total = cache.get(clave)
+
+    if total is not None:
+        return total > 0
+
+    clave_existe = f"{clave}:existe"
+    existe = cache.get(clave_existe)
+
+    if existe is None:
+        existe = queryset.exists()
+        cache.set(clave_existe, existe, TIEMPO_CACHE_TOTALES)
+
+    return existe
+
+
+def calcular_estadisticas(
+    queryset_filtrado: models.QuerySet, queryset_total: models.QuerySet
+) -> EstadisticasLista:
+    """Obtiene el total (en caché) y la cantidad filtrada de una lista. Si el total no está en caché y ambos querysets son del mismo modelo, se obtienen las dos cantidades en una sola consulta"""
+
+    clave = clave_total(queryset_total)
+    total = cache.get(clave) if clave else 0
+
+    if total is not None:
+        return EstadisticasLista(total, queryset_filtrado.count())
+
+    if queryset_filtrado.model is queryset_total.model:
+        cantidades = queryset_total.aggregate(
+            total=Count("pk"),
+            filtradas=Count(
+                "pk", filter=Q(pk__in=queryset_filtrado.order_by().values("pk"))
+            ),
+        )
+        total, filtradas = cantidades["total"], cantidades["filtradas"]
+    else:
+        total, filtradas = queryset_total.count(), queryset_filtrado.count()
+
+    cache.set(clave, total, TIEMPO_CACHE_TOTALES)
+
+    return EstadisticasLista(total, filtradas)
@@ -0,0 +1,218 @@
+import csv
+import datetime
+import io
+import zipfile
+from typing import Any, Callable, Iterable, Iterator, Sequence, Type
+from xml.sax.saxutils import escape
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from app.filtros import es_ruta_multiple, obtener_campo
+from app.vistas._tipos import ColumnaFija
+
+# registros que se obtienen de la base de datos por consulta al exportar
+TAMAÑO_LOTE_EXPORTACION = 2000
+
+FORMATOS_EXPORTACION = ("csv", "xlsx")
+
+
+def columnas_exportables(
+    queryset: models.QuerySet, columnas: "Iterable[ColumnaFija]"
+) -> "list[ColumnaFija]":
+    """Las columnas que se pueden obtener con values(): anotaciones del queryset o campos del modelo que no pasen por relaciones a muchos (que repetirían los registros)"""
+
+    exportables = []
+
+    for columna in columnas:
+        clave = columna["clave"]
+
+        if clave in queryset.query.annotations or (
+            obtener_campo(queryset.model, clave) is not None
+            and not es_ruta_multiple(queryset.model, clave)
+        ):
+            exportables.append(columna)
+
+    return exportables
+
+
+def crear_formateador(
+    modelo: "Type[models.Model]", clave: str
+) -> "Callable[[Any], Any]":
+    """Convierte el valor de una columna en el que se muestra en el archivo. Las opciones se muestran con su etiqueta (ej: "M" -> "Masculino")"""
+
+    campo = obtener_campo(modelo, clave)
+    opciones = dict(campo.flatchoices) if campo is not None and campo.choices else None
+
+    def formatear(valor):
+        if valor is None:
+            return ""
+
+        if opciones is not None:
+            return str(opciones.get(valor, valor))
+
+        if isinstance(valor, bool):
+            return "Sí" if valor else "No"
+
+        if isinstance(valor, datetime.datetime):
+            if timezone.is_aware(valor):
+                valor = timezone.localtime(valor)
+
+            return valor.strftime("%Y-%m-%d %H:%M")
+
+        if isinstance(valor, datetime.date):
+            return valor.isoformat()
+
+        return valor
+
+    return formatear
+
+
+def obtener_filas(
+    queryset: models.QuerySet, columnas: "Sequence[ColumnaFija]"
+) -> "Iterator[list[Any]]":
+    """Recorre el queryset por lotes obteniendo solo las columnas a exportar, por lo que la memoria usada no depende de la cantidad de registros"""
+
+    claves = [columna["clave"] for columna in columnas]
+    formateadores = [crear_formateador(queryset.model, clave) for clave in claves]
+
+    # prefetch_related no tiene efecto con values() y no se puede usar con iterator() sin chunk_size
+    filas = (
+        queryset.prefetch_related(None)
+        .values_list(*claves)
+        .iterator(chunk_size=TAMAÑO_LOTE_EXPORTACION)
+    )
+
+    for fila in filas:
+        yield [formatear(valor) for formatear, valor in zip(formateadores, fila)]
+
+
+class _Eco:
+    """Archivo que retorna lo que se escribe en él, para que csv.writer produzca las líneas sin guardarlas"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(
+    titulos: "Sequence[str]", filas: "Iterable[Sequence[Any]]"
+) -> "Iterator[str]":
+    escritor = csv.writer(_Eco())
+
+    # BOM, para que Excel reconozca la codificación
+    yield "﻿" + escritor.writerow(titulos)
+
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+class _BufferZip(io.RawIOBase):
+    """Destino del zip del XLSX. No se puede buscar en él, por lo que zipfile escribe el archivo de forma secuencial, y lo escrito se va vaciando al enviarlo"""
+
+    def __init__(self):
+        self.partes: "list[bytes]" = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+XLSX_ARCHIVOS_FIJOS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+
+def celda_xlsx(valor: Any) -> str:
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f"<c><v>{valor}</v></c>"
+
+    texto = escape(str(valor))
+
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def generar_xlsx(
+    titulos: "Sequence[str]", filas: "Iterable[Sequence[Any]]"
+) -> "Iterator[bytes]":
+    """Genera un XLSX mínimo (una hoja, textos en línea) sin dependencias externas. Se envía por partes a medida que se escriben las filas"""
+
+    buffer = _BufferZip()
+
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archivo_zip:
+        for nombre, contenido in XLSX_ARCHIVOS_FIJOS.items():
+            archivo_zip.writestr(nombre, contenido)
+
+        with archivo_zip.open(
+            "xl/worksheets/sheet1.xml", "w", force_zip64=True
+        ) as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+
+            hoja.write(f"<row>{''.join(map(celda_xlsx, titulos))}</row>".encode())
+
+            for i, fila in enumerate(filas, start=1):
+                hoja.write(f"<row>{''.join(map(celda_xlsx, fila))}</row>".encode())
+
+                if i % TAMAÑO_LOTE_EXPORTACION == 0:
+                    yield buffer.vaciar()
+
+            hoja.write(b"</sheetData></worksheet>")
+
+    yield buffer.vaciar()
+
+
+def respuesta_exportacion(
+    formato: str,
+    nombre_archivo: str,
+    titulos: "Sequence[str]",
+    filas: "Iterable[Sequence[Any]]",
+) -> StreamingHttpResponse:
+    if formato == "xlsx":
+        contenido = generar_xlsx(titulos, filas)
+        tipo = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        contenido = generar_csv(titulos, filas)
+        tipo = "text/csv; charset=utf-8"
+
+    respuesta = StreamingHttpResponse(contenido, content_type=tipo)
+    respuesta["Content-Disposition"] = content_disposition_header(
+        True, f"{nombre_archivo}.{formato}"
+    )
+
+    return respuesta
@@ -0,0 +1,98 @@
+import datetime
+import decimal
+import hashlib
+import json
+from typing import Any, Iterable, Mapping, Type
+from django.db import models
+from app.cache import obtener_generaciones
+
+# tiempo máximo que se guarda un fragmento. Acota los datos que cambian sin pasar por los modelos (ej: el lapso actual según la fecha)
+TIEMPO_CACHE_FRAGMENTOS = 60 * 10
+
+
+def normalizar_valor(valor: Any) -> Any:
+    """Convierte el valor de un campo del form de filtros en un valor serializable y estable: los objetos se reemplazan por su pk y las listas se ordenan, para que el mismo filtro produzca siempre la misma clave"""
+
+    if isinstance(valor, models.Model):
+        return valor.pk
+
+    if isinstance(valor, (models.QuerySet, list, tuple, set, frozenset)):
+        return sorted((normalizar_valor(v) for v in valor), key=str)
+
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+
+    return str(valor)
+
+
+def normalizar_estado(datos: "Mapping[str, Any]") -> "dict[str, Any]":
+    """Estado de los filtros sin los campos vacíos, que equivalen a no filtrar"""
+
+    return {
+        nombre: normalizar_valor(valor)
+        for nombre, valor in datos.items()
+        if valor not in (None, "", [], ())
+        and not (isinstance(valor, models.QuerySet) and not valor)
+    }
+
+
+def clave_permisos(usuario) -> str:
+    """Identifica el conjunto de permisos del usuario, de forma que los usuarios con los mismos permisos comparten los fragmentos"""
+
+    if usuario.is_superuser:
+        return "superusuario"
+
+    permisos = sorted(usuario.get_all_permissions())
+
+    return hashlib.md5("|".join(permisos).encode()).hexdigest()
+
+
+def clave_fragmento(
+    vista: str,
+    estado: "Mapping[str, Any]",
+    pagina: "Mapping[str, Any]",
+    permisos: str,
+    modelos: "Iterable[Type[models.Model]]",
+    extra: str = "",
+) -> str:
+    """Clave de la caché de un fragmento de una lista. Al incluir la generación de cada modelo del que depende, cualquier escritura en ellos la invalida"""
+
+    modelos = sorted(modelos, key=lambda modelo: modelo._meta.label_lower)
+    generaciones = obtener_generaciones(*modelos)
+
+    contenido = json.dumps(
+        {
+            "estado": normalizar_estado(estado),
+            "pagina": pagina,
+            "permisos": permisos,
+            "extra": extra,
+            "generaciones": [
+                (modelo._meta.label_lower, generacion)
+                for modelo, generacion in zip(modelos, generaciones)
+            ],
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+    return f"lista:fragmento:{vista}:{hashlib.md5(contenido.encode()).hexdigest()}"
+
+
+def obtener_modelos_relacionados(
+    modelo: "Type[models.Model]",
+) -> "set[Type[models.Model]]":
+    """El modelo y los modelos con los que se relaciona directamente (en ambas direcciones), de los que suele depender una lista. Los cambios en las relaciones muchos a muchos incrementan la generación de ambos lados"""
+
+    modelos = {modelo}
+
+    for campo in modelo._meta.get_fields():
+        if campo.is_relation and campo.related_model is not None:
+            modelos.add(campo.related_model)  # type: ignore - sí es un modelo
+
+    return modelos
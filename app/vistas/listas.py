@@ -1,8 +1,47 @@
-from typing import Mapping, Sequence, Type, Any
+from typing import Callable, Mapping, Sequence, Type, Any
+from django.core.cache import cache
 from django.db import models
 from django.shortcuts import render
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.text import capfirst
 from django.views.generic import ListView
-from app.forms import BusquedaFormMixin, DireccionesOrden, OrdenFormMixin
+from app.trabajos import (
+    ErrorTrabajo,
+    MensajesTrabajo,
+    iniciar_trabajo,
+    obtener_trabajo,
+)
+from app.forms import (
+    BusquedaFormMixin,
+    DireccionesOrden,
+    FiltrosFormMixin,
+    OrdenFormMixin,
+)
+from app.vistas.estadisticas import (
+    EstadisticasLista,
+    calcular_estadisticas,
+    hay_registros_en_cache,
+    obtener_total_en_cache,
+)
+from app.vistas.exportacion import (
+    FORMATOS_EXPORTACION,
+    columnas_exportables,
+    obtener_filas,
+    respuesta_exportacion,
+)
+from app.vistas.fragmentos import (
+    TIEMPO_CACHE_FRAGMENTOS,
+    clave_fragmento,
+    clave_permisos,
+    obtener_modelos_relacionados,
+)
+from app.vistas.paginacion import (
+    PaginaCursor,
+    orden_admite_cursor,
+    paginar_por_cursor,
+)
+from app.vistas.proyeccion import proyectar_columnas
 from app.vistas._tipos import (
     Columna,
     ColumnaFija,
@@ -21,8 +60,11 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
     HttpResponseNotAllowed,
+    HttpResponseNotFound,
     QueryDict,
+    StreamingHttpResponse,
 )
+from usuarios.models import EstadosTrabajo, Trabajo
 
 
 class FormFiltrosMixin:
@@ -30,6 +72,7 @@ class FormFiltrosMixin:
     form_filtros: Type[BusquedaFormMixin]
     kwargs: dict
     page_kwarg: str
+    datos_form_filtros: "dict[str, Any] | Mapping[str, Any] | None" = None
 
     def usar_filtros(self, queryset: models.QuerySet):
         if hasattr(self, "form_filtros"):
@@ -53,7 +96,11 @@ class FormFiltrosMixin:
         queryset: models.QuerySet,
         datos_form: "dict[str, Any] | Mapping[str, Any]",
     ):
-        queryset = self.aplicar_busqueda(queryset, datos_form)
+        """Modifica el queryset de acuerdo a los filtros declarados en el form de filtros (incluidas las búsquedas textuales). Todos se combinan en un solo filtro"""
+
+        if isinstance(self.form_filtros, FiltrosFormMixin):
+            return self.form_filtros.plan_filtros.aplicar(queryset, datos_form)
+
         return queryset
 
     def aplicar_busqueda(
@@ -61,41 +108,12 @@ class FormFiltrosMixin:
         queryset: models.QuerySet,
         datos_form: "dict[str, Any] | Mapping[str, Any]",
     ):
-        """Modifica el queryset de acuerdo a los filtros indicados en el form de filtros. Por defecto, verifica si se trata de un form de busqueda textual y aplica las búsquedas si es necesario."""
+        """Modifica el queryset aplicando solo las búsquedas textuales del form de filtros. Se aplican todos los campos de búsqueda con valor, no solo el primero"""
 
         if isinstance(self.form_filtros, BusquedaFormMixin):
-            for campo in self.form_filtros:
-                # cada campo debe tener el atributo "nombre_columna_db" que indica el nombre de la columna de la base de datos
-                if not hasattr(campo.field, "nombre_columna_db"):
-                    continue
-
-                nombre_columna_db: "str | None" = getattr(
-                    campo.field, "nombre_columna_db"
-                )
-
-                if not nombre_columna_db:
-                    continue
-
-                # obtener el valor de la búsqueda
-                q: "str | None" = datos_form.get(campo.name)
-
-                if not q:
-                    continue
-
-                # cada campo debe tener el atributo "tipo_" + nombre del campo. Este indica el tipo de búsqueda a realizar
-                tipo_q = datos_form.get(f"tipo_{campo.name}")
-
-                if not tipo_q:
-                    tipo_q = "icontains"
-
-                if not isinstance(q, str):
-                    continue
-
-                q = q.strip()
-                if q == "":
-                    continue
-
-                return queryset.filter(**{f"{nombre_columna_db}__{tipo_q}": q})
+            return self.form_filtros.plan_filtros.aplicar(
+                queryset, datos_form, solo_busqueda=True
+            )
 
         return queryset
 
@@ -127,12 +145,20 @@ class FormFiltrosMixin:
     def inicializar_form_filtros(self):
         """Establece los datos del form de filtros según el método de la request, los valida y, si son válidos los retorna, si no retorna los valores por defecto."""
 
+        # ya se inicializó en esta request (ej: para obtener la clave de la caché)
+        if self.datos_form_filtros is not None:
+            return self.datos_form_filtros
+
+        datos_exportacion = self.datos_exportacion()
+
         # al crear el form de filtros, se debe distinguir entre GET y los otros métodos, ya que por alguna razón GET no funciona correctamente (evita que se recuperen los datos de las cookies) si se le pasan los datos
-        if self.request.method == "GET":
+        if self.request.method == "GET" and not datos_exportacion:
             self.form_filtros = self.form_filtros(request=self.request)  # type: ignore
         else:
             if self.request.method == "POST":
                 datos = self.request.POST
+            elif datos_exportacion:
+                datos = datos_exportacion
             elif self.request.method == "PUT" and self.request.body:
                 datos = QueryDict(self.request.body)  # type: ignore
             elif self.request.method == "DELETE":
@@ -147,9 +173,21 @@ class FormFiltrosMixin:
             )
 
         if self.form_filtros.is_valid():  # type: ignore - sí se pasa "self"
-            return self.form_filtros.cleaned_data
+            self.datos_form_filtros = self.form_filtros.cleaned_data
         else:
-            return self.form_filtros.initial
+            self.datos_form_filtros = self.form_filtros.initial
+
+        return self.datos_form_filtros
+
+    def datos_exportacion(self) -> "QueryDict | None":
+        """Al exportar, el enlace envía los datos actuales del form de filtros, ya que las búsquedas textuales no se guardan en las cookies"""
+
+        datos = self.request.GET.copy()
+
+        if datos.pop("exportar", None) and datos:
+            return datos
+
+        return None
 
     # aplicación de filtros por POST
     def post(self, request: HttpRequest, *args, **kwargs):
@@ -235,6 +273,25 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
     ordering = "id"
     # si se quiere agrupar los resultados
     agrupados = False
+    # si se pagina por cursor (keyset) en lugar de por número de página. Evita OFFSET y COUNT en listas grandes, a cambio de solo poder avanzar o retroceder de página en página
+    paginacion_cursor = False
+    pagina_cursor: "PaginaCursor | None" = None
+    estadisticas: "EstadisticasLista | None" = None
+    # si se guardan en caché los fragmentos de la lista (las respuestas que solo reemplazan la lista, al filtrar o cambiar de página). Se invalidan al modificarse el modelo de la vista, sus modelos relacionados o los de "modelos_cache"
+    cache_fragmentos = True
+    modelos_cache: "tuple[Type[models.Model], ...]" = ()
+    # si se puede descargar la lista (con los filtros y el orden activos) en alguno de "formatos_exportacion"
+    exportable = True
+    formatos_exportacion = FORMATOS_EXPORTACION
+    # columnas de los archivos exportados. Por defecto las columnas de la tabla o, si no hay, los campos del modelo
+    columnas_exportacion: "tuple[ColumnaFija, ...]" = ()
+    # las acciones (PUT y DELETE) sobre más de esta cantidad de registros se procesan por lotes en segundo plano, mostrando su progreso. None para procesarlas siempre en la petición
+    umbral_segundo_plano: "int | None" = 200
+    tamaño_lote_segundo_plano = 100
+    # campos que siempre se obtienen aunque no sean columnas (ej: los que muestran las tarjetas de la lista o usan sus enlaces). Si se indican, o si la vista tiene columnas, solo se obtienen esos campos y los de las columnas (ver obtener_columnas_proyectadas)
+    campos_requeridos: "tuple[str, ...]" = ()
+    # si las filas se obtienen como diccionarios (values()) en lugar de instancias del modelo
+    filas_como_valores = False
 
     def __init__(self):
         """Establece automáticamente los atributos url_crear y url_editar si no se han establecido. Estos se usan en el html de la vista para indicar los enlaces para crear y editar el tipo de objeto de la vista en cuestión."""
@@ -255,9 +312,66 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
             raise ValueError("Se debe indicar un queryset")
 
         queryset = self.usar_filtros(queryset)
+        columnas = self.obtener_columnas_proyectadas()
+
+        if isinstance(queryset, models.QuerySet) and (
+            columnas or self.campos_requeridos
+        ):
+            queryset = proyectar_columnas(
+                queryset, columnas, self.campos_requeridos, self.filas_como_valores
+            )
 
         return queryset
 
+    def obtener_columnas_proyectadas(self) -> "Sequence[Columna]":
+        """Columnas cuyos campos se obtienen del queryset (ver proyectar_columnas). Por defecto las de "columnas_totales", si la vista las tiene"""
+
+        return getattr(self, "columnas_totales", ())
+
+    def paginate_queryset(self, queryset, page_size):
+        """Si se usa la paginación por cursor, se obtiene la página a partir de los tokens "despues" o "antes" recibidos. En ese caso no se crea un "Paginator" y se indica que la lista no está paginada, para que no se intente contar los registros"""
+
+        # con un orden que no admite cursores (ej: elegido en el form de orden) se pagina por número de página
+        if not self.paginacion_cursor or not orden_admite_cursor(queryset):
+            return super().paginate_queryset(queryset, page_size)
+
+        datos = self.request.POST if self.request.method == "POST" else self.request.GET
+
+        self.pagina_cursor = paginar_por_cursor(
+            queryset,
+            page_size,
+            despues=datos.get("despues"),
+            antes=datos.get("antes"),
+        )
+
+        return (None, self.pagina_cursor, self.pagina_cursor.object_list, False)
+
+    def get_paginator(self, queryset, per_page, *args, **kwargs):
+        """Al crear el paginador se obtienen las estadísticas de la lista, usando la cantidad filtrada como la cantidad del paginador para que este no tenga que volver a contar los registros"""
+
+        paginator = super().get_paginator(queryset, per_page, *args, **kwargs)
+
+        self.estadisticas = self.obtener_estadisticas(queryset)
+
+        if self.estadisticas is not None:
+            paginator.count = self.estadisticas.filtradas
+
+        return paginator
+
+    def obtener_queryset_total(self) -> models.QuerySet:
+        """Retorna el queryset cuyos registros forman el total (sin filtrar) de la lista. Por defecto, todos los registros del modelo"""
+        return self.model.objects.all()
+
+    def obtener_estadisticas(
+        self, queryset: "models.QuerySet | list[Any]"
+    ) -> "EstadisticasLista | None":
+        """Obtiene el total sin filtrar y la cantidad filtrada de la lista en una sola consulta (o ninguna, si el total ya está en caché). Retorna None si la lista no es un queryset, para calcular las cantidades de la forma anterior"""
+
+        if not isinstance(queryset, models.QuerySet):
+            return None
+
+        return calcular_estadisticas(queryset, self.obtener_queryset_total())
+
     def agrupar_queryset(self, lista_objetos: models.QuerySet) -> models.QuerySet:
         """Agrupa el queryset de acuerdo otro modelo relacionado. Retorna una lista con los objetos del modelo principal para cada objeto del modelo relacionado"""
         raise NotImplementedError
@@ -283,8 +397,15 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
                 self.object_list  # type: ignore - sí es un queryset
             )
 
+        # la lista no se paginó, por lo que aún no se obtienen las estadísticas
+        if self.estadisticas is None and self.pagina_cursor is None:
+            self.estadisticas = self.obtener_estadisticas(self.object_list)  # type: ignore - sí es un queryset
+
         self.total = self.obtener_total(ctx)
 
+        if self.cantidad_filtradas is None and self.estadisticas is not None:
+            self.cantidad_filtradas = self.estadisticas.filtradas
+
         ctx.update(
             VistaListaContexto(
                 form_filtros=self.form_filtros
@@ -314,35 +435,175 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
 
         return ctx
 
-    def obtener_total(self, ctx: "dict[str, Any]") -> int:
+    def obtener_total(self, ctx: "dict[str, Any]") -> "int | None":
         """Obtiene el total de objetos del modelo indicado en la base de datos"""
+        # con el cursor no se cuentan los registros. Si el orden no admitía cursores, se paginó por número de página y sí se tienen las cantidades
+        if self.pagina_cursor is not None:
+            return None
+
+        if self.estadisticas is not None:
+            return self.estadisticas.total
+
         if not ctx["is_paginated"]:
-            return self.model.objects.count()
+            return obtener_total_en_cache(self.obtener_queryset_total())
         else:
             return ctx["page_obj"].paginator.count
 
     def al_menos_uno(self):
-        """Verifica si hay al menos un objeto del modelo indicado en la base de datos. Se usa cuando no se define el atributo "total" """
-        return self.model.objects.exists()
+        """Verifica si hay al menos un registro en el queryset del total de la lista. Se usa cuando no se define el atributo "total" """
+        return hay_registros_en_cache(self.obtener_queryset_total())
 
     def sin_resultados(self) -> bool:
+        if self.pagina_cursor is not None:
+            return (
+                len(self.pagina_cursor) == 0 and not self.pagina_cursor.tiene_anterior
+            )
+
+        if self.estadisticas is not None:
+            return self.estadisticas.sin_resultados
+
         if isinstance(self.object_list, list):
             return len(self.object_list) == 0
 
         """Verifica si la búsqueda no arroja resultados."""
         return self.object_list.count() == 0  # type: ignore - sí es un queryset
 
+    def obtener_modelos_cache(self) -> "set[Type[models.Model]]":
+        """Modelos de los que dependen los datos de la lista. Por defecto el modelo de la vista, los modelos con los que se relaciona directamente y los indicados en "modelos_cache" """
+        return obtener_modelos_relacionados(self.model) | set(self.modelos_cache)
+
+    def obtener_clave_cache_extra(self) -> str:
+        """Datos adicionales para la clave de los fragmentos, para las listas que no solo dependen de los permisos del usuario (ej: las tareas propias de un profesor)"""
+        return ""
+
+    def obtener_clave_fragmento(self) -> "str | None":
+        """Clave del fragmento de la lista según la vista, los filtros, la página, los permisos del usuario y la generación de los modelos. Retorna None si no se debe usar la caché"""
+
+        if not self.cache_fragmentos:
+            return None
+
+        estado = (
+            self.inicializar_form_filtros() if hasattr(self, "form_filtros") else {}
+        )
+        datos = self.request.POST if self.request.method == "POST" else self.request.GET
+
+        pagina = {
+            nombre: datos.get(nombre)
+            for nombre in (self.page_kwarg, "despues", "antes")
+            if datos.get(nombre)
+        }
+
+        return clave_fragmento(
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            estado,
+            pagina,
+            clave_permisos(self.request.user),
+            self.obtener_modelos_cache(),
+            self.obtener_clave_cache_extra(),
+        )
+
+    def responder_fragmento(
+        self, request: HttpRequest, generar: "Callable[[], HttpResponse]"
+    ) -> HttpResponse:
+        """Retorna el fragmento de la lista desde la caché si existe. Si no, lo genera y lo guarda luego de renderizarlo"""
+
+        clave = self.obtener_clave_fragmento()
+
+        if clave is None:
+            return generar()
+
+        contenido = cache.get(clave)
+
+        if contenido is not None:
+            respuesta = HttpResponse(contenido)
+
+            # se guardan los filtros en las cookies igual que al generar la lista
+            if request.method == "POST" and self.form_filtros.is_valid():  # type: ignore - sí se pasa "self"
+                self.form_filtros.guardar_en_cookies(respuesta)  # type: ignore - sí se pasa "self"
+
+            return respuesta
+
+        respuesta = generar()
+
+        if isinstance(respuesta, TemplateResponse) and respuesta.status_code == 200:
+            respuesta.add_post_render_callback(
+                lambda r: cache.set(clave, r.content, TIEMPO_CACHE_FRAGMENTOS)
+            )
+
+        return respuesta
+
+    def post(self, request: HttpRequest, *args, **kwargs):
+        if not hasattr(self, "form_filtros"):
+            return super().post(request, *args, **kwargs)
+
+        return self.responder_fragmento(
+            request,
+            lambda: super(VistaListaObjetos, self).post(request, *args, **kwargs),
+        )
+
     def get(self, request: HttpRequest, *args, **kwargs):
-        respuesta = super().get(request, *args, **kwargs)
+        if id_trabajo := request.GET.get("trabajo"):
+            return self.progreso_trabajo(request, id_trabajo, *args, **kwargs)
+
+        formato = request.GET.get("exportar")
+
+        if self.exportable and formato in self.formatos_exportacion:
+            return self.exportar(formato)
 
         # cambio de página
-        if self.paginate_by is not None:
-            if request.GET.get("solo_tabla"):
-                respuesta.context_data["lista_reemplazada_por_htmx"] = 1  # type: ignore
-                respuesta.template_name = self.plantilla_lista  # type: ignore
+        if self.paginate_by is not None and request.GET.get("solo_tabla"):
+            return self.responder_fragmento(
+                request, lambda: self.obtener_solo_tabla(request, *args, **kwargs)
+            )
+
+        return super().get(request, *args, **kwargs)
+
+    def obtener_solo_tabla(self, request: HttpRequest, *args, **kwargs):
+        respuesta = super().get(request, *args, **kwargs)
+        respuesta.context_data["lista_reemplazada_por_htmx"] = 1  # type: ignore
+        respuesta.template_name = self.plantilla_lista  # type: ignore
 
         return respuesta
 
+    def obtener_columnas_exportacion(self) -> "Sequence[ColumnaFija]":
+        if self.columnas_exportacion:
+            return self.columnas_exportacion
+
+        if columnas_totales := getattr(self, "columnas_totales", None):
+            return columnas_totales
+
+        # igual que en las tablas, no se incluyen el id ni las relaciones (que solo mostrarían el id del objeto relacionado)
+        return [
+            {"clave": campo.name, "titulo": capfirst(campo.verbose_name)}
+            for campo in self.model._meta.fields
+            if campo.name != "id" and campo.editable and not campo.is_relation
+        ]
+
+    def obtener_queryset_exportacion(self) -> models.QuerySet:
+        """Retorna el queryset a exportar. Por defecto el de la lista, con los filtros y el orden activos, que debe ser un queryset (no una lista agrupada)"""
+
+        queryset = self.get_queryset()
+
+        if not isinstance(queryset, models.QuerySet):
+            raise NotImplementedError(
+                "Las listas que no usan un queryset deben indicar el queryset a exportar"
+            )
+
+        return queryset
+
+    def exportar(self, formato: str) -> StreamingHttpResponse:
+        """Descarga los registros de la lista en el formato indicado. Se envían a medida que se leen de la base de datos, sin cargarlos todos en memoria"""
+
+        queryset = self.obtener_queryset_exportacion()
+        columnas = columnas_exportables(queryset, self.obtener_columnas_exportacion())
+
+        return respuesta_exportacion(
+            formato,
+            f"{self.model._meta.verbose_name_plural}-{timezone.localdate().isoformat()}",
+            [str(columna["titulo"]) for columna in columnas],
+            obtener_filas(queryset, columnas),
+        )
+
     def http_method_not_allowed(self, request, *args, **kwargs):
         # Customize the response for unsupported methods
         return HttpResponseNotAllowed(
@@ -367,6 +628,11 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
                 f"No se indicó una lista de {self.ids_objetos_kwarg}"
             )
 
+        if self.usar_segundo_plano("put", ids):
+            return self.actualizar_en_segundo_plano(
+                request, ids, datos, *args, **kwargs
+            )
+
         respuesta = self.actualizar(request, ids, datos, *args, **kwargs)
 
         if isinstance(respuesta, HttpResponse):
@@ -397,6 +663,9 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
                 f"No se indicó una lista de {self.ids_objetos_kwarg}"
             )
 
+        if self.usar_segundo_plano("delete", ids):
+            return self.eliminar_en_segundo_plano(request, ids)
+
         respuesta = self.eliminar(request, ids)
 
         if isinstance(respuesta, HttpResponse):
@@ -417,6 +686,151 @@ class VistaListaObjetos(Vista, FormFiltrosMixin, ListView):
 
         return self.model.objects.filter(id__in=ids).delete()
 
+    def usar_segundo_plano(self, metodo: Metodo, ids: "list[str]") -> bool:
+        """Indica si la acción se procesa en segundo plano. Por defecto, si la cantidad de registros supera "umbral_segundo_plano" """
+
+        return (
+            self.umbral_segundo_plano is not None
+            and len(ids) > self.umbral_segundo_plano
+        )
+
+    def iniciar_trabajo(
+        self,
+        request: HttpRequest,
+        metodo: Metodo,
+        descripcion: str,
+        ids: "list[str]",
+        datos: str = "",
+    ) -> HttpResponse:
+        """Guarda la acción como un trabajo que procesa esta misma vista por lotes (ver procesar_lote_trabajo), y responde con su progreso"""
+
+        trabajo = iniciar_trabajo(
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            self.kwargs,
+            metodo,
+            descripcion,
+            ids,
+            datos,
+            self.tamaño_lote_segundo_plano,
+            request.user,
+        )
+
+        return self.respuesta_progreso(request, trabajo)
+
+    def actualizar_en_segundo_plano(
+        self, request: HttpRequest, ids: "list[str]", datos: QueryDict, *args, **kwargs
+    ) -> HttpResponse:
+        return self.iniciar_trabajo(
+            request,
+            "put",
+            f"Actualizando {len(ids)} {self.nombre_objeto_plural}",
+            ids,
+            datos.urlencode(),
+        )
+
+    def eliminar_en_segundo_plano(
+        self, request: HttpRequest, ids: "list[str]"
+    ) -> HttpResponse:
+        return self.iniciar_trabajo(
+            request,
+            "delete",
+            f"Eliminando {len(ids)} {self.nombre_objeto_plural}",
+            ids,
+        )
+
+    def peticion_trabajo(self, trabajo: Trabajo) -> HttpRequest:
+        """Petición con la que se procesan los lotes, del usuario que inició el trabajo. Sus mensajes se guardan en el trabajo y se muestran al consultar su progreso"""
+
+        peticion = HttpRequest()
+        peticion.method = trabajo.tipo.upper()
+        peticion.user = trabajo.usuario
+        peticion._messages = MensajesTrabajo(trabajo.resultado.get("mensajes"))  # type: ignore - se reemplaza el almacenamiento
+
+        return peticion
+
+    def procesar_lote_trabajo(self, trabajo: Trabajo, lote: "list[str]"):
+        """Procesa un lote de un trabajo iniciado por esta vista (ver app.trabajos), con "actualizar" o "eliminar". Con "actualizar", los datos de cada lote indican solo los ids del lote"""
+
+        peticion = self.peticion_trabajo(trabajo)
+        self.setup(peticion, **trabajo.argumentos)
+        resultado = trabajo.resultado
+
+        if trabajo.tipo == "put":
+            datos = QueryDict(trabajo.datos, mutable=True)
+            datos.setlist(self.ids_objetos_kwarg, lote)
+
+            respuesta = self.actualizar(peticion, lote, datos, **trabajo.argumentos)
+        else:
+            respuesta = self.eliminar(peticion, lote)
+
+            if not isinstance(respuesta, HttpResponse):
+                eliminados, por_modelo = respuesta
+
+                resultado["eliminados"] = resultado.get("eliminados", 0) + eliminados
+                total_por_modelo = resultado.setdefault("por_modelo", {})
+
+                for modelo, cantidad in por_modelo.items():
+                    total_por_modelo[modelo] = (
+                        total_por_modelo.get(modelo, 0) + cantidad
+                    )
+
+        if isinstance(respuesta, HttpResponse) and respuesta.status_code >= 400:
+            raise ErrorTrabajo(respuesta.content.decode())
+
+        resultado["mensajes"] = peticion._messages.mensajes  # type: ignore - es un MensajesTrabajo
+
+    def respuesta_progreso(self, request: HttpRequest, trabajo: Trabajo):
+        """Fragmento que reemplaza a la lista mientras el trabajo no termina. Se consulta periódicamente con HTMX, y al terminar se reemplaza por la lista actualizada"""
+
+        return render(
+            request,
+            "componentes/vista-lista/progreso-trabajo.html",
+            {"view": self, "trabajo": trabajo},
+        )
+
+    def progreso_trabajo(
+        self, request: HttpRequest, id_trabajo: str, *args, **kwargs
+    ) -> HttpResponse:
+        trabajo = obtener_trabajo(id_trabajo, request.user)
+
+        if trabajo is None:
+            return HttpResponseNotFound("La acción no existe o ya expiró")
+
+        if not trabajo.terminado:
+            return self.respuesta_progreso(request, trabajo)
+
+        self.mensajes_luego_trabajo(request, trabajo)
+
+        return self.actualizar_lista(request, *args, **kwargs)
+
+    def mensajes_luego_trabajo(self, request: HttpRequest, trabajo: Trabajo):
+        """Envía los mensajes del resultado de un trabajo terminado. Los mensajes de éxito de los lotes se resumen en uno solo"""
+
+        resultado = trabajo.resultado
+        mensajes: "list[tuple[int, str]]" = resultado.get("mensajes", [])
+
+        if trabajo.estado == EstadosTrabajo.ERROR:
+            messages.error(
+                request,
+                f"{trabajo.error} (se procesaron {trabajo.procesados} de {trabajo.total} {self.nombre_objeto_plural})",
+            )
+        elif trabajo.tipo == "delete":
+            self.mensaje_luego_eliminar(
+                request,
+                resultado.get("eliminados", 0),
+                resultado.get("por_modelo", {}),
+            )
+            return
+        elif any(nivel == messages.SUCCESS for nivel, _ in mensajes):
+            messages.success(
+                request,
+                f"Se procesaron {trabajo.total} {self.nombre_objeto_plural} seleccionad{self.vocal_del_genero}s",
+            )
+
+        for nivel, mensaje in dict.fromkeys(map(tuple, mensajes)):
+            if nivel != messages.SUCCESS:
+                messages.add_message(request, nivel, mensaje)
+
     def actualizar_lista(
         self,
         request: HttpRequest,
@@ -510,6 +924,14 @@ class VistaTablaAdaptable(VistaListaObjetos):
 
         self.establecer_columnas_ocultables()
 
+    def obtener_columnas_proyectadas(self) -> "Sequence[Columna]":
+        """Solo las columnas mostradas: las ocultas (incluidas las que se ocultan por los filtros) no se seleccionan"""
+
+        # los filtros pueden haber ocultado o vuelto a mostrar columnas
+        self.establecer_columnas()
+
+        return self.columnas_mostradas
+
     def establecer_columnas_ocultables(self):
         """Establece las columnas que no se debe mostrar cuando la tabla adaptable no mide el ancho indicado. Por defecto oculta todas menos la segunda, por lo que quedan (#, nombre / identificador y  el campo X)"""
 
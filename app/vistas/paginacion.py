@@ -0,0 +1,218 @@
+import json
+from typing import Any, Sequence, Type
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+
+
+SAL_CURSOR = "app.vistas.paginacion.cursor"
+
+
+class PaginaCursor:
+    """Página obtenida por medio de paginación por cursor (keyset). A diferencia de "Page", no conoce la cantidad total de registros ni de páginas, solo si hay registros antes o después de ella"""
+
+    def __init__(
+        self,
+        object_list: "list[Any]",
+        tiene_anterior: bool,
+        tiene_siguiente: bool,
+        cursor_anterior: "str | None",
+        cursor_siguiente: "str | None",
+    ):
+        self.object_list = object_list
+        self.tiene_anterior = tiene_anterior
+        self.tiene_siguiente = tiene_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    # mismos nombres que en "Page", para poder usarla en las plantillas que ya existen
+    def has_previous(self):
+        return self.tiene_anterior
+
+    def has_next(self):
+        return self.tiene_siguiente
+
+    def has_other_pages(self):
+        return self.tiene_anterior or self.tiene_siguiente
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+
+def columna_no_nula(modelo: "Type[models.Model]", ruta: str) -> bool:
+    """Indica si la ruta (ej: "estudiante__apellidos") es un campo del modelo que nunca es nulo: no admite nulos y se llega a él por relaciones a uno que tampoco los admiten (las demás se unen con LEFT JOIN). Las anotaciones, los agregados y las propiedades no son campos. La ruta no puede terminar en una relación (ej: "seccion"), ya que Django la ordena por el "ordering" del modelo relacionado y no por su id"""
+
+    campo = None
+
+    for parte in ruta.split("__"):
+        if parte == "pk":
+            parte = modelo._meta.pk.name  # type: ignore - sí hay una clave primaria
+
+        try:
+            campo = modelo._meta.get_field(parte)
+        except FieldDoesNotExist:
+            return False
+
+        # las relaciones inversas y a muchos no son columnas del modelo
+        if campo.null or not campo.concrete or campo.many_to_many:
+            return False
+
+        if campo.is_relation:
+            modelo = campo.related_model  # type: ignore - sí es un modelo
+
+    return campo is not None and not campo.is_relation
+
+
+def orden_admite_cursor(queryset: models.QuerySet) -> bool:
+    """El cursor guarda los valores de las columnas de orden y los compara con > y <, por lo que solo funciona si todas son campos que nunca son nulos (NULL no es mayor ni menor que ningún valor, y los registros con nulos se saltarían). Las columnas anotadas y las expresiones tampoco se admiten"""
+
+    orden: "Sequence[Any]" = queryset.query.order_by or queryset.model._meta.ordering
+
+    return all(
+        isinstance(col, str)
+        and col.lstrip("-") not in queryset.query.annotations
+        and columna_no_nula(queryset.model, col.lstrip("-"))
+        for col in orden
+    )
+
+
+def obtener_orden_cursor(queryset: models.QuerySet) -> "tuple[str, ...]":
+    """Obtiene las columnas por las que se ordena el queryset, ya sea por "order_by" o por el "ordering" del modelo, que deben admitir cursores (ver orden_admite_cursor). Siempre se añade el id al final para desempatar, ya que el cursor necesita un orden total"""
+
+    orden: "Sequence[Any]" = queryset.query.order_by or queryset.model._meta.ordering
+
+    columnas = list(orden)
+
+    if not any(col.lstrip("-") in ("id", "pk") for col in columnas):
+        columnas.append("id")
+
+    return tuple(columnas)
+
+
+def invertir_orden(orden: "Sequence[str]") -> "tuple[str, ...]":
+    return tuple(col[1:] if col.startswith("-") else f"-{col}" for col in orden)
+
+
+def valor_de_columna(objeto: Any, columna: str):
+    """Obtiene el valor de una columna (puede ser de una relación, como "estudiante__apellidos") de un objeto del queryset, ya sea una instancia de un modelo o un diccionario"""
+
+    columna = columna.lstrip("-")
+
+    if isinstance(objeto, dict):
+        return objeto.get(columna)
+
+    valor = objeto
+    for parte in columna.split("__"):
+        valor = getattr(valor, "pk" if parte == "pk" else parte)
+
+    return valor
+
+
+def codificar_cursor(orden: "Sequence[str]", objeto: Any) -> str:
+    """Crea el token (firmado) con los valores de las columnas de orden del objeto indicado"""
+
+    valores = json.loads(
+        json.dumps(
+            [valor_de_columna(objeto, col) for col in orden], cls=DjangoJSONEncoder
+        )
+    )
+
+    return signing.dumps({"o": list(orden), "v": valores}, salt=SAL_CURSOR)
+
+
+def decodificar_cursor(token: "str | None", orden: "Sequence[str]"):
+    """Obtiene los valores guardados en el token. Si el token es inválido o se creó con otro orden, retorna None (se vuelve a la primera página)"""
+
+    if not token:
+        return None
+
+    try:
+        datos = signing.loads(token, salt=SAL_CURSOR)
+    except signing.BadSignature:
+        return None
+
+    if (
+        not isinstance(datos, dict)
+        or datos.get("o") != list(orden)
+        or len(datos.get("v", ())) != len(orden)
+    ):
+        return None
+
+    return datos["v"]
+
+
+def filtro_cursor(orden: "Sequence[str]", valores: "Sequence[Any]") -> Q:
+    """Construye el filtro que obtiene los registros ubicados después de los valores indicados, según el orden. Equivale a la comparación de tuplas (a, b, c) > (x, y, z), respetando la dirección de cada columna"""
+
+    filtro = Q()
+
+    for i, col in enumerate(orden):
+        nombre = col.lstrip("-")
+        comparacion = "lt" if col.startswith("-") else "gt"
+
+        condicion = Q(**{f"{nombre}__{comparacion}": valores[i]})
+
+        for col_anterior, valor in zip(orden[:i], valores[:i]):
+            condicion &= Q(**{col_anterior.lstrip("-"): valor})
+
+        filtro |= condicion
+
+    return filtro
+
+
+def paginar_por_cursor(
+    queryset: models.QuerySet,
+    cantidad: int,
+    despues: "str | None" = None,
+    antes: "str | None" = None,
+) -> PaginaCursor:
+    """Obtiene una página del queryset usando los tokens "despues" o "antes". Solo se obtiene un registro extra para saber si hay más páginas, por lo que no se usan OFFSET ni COUNT. Lanza ValueError si el orden del queryset no admite cursores (ver orden_admite_cursor)"""
+
+    if not orden_admite_cursor(queryset):
+        raise ValueError(
+            "Solo se puede paginar por cursor con un orden de campos que no admitan nulos"
+        )
+
+    orden = obtener_orden_cursor(queryset)
+    queryset = queryset.order_by(*orden)
+
+    valores_antes = decodificar_cursor(antes, orden)
+    valores_despues = (
+        decodificar_cursor(despues, orden) if valores_antes is None else None
+    )
+
+    # hacia atrás se invierte el orden y luego se invierten los resultados
+    if valores_antes is not None:
+        orden_inverso = invertir_orden(orden)
+
+        objetos = list(
+            queryset.order_by(*orden_inverso).filter(
+                filtro_cursor(orden_inverso, valores_antes)
+            )[: cantidad + 1]
+        )
+
+        tiene_anterior = len(objetos) > cantidad
+        objetos = objetos[:cantidad][::-1]
+        tiene_siguiente = True
+    else:
+        if valores_despues is not None:
+            queryset = queryset.filter(filtro_cursor(orden, valores_despues))
+
+        objetos = list(queryset[: cantidad + 1])
+
+        tiene_siguiente = len(objetos) > cantidad
+        objetos = objetos[:cantidad]
+        tiene_anterior = valores_despues is not None
+
+    return PaginaCursor(
+        objetos,
+        tiene_anterior=tiene_anterior and len(objetos) > 0,
+        tiene_siguiente=tiene_siguiente and len(objetos) > 0,
+        cursor_anterior=codificar_cursor(orden, objetos[0]) if objetos else None,
+        cursor_siguiente=codificar_cursor(orden, objetos[-1]) if objetos else None,
+    )
@@ -0,0 +1,63 @@
+from typing import Iterable
+from django.db import models
+from app.filtros import es_ruta_multiple, obtener_campo
+from app.vistas._tipos import Columna
+
+
+def proyectar_columnas(
+    queryset: models.QuerySet,
+    columnas: "Iterable[Columna]",
+    campos_requeridos: "Iterable[str]" = (),
+    como_valores: bool = False,
+) -> models.QuerySet:
+    """Limita las columnas obtenidas del queryset a las de las columnas indicadas (más las requeridas y las de orden), uniendo con select_related solo las relaciones que usan. Las columnas anotadas, las relaciones a muchos (que se obtienen con prefetch_related) y las que no son campos del modelo (ej: propiedades) no se modifican. Si "como_valores", los registros se obtienen como diccionarios con values()"""
+
+    modelo = queryset.model
+    anotaciones = queryset.query.annotations
+
+    # las columnas de orden se necesitan para crear los cursores de la paginación
+    orden = (
+        col.lstrip("-")
+        for col in queryset.query.order_by or modelo._meta.ordering
+        if isinstance(col, str) and col != "?"
+    )
+
+    campos = {modelo._meta.pk.name}  # type: ignore - sí hay una clave primaria
+    relaciones = set()
+
+    for clave in (
+        *(columna["clave"] for columna in columnas),
+        *campos_requeridos,
+        *orden,
+    ):
+        if clave in anotaciones:
+            if como_valores:
+                campos.add(clave)
+            continue
+
+        if clave == "pk":
+            continue
+
+        campo = obtener_campo(modelo, clave)
+
+        if campo is None or es_ruta_multiple(modelo, clave):
+            continue
+
+        campos.add(clave)
+
+        if "__" in clave:
+            relaciones.add(clave.rsplit("__", 1)[0])
+
+        # la columna es el objeto relacionado, que se muestra con su __str__
+        if campo.is_relation and not como_valores:
+            relaciones.add(clave)
+
+    if como_valores:
+        return queryset.prefetch_related(None).values(*campos)
+
+    queryset = queryset.only(*campos)
+
+    if relaciones:
+        queryset = queryset.select_related(*relaciones)
+
+    return queryset
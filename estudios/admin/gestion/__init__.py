@@ -23,8 +23,10 @@ from estudios.modelos.gestion import (
     Matricula,
     Nota,
 )
-from estudios.modelos.parametros import Materia, Lapso
+from estudios.modelos.parametros import Materia, obtener_lapso_actual
 from django.core.exceptions import PermissionDenied
+from usuarios.backends import pertenece_grupo
+from usuarios.models import GruposBase
 
 
 @admin.register(Profesor)
@@ -60,7 +62,7 @@ class EstudianteAdmin(ModelAdmin):
 
         # evitar mostrar alumnos ya matriculados
         if modelo == "matricula":
-            lapso_actual = Lapso.objects.last()
+            lapso_actual = obtener_lapso_actual()
             matriculados = Matricula.objects.filter(lapso=lapso_actual).values_list(
                 "estudiante__cedula", flat=True
             )
@@ -135,7 +137,7 @@ class MatriculaAdmin(ModelAdmin):
         if not obj:
             valor_lapso = form.base_fields["lapso"].initial  # pyright: ignore[reportAttributeAccessIssue]
             if valor_lapso is None:
-                form.base_fields["lapso"].initial = Lapso.objects.last()  # pyright: ignore[reportAttributeAccessIssue]
+                form.base_fields["lapso"].initial = obtener_lapso_actual()  # pyright: ignore[reportAttributeAccessIssue]
 
         return form
 
@@ -165,7 +167,7 @@ class MatriculaAdmin(ModelAdmin):
             secciones_profesor = ProfesorMateria.objects.filter(
                 profesor=profesor
             ).values_list("seccion_id", flat=True)
-            lapso_actual = Lapso.objects.last()
+            lapso_actual = obtener_lapso_actual()
 
             queryset = queryset.filter(
                 estado="activo",
@@ -202,7 +204,7 @@ class MixinNotaPermisos:
     # solo obtener los datos de las notas del profesor según lo que imparte en el lapso actual
     def limitar_queryset_profesor(self, request, queryset):
         if hasattr(request.user, "profesor") and not request.user.is_superuser:
-            ultimo_lapso = Lapso.objects.last()
+            ultimo_lapso = obtener_lapso_actual()
             materias = self.get_profesor_materias(request.user)
             secciones = self.get_profesor_secciones(request.user)
 
@@ -216,7 +218,7 @@ class MixinNotaPermisos:
     def profesor_tiene_acceso(self, user, obj: Nota):
         """Verificar si el profesor tiene acceso a las materias y secciones del objeto, y si es el lapso actual"""
         if hasattr(user, "profesor") and not user.is_superuser:
-            lapso_actual = Lapso.objects.last()
+            lapso_actual = obtener_lapso_actual()
             if lapso_actual is None:
                 return False
 
@@ -311,7 +313,7 @@ class NotaAdmin(MixinNotaPermisos, ModelAdmin):
             and request.path.endswith("/matricula/")
             and (
                 request.user.is_superuser  # type: ignore
-                or request.user.grupos.filter(name="Admin").exists()  # type: ignore
+                or pertenece_grupo(request.user, GruposBase.ADMIN.value)
             )
         ):
             return True
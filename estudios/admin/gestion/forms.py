@@ -1,5 +1,12 @@
 from django import forms
-from estudios.modelos.parametros import Año, AñoMateria, Seccion, Materia, Lapso
+from estudios.modelos.parametros import (
+    Año,
+    AñoMateria,
+    Seccion,
+    Materia,
+    Lapso,
+    obtener_lapso_actual,
+)
 from estudios.modelos.gestion import (
     Bachiller,
     Matricula,
@@ -40,7 +47,7 @@ class MatriculaAdminForm(forms.ModelForm):
         return seccion
 
     def clean_lapso(self):
-        return Lapso.objects.last()
+        return obtener_lapso_actual()
 
 
 class NotaAdminForm(forms.ModelForm):
@@ -121,7 +128,7 @@ class NotaAdminForm(forms.ModelForm):
 
             lapso = matricula.lapso
 
-            if lapso != Lapso.objects.last():
+            if lapso != obtener_lapso_actual():
                 raise forms.ValidationError(
                     "La matrícula seleccionada no pertenece al lapso actual"
                 )
@@ -4,3 +4,37 @@ from django.apps import AppConfig
 class EstudiosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'estudios'
+
+    def ready(self):
+        from django.conf import settings
+
+        # modo WAL de SQLite en las conexiones del servidor de producción
+        if settings.PRODUCCION:
+            from django.db.backends.signals import connection_created
+            from app.basedatos import configurar_sqlite
+
+            connection_created.connect(
+                configurar_sqlite, dispatch_uid="app.basedatos.configurar_sqlite"
+            )
+
+        # registrar las señales que invalidan la caché de los modelos
+        from app.cache import registrar_invalidacion_eliminaciones
+
+        registrar_invalidacion_eliminaciones("auth", "usuarios", "estudios")
+
+        # señales que mantienen los promedios por materia al eliminar evaluaciones
+        import estudios.servicios.promedios  # noqa: F401
+
+        # señales que mantienen los datos copiados en los promedios generales del cuadro de honor
+        import estudios.servicios.cuadro_honor  # noqa: F401
+
+        # señales que marcan los estudiantes cuyas calificaciones ponderadas se deben recalcular
+        import estudios.servicios.calificaciones  # noqa: F401
+
+        # índice de la búsqueda global: señales que lo mantienen y creación de la tabla luego de migrar
+        from django.db.models.signals import post_migrate
+        from app.busqueda import crear_indice_busqueda
+
+        post_migrate.connect(
+            crear_indice_busqueda, sender=self, dispatch_uid="app.busqueda.migrar"
+        )
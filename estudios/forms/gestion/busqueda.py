@@ -1,16 +1,19 @@
 from django import forms
+from django.db.models import Q
 from django.http import HttpRequest
 from app.campos import OPCIONES_TIPO_BUSQUEDA_CANTIDADES, CampoBooleanoONulo
+from app.filtros import FiltroBooleano, FiltroEn, FiltroIgual
 from app.forms import (
     BusquedaFormMixin,
     CookieFormMixin,
+    FiltrosFormMixin,
     OrdenFormMixin,
 )
 from app.settings import MIGRANDO
 from app.util import mn, nc, vn
 from estudios.forms.parametros.busqueda import LapsoYSeccionFormMixin
 from estudios.modelos.gestion.calificaciones import TipoTarea
-from estudios.modelos.parametros import Materia, Seccion, Año
+from estudios.modelos.parametros import Materia, Seccion, Año, obtener_lapso_actual
 from estudios.modelos.gestion.personas import (
     Estudiante,
     MatriculaEstados,
@@ -99,6 +102,11 @@ class MatriculaBusquedaForm(OrdenFormMixin, LapsoYSeccionFormMixin):
 
     campos_prefijo_cookie = "matriculas"
 
+    filtros = (
+        *LapsoYSeccionFormMixin.filtros,
+        FiltroIgual("estado", "estado"),
+    )
+
     estado = forms.ChoiceField(
         label="Estado",
         initial=None,
@@ -156,6 +164,14 @@ class ProfesorBusquedaForm(ProfesorBusquedaFormMixin):
 
     campos_prefijo_cookie = "profesores"
 
+    filtros = (
+        FiltroBooleano(Campos.TIENE_USUARIO, Q(usuario__isnull=False)),
+        FiltroBooleano(Campos.ACTIVO, Q(activo=True)),
+        FiltroBooleano(
+            Campos.TIENE_TELEFONO, Q(telefono__isnull=False) & ~Q(telefono="")
+        ),
+    )
+
     tiene_usuario = CampoBooleanoONulo(
         label="Tiene usuario",
         label_no_escogido="NO Tiene usuario",
@@ -222,7 +238,7 @@ class ProfesorMateriaBusquedaForm(ProfesorBusquedaFormMixin):
     )
 
 
-class TareaBusquedaForm(CookieFormMixin, forms.Form):
+class TareaBusquedaForm(FiltrosFormMixin, CookieFormMixin, forms.Form):
     def __init__(self, *args, **kwargs):
         request: HttpRequest = kwargs["request"]
 
@@ -256,6 +272,12 @@ class TareaBusquedaForm(CookieFormMixin, forms.Form):
 
     campos_prefijo_cookie = "tareas"
 
+    filtros = (
+        FiltroEn(Campos.TIPOS, "tareaprofesormateria__tarea__tipo"),
+        FiltroEn(Campos.MATERIAS, "materia"),
+        FiltroEn(Campos.SECCIONES, "seccion"),
+    )
+
     tipos = forms.ModelMultipleChoiceField(
         label="Tipo",
         queryset=TipoTarea.objects.all().order_by(nc(TipoTarea.nombre))
@@ -299,6 +321,14 @@ class EstudianteBusquedaForm(BusquedaFormMixin):
 
     campos_prefijo_cookie = "estudiantes"
 
+    filtros = (
+        FiltroBooleano(
+            Campos.MATRICULA_ACTUAL,
+            lambda: Q(matricula__lapso=obtener_lapso_actual()),
+        ),
+        FiltroEn(Campos.SECCIONES, "matricula__seccion"),
+    )
+
     matricula_actual = CampoBooleanoONulo(
         label="Matriculado actualmente",
         label_no_escogido="NO matriculado actualmente",
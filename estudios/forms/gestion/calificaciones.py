@@ -1,4 +1,5 @@
 from django import forms
+from app.cache import incrementar_generacion
 from app.util import nc
 from estudios.forms import LapsoActualForm
 from estudios.modelos.gestion.calificaciones import (
@@ -8,7 +9,6 @@ from estudios.modelos.gestion.calificaciones import (
 )
 from estudios.modelos.gestion.personas import Profesor, ProfesorMateria
 from app.settings import MIGRANDO
-from estudios.modelos.parametros import obtener_lapso_actual
 
 
 class FormTipoTarea(forms.ModelForm):
@@ -64,7 +64,7 @@ class FormTarea(LapsoActualForm, forms.ModelForm):
             )
 
         tarea = super().save(commit)
-        tarea.lapso = obtener_lapso_actual()
+        tarea.lapso = self.lapso_actual
         tarea.profesor = self.profesor
 
         tarea.save()
@@ -83,5 +83,6 @@ class FormTarea(LapsoActualForm, forms.ModelForm):
         )
 
         TareaProfesorMateria.objects.bulk_create(nuevas_tareas, ignore_conflicts=True)
+        incrementar_generacion(TareaProfesorMateria)
 
         return tarea
@@ -1,6 +1,7 @@
 from django import forms
 from django.db.models import Exists
 from usuarios.models import Usuario
+from app.cache import incrementar_generacion
 from app.settings import MIGRANDO
 from app.util import nc
 from estudios.forms import LapsoActualForm, obtener_matriculas_de_lapso
@@ -85,7 +86,7 @@ class FormMatricula(LapsoActualForm, forms.ModelForm):
             # al crear, verificar que la sección no este llena
             if self.instance.pk is None:
                 cantidad_actual = Matricula.objects.filter(
-                    seccion=seccion, lapso=obtener_lapso_actual()
+                    seccion=seccion, lapso=self.lapso_actual
                 ).count()
 
                 if cantidad_actual >= seccion.capacidad:
@@ -295,6 +296,8 @@ class FormProfesorMateriaMasivo(forms.Form):
             ignore_conflicts=True,
         )
 
+        incrementar_generacion(ProfesorMateria)
+
         return asignaciones
 
 
@@ -339,11 +342,14 @@ class FormEstudiante(forms.ModelForm):
 class FormMatricularEstudiantes(forms.Form):
     """Usado en la sección de estudiantes por medio del modal"""
 
-    lapso_actual = obtener_lapso_actual() if not MIGRANDO else None
+    lapso_actual: "Lapso | None" = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # se obtiene al crear el form (y no al importar el módulo) para no usar un lapso desactualizado
+        self.lapso_actual = obtener_lapso_actual()
+
         if self.lapso_actual:
             # No se pueden matricular estudiantes que ya estén matriculados en el lapso actual
             self.fields["estudiantes"].queryset = Estudiante.objects.exclude(  # type: ignore - sí se puede asignar el queryset
@@ -362,7 +368,7 @@ class FormMatricularEstudiantes(forms.Form):
         estudiantes = self.cleaned_data["estudiantes"]
         seccion = self.cleaned_data["seccion"]
 
-        return Matricula.objects.bulk_create(
+        matriculas = Matricula.objects.bulk_create(
             tuple(
                 Matricula(
                     estudiante=estudiante, seccion=seccion, lapso=self.lapso_actual
@@ -370,3 +376,7 @@ class FormMatricularEstudiantes(forms.Form):
                 for estudiante in estudiantes
             )
         )
+
+        incrementar_generacion(Matricula)
+
+        return matriculas
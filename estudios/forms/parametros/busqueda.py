@@ -1,6 +1,8 @@
 from enum import Enum
 from django import forms
+from django.db.models import F, Q
 from app.campos import OPCIONES_TIPO_BUSQUEDA_CANTIDADES, CampoBooleanoONulo
+from app.filtros import FiltroBooleano, FiltroConjunto, FiltroEn, FiltroOpciones
 from app.forms import BusquedaFormMixin, ConjuntoOpcionesForm
 from app.util import nc
 from estudios.modelos.parametros import Lapso, Materia, Seccion, Año
@@ -15,6 +17,12 @@ class LapsoYSeccionFormMixin(BusquedaFormMixin):
         self.fields["secciones"].label_from_instance = lambda obj: obj.nombre  # type: ignore
         self.fields["lapsos"].label_from_instance = lambda obj: obj.nombre  # type: ignore
 
+    filtros = (
+        FiltroEn("secciones", "seccion"),
+        FiltroEn("lapsos", "lapso"),
+        FiltroEn("anios", "seccion__año"),
+    )
+
     secciones = forms.ModelMultipleChoiceField(
         label="Sección",
         queryset=Seccion.objects.all().order_by("año", "letra")
@@ -96,6 +104,25 @@ class SeccionBusquedaForm(BusquedaFormMixin, forms.Form):
 
     campos_prefijo_cookie = "secciones"
 
+    filtros = (
+        FiltroEn(Campos.LETRA, "letra"),
+        FiltroBooleano(Campos.VOCERO, Q(vocero__isnull=False)),
+        FiltroOpciones(
+            Campos.DISPONIBILIDAD,
+            {
+                OpcionesFormSeccion.Disponibilidad.LLENA.value[0]: Q(
+                    cantidad_matriculas__gte=F("capacidad")
+                ),
+                OpcionesFormSeccion.Disponibilidad.DISPONIBLE.value[0]: Q(
+                    cantidad_matriculas__lt=F("capacidad")
+                ),
+                OpcionesFormSeccion.Disponibilidad.VACIA.value[0]: Q(
+                    cantidad_matriculas=0
+                ),
+            },
+        ),
+    )
+
     letra = forms.MultipleChoiceField(
         label="Letra",
         initial=None,
@@ -170,6 +197,7 @@ class MateriaBusquedaForm(ConjuntoOpcionesForm, BusquedaFormMixin):
         ),
     )
     campos_prefijo_cookie = "materias"
+    filtros = (FiltroConjunto(Campos.ANIOS_ASIGNADOS, "añomateria", "año"),)
     columnas_busqueda = (
         (
             {
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from estudios.modelos.gestion.personas import Estudiante, Profesor
+
+
+class Command(BaseCommand):
+    help = "Recalcula las columnas de búsqueda normalizadas (sin diacríticos y en minúsculas) de profesores y estudiantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamaño-lote",
+            type=int,
+            default=1000,
+            help="Cantidad de registros que se actualizan por consulta",
+        )
+
+    def handle(self, *args, **options):
+        tamaño_lote = options["tamaño_lote"]
+
+        for modelo in (Profesor, Estudiante):
+            columnas = tuple(modelo.columnas_normalizadas)
+            columnas_busqueda = tuple(modelo.columnas_normalizadas.values())
+            lote = []
+            actualizados = 0
+
+            self.stdout.write(f"Actualizando {modelo._meta.verbose_name_plural}...")
+
+            with transaction.atomic():
+                for persona in (
+                    modelo.objects.only("pk", *columnas)
+                    .order_by("pk")
+                    .iterator(chunk_size=tamaño_lote)
+                ):
+                    lote.append(persona)
+
+                    if len(lote) >= tamaño_lote:
+                        actualizados += modelo.objects.bulk_update(
+                            lote, columnas_busqueda
+                        )
+                        lote = []
+
+                if lote:
+                    actualizados += modelo.objects.bulk_update(lote, columnas_busqueda)
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ {actualizados} {modelo._meta.verbose_name_plural} actualizados"
+                )
+            )
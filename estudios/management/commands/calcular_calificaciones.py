@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from estudios.servicios.calificaciones import calcular_calificaciones
+
+
+class Command(BaseCommand):
+    help = "Calcula las calificaciones ponderadas de los lapsos y las finales de los años escolares. Solo se recalculan los estudiantes cuyas notas cambiaron desde el último cálculo, salvo que hayan cambiado los pesos o los lapsos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Recalcular las calificaciones de todos los estudiantes",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Calculando las calificaciones...")
+        inicio = time.perf_counter()
+
+        resultado = calcular_calificaciones(completo=options["completo"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {resultado.estudiantes} estudiantes "
+                f"({'todos' if resultado.completo else 'con cambios'}): "
+                f"{resultado.calificaciones_lapsos} calificaciones de lapsos y "
+                f"{resultado.calificaciones_finales} finales "
+                f"({time.perf_counter() - inicio:.1f}s)"
+            )
+        )
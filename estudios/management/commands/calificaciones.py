@@ -162,7 +162,9 @@ class ArgumentosCalificacionesMixin(BaseComandos):
                         }
                     )
                     for matricula in matriculas
-                )
+                ),
+                # las matrículas que ya tienen nota en la evaluación la conservan
+                ignore_conflicts=True,
             )
 
             notas_creadas += len(notas)
@@ -0,0 +1,83 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from estudios.modelos.parametros import Lapso, Seccion, obtener_lapso_actual
+from estudios.servicios.boletines import DIRECTORIO_BOLETINES, generar_boletines
+
+
+class Command(BaseCommand):
+    help = "Genera los boletines (HTML y PDF) de los estudiantes de un lapso, en un archivo .zip por sección. Solo se regeneran los boletines cuyas notas o datos cambiaron"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lapso",
+            type=int,
+            help="ID del lapso (por defecto, el lapso actual)",
+        )
+        parser.add_argument(
+            "--seccion",
+            type=int,
+            action="append",
+            help="ID de una sección a generar (se puede repetir). Por defecto, todas las que tienen matrículas en el lapso",
+        )
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            help="Cantidad de procesos que generan los documentos (por defecto, uno por núcleo)",
+        )
+        parser.add_argument(
+            "--forzar",
+            action="store_true",
+            help="Regenerar todos los boletines aunque no hayan cambiado",
+        )
+        parser.add_argument(
+            "--directorio",
+            type=Path,
+            default=DIRECTORIO_BOLETINES,
+            help=f"Directorio de los archivos (por defecto, {DIRECTORIO_BOLETINES})",
+        )
+
+    def handle(self, *args, **options):
+        if options["lapso"] is None:
+            lapso = obtener_lapso_actual()
+        else:
+            lapso = Lapso.objects.filter(pk=options["lapso"]).first()
+
+        if lapso is None:
+            raise CommandError("No se encontró el lapso")
+
+        secciones = None
+
+        if options["seccion"]:
+            secciones = list(
+                Seccion.objects.filter(pk__in=options["seccion"]).select_related("año")
+            )
+
+            if len(secciones) != len(set(options["seccion"])):
+                raise CommandError("No se encontraron todas las secciones indicadas")
+
+        self.stdout.write(f"Generando los boletines de {lapso.nombre}...")
+        inicio = time.perf_counter()
+
+        resultados = generar_boletines(
+            lapso,
+            secciones,
+            procesos=options["procesos"],
+            forzar=options["forzar"],
+            directorio=options["directorio"],
+        )
+
+        for resultado in resultados:
+            self.stdout.write(
+                f"  {resultado.seccion}: {resultado.generados} generados, "
+                f"{resultado.reutilizados} sin cambios, {resultado.eliminados} eliminados "
+                f"-> {resultado.archivo}"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {sum(r.generados for r in resultados)} boletines generados y "
+                f"{sum(r.reutilizados for r in resultados)} sin cambios en "
+                f"{len(resultados)} secciones ({time.perf_counter() - inicio:.1f}s)"
+            )
+        )
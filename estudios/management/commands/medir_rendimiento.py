@@ -0,0 +1,614 @@
+import io
+import itertools
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from urllib.parse import unquote
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from faker import Faker
+from app.busqueda import reconstruir_indice
+from app.middleware import ContadorConsultas, logger_informes
+from app.vistas import Vista
+from app.vistas.listas import VistaListaObjetos
+from estudios.modelos.gestion.calificaciones import (
+    Nota,
+    Tarea,
+    TareaProfesorMateria,
+    TipoTarea,
+)
+from estudios.modelos.gestion.personas import (
+    Estudiante,
+    Matricula,
+    MatriculaEstados,
+    Profesor,
+    ProfesorMateria,
+)
+from estudios.modelos.parametros import Año, AñoMateria, Lapso, Seccion
+from usuarios.models import Grupo, GruposBase, Usuario
+
+DIRECTORIO_RENDIMIENTO = Path(settings.BASE_DIR) / "rendimiento"
+
+# tamaño del conjunto de datos con escala 1
+ESTUDIANTES = 20_000
+NOTAS = 2_000_000
+PROFESORES = 60
+SECCIONES_POR_AÑO = 8
+LAPSOS = (
+    (date(2024, 9, 16), date(2024, 12, 13)),
+    (date(2025, 1, 7), date(2025, 3, 28)),
+    (date(2025, 4, 7), date(2025, 7, 18)),
+)
+
+# todas las fechas se derivan de esta, para que el conjunto de datos sea siempre el mismo
+FECHA_BASE = datetime(2024, 9, 1, 7, 0)
+
+# rutas que no son de vistas basadas en "Vista" (nombre de la url, datos GET)
+RUTAS_ADICIONALES = (
+    ("inicio", {}),
+    ("busqueda_global", {"q": "maria"}),
+)
+
+USUARIOS_MEDICION = ("admin", "profesor")
+
+# métricas que se comparan con el umbral de regresión y el aumento mínimo que se considera, para ignorar el ruido de las mediciones pequeñas. Las consultas se comparan exactamente
+METRICAS_COMPARADAS = {"tiempo_total_ms": 5, "memoria_pico_kb": 64}
+
+
+def fecha_con_zona(fecha: datetime) -> datetime:
+    return timezone.make_aware(fecha) if settings.USE_TZ else fecha
+
+
+def en_lotes(elementos, tamaño: int):
+    iterador = iter(elementos)
+
+    while lote := list(itertools.islice(iterador, tamaño)):
+        yield lote
+
+
+def recorrer_patrones(patrones):
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            # las rutas con espacio de nombres son de otras aplicaciones (ej: admin)
+            if not patron.namespace:
+                yield from recorrer_patrones(patron.url_patterns)
+        elif isinstance(patron, URLPattern) and patron.name:
+            yield patron
+
+
+class Command(BaseCommand):
+    help = "Mide el rendimiento (consultas, tiempo de base de datos y de render, memoria máxima) de las listas, formularios y la carga de notas con un conjunto de datos grande y reproducible, en una base de datos aparte. Guarda los resultados en JSON y los puede comparar con los de otra ejecución"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--escala",
+            type=float,
+            default=1.0,
+            help=f"Multiplica la cantidad de estudiantes ({ESTUDIANTES}) y de notas ({NOTAS}). Ej: 0.05 para una medición rápida",
+        )
+        parser.add_argument(
+            "--semilla",
+            type=int,
+            default=0,
+            help="Semilla de los datos generados",
+        )
+        parser.add_argument(
+            "--regenerar",
+            action="store_true",
+            help="Vuelve a crear la base de datos de medición aunque ya exista",
+        )
+        parser.add_argument(
+            "--repeticiones",
+            type=int,
+            default=5,
+            help="Peticiones medidas por ruta (se usa la mediana)",
+        )
+        parser.add_argument(
+            "--mantener-cache",
+            action="store_true",
+            help="No limpiar la caché antes de cada petición (mide las respuestas en caché)",
+        )
+        parser.add_argument(
+            "--etiqueta",
+            type=str,
+            default="",
+            help="Nombre de la ejecución (ej: la versión), que se guarda en los resultados",
+        )
+        parser.add_argument(
+            "--salida",
+            type=Path,
+            help="Archivo JSON de los resultados. Por defecto se crea uno nuevo en la carpeta rendimiento/",
+        )
+        parser.add_argument(
+            "--comparar",
+            type=Path,
+            help="Resultados JSON de otra ejecución con los que comparar",
+        )
+        parser.add_argument(
+            "--umbral",
+            type=float,
+            default=0.2,
+            help="Aumento relativo de los tiempos o la memoria que se considera una regresión (0.2 = 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        self.escala: float = options["escala"]
+        self.semilla: int = options["semilla"]
+        self.repeticiones: int = max(1, options["repeticiones"])
+        self.mantener_cache: bool = options["mantener_cache"]
+
+        anteriores = None
+
+        if options["comparar"]:
+            try:
+                anteriores = json.loads(options["comparar"].read_text("utf-8"))
+            except (OSError, ValueError) as e:
+                raise CommandError(
+                    f"No se pudieron leer los resultados a comparar: {e}"
+                )
+
+            if (anteriores["escala"], anteriores["semilla"]) != (
+                self.escala,
+                self.semilla,
+            ):
+                raise CommandError(
+                    "Los resultados a comparar son de un conjunto de datos distinto (escala o semilla)"
+                )
+
+        DIRECTORIO_RENDIMIENTO.mkdir(exist_ok=True)
+
+        ruta_base_datos = (
+            DIRECTORIO_RENDIMIENTO / f"datos-{self.escala:g}-{self.semilla}.sqlite3"
+        )
+
+        # la base de datos de medición se conserva entre ejecuciones, porque generar los datos tarda varios minutos
+        connection.settings_dict["TEST"]["NAME"] = str(ruta_base_datos)
+        nombre_original = connection.creation.create_test_db(
+            verbosity=0,
+            autoclobber=True,
+            keepdb=not options["regenerar"],
+            serialize=False,
+        )
+
+        try:
+            if not Nota.objects.exists():
+                self.generar_datos()
+
+            resultados = self.medir_rutas()
+        finally:
+            connection.creation.destroy_test_db(
+                nombre_original, verbosity=0, keepdb=True
+            )
+
+        informe = {
+            "etiqueta": options["etiqueta"],
+            "fecha": timezone.now().isoformat(timespec="seconds"),
+            "escala": self.escala,
+            "semilla": self.semilla,
+            "repeticiones": self.repeticiones,
+            "cache": self.mantener_cache,
+            "datos": self.cantidades,
+            "resultados": resultados,
+        }
+
+        salida: Path = options["salida"] or (
+            DIRECTORIO_RENDIMIENTO
+            / f"resultados-{timezone.localtime():%Y%m%d-%H%M%S}.json"
+        )
+        salida.write_text(
+            json.dumps(informe, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Resultados guardados en {salida}"))
+
+        if anteriores is not None:
+            regresiones = self.comparar(
+                resultados, anteriores["resultados"], options["umbral"]
+            )
+
+            if regresiones:
+                raise CommandError(
+                    f"{len(regresiones)} regresiones respecto a {options['comparar']}"
+                )
+
+            self.stdout.write(self.style.SUCCESS("✓ Sin regresiones"))
+
+    @transaction.atomic
+    def generar_datos(self):
+        """Crea el conjunto de datos en una sola transacción, por lo que una generación interrumpida no deja datos a medias"""
+
+        self.stdout.write("Generando el conjunto de datos de medición...")
+
+        rng = random.Random(self.semilla)
+        faker = Faker("es_MX")
+        faker.seed_instance(self.semilla)
+
+        fecha_base = fecha_con_zona(FECHA_BASE)
+        cantidad_estudiantes = max(1, round(ESTUDIANTES * self.escala))
+
+        # años, materias, tipos de tareas, grupos y el usuario admin
+        call_command("poblar_datos_estudios", stdout=io.StringIO())
+
+        años = list(Año.objects.order_by("pk"))
+        capacidad = math.ceil(cantidad_estudiantes / (len(años) * SECCIONES_POR_AÑO))
+
+        Seccion.objects.bulk_create(
+            (
+                Seccion(
+                    año=año,
+                    letra=letra,
+                    nombre=f"{año.nombre_corto} {letra}",
+                    fecha_creacion=fecha_base,
+                )
+                for año in años
+                for letra in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[:SECCIONES_POR_AÑO]
+            ),
+            ignore_conflicts=True,
+        )
+        Seccion.objects.update(capacidad=capacidad)
+        secciones = list(Seccion.objects.order_by("año", "letra"))
+
+        lapsos = Lapso.objects.bulk_create(
+            Lapso(numero=i, nombre=f"Lapso {i}", fecha_inicio=inicio, fecha_fin=fin)
+            for i, (inicio, fin) in enumerate(LAPSOS, 1)
+        )
+
+        profesores = Profesor.objects.bulk_create(
+            Profesor(
+                cedula=10_000_000 + i,
+                nombres=faker.first_name(),
+                apellidos=f"{faker.last_name()} {faker.last_name()}",
+                sexo=rng.choice(Profesor.OpcionesSexo.values),
+                telefono=f"0414{rng.randrange(10**7):07}",
+                fecha_ingreso=fecha_base,
+            )
+            for i in range(PROFESORES)
+        )
+
+        materias_por_año: "dict[int, list[int]]" = {}
+
+        for año_id, materia_id in AñoMateria.objects.order_by("pk").values_list(
+            "año", "materia"
+        ):
+            materias_por_año.setdefault(año_id, []).append(materia_id)
+
+        profesores_materias = ProfesorMateria.objects.bulk_create(
+            ProfesorMateria(
+                profesor=rng.choice(profesores),
+                materia_id=materia_id,
+                seccion=seccion,
+            )
+            for seccion in secciones
+            for materia_id in materias_por_año.get(seccion.año_id, ())  # type: ignore - sí existe "año_id"
+        )
+
+        self.stdout.write(f"✓ {len(profesores_materias)} materias impartidas")
+
+        estudiantes = Estudiante.objects.bulk_create(
+            (
+                Estudiante(
+                    cedula=30_000_000 + i,
+                    nombres=faker.first_name(),
+                    apellidos=f"{faker.last_name()} {faker.last_name()}",
+                    sexo=rng.choice(Estudiante.OpcionesSexo.values),
+                    fecha_nacimiento=date(2007, 1, 1)
+                    + timedelta(days=rng.randrange(365 * 6)),
+                    fecha_ingreso=fecha_base,
+                )
+                for i in range(cantidad_estudiantes)
+            ),
+            batch_size=2000,
+        )
+
+        # cada estudiante se matricula en la misma sección en todos los lapsos
+        matriculas = Matricula.objects.bulk_create(
+            (
+                Matricula(
+                    estudiante=estudiante,
+                    seccion=secciones[i % len(secciones)],
+                    lapso=lapso,
+                    estado=(
+                        MatriculaEstados.ACTIVO
+                        if rng.random() < 0.97
+                        else MatriculaEstados.INACTIVO
+                    ),
+                    fecha_añadida=fecha_base,
+                )
+                for lapso in lapsos
+                for i, estudiante in enumerate(estudiantes)
+            ),
+            batch_size=5000,
+        )
+
+        self.stdout.write(
+            f"✓ {len(estudiantes)} estudiantes y {len(matriculas)} matrículas"
+        )
+
+        matriculas_por_seccion: "dict[tuple[int, int], list[int]]" = {}
+
+        for matricula in matriculas:
+            seccion = (matricula.seccion_id, matricula.lapso_id)  # type: ignore - sí existen los "_id"
+            matriculas_por_seccion.setdefault(seccion, []).append(matricula.pk)
+
+        def matriculas_de(pm: ProfesorMateria, lapso: Lapso) -> "list[int]":
+            return matriculas_por_seccion.get((pm.seccion_id, lapso.pk), [])  # type: ignore - sí existe "seccion_id"
+
+        # evaluaciones por materia y lapso necesarias para acercarse a la cantidad de notas
+        celdas = sum(
+            len(matriculas_de(pm, lapso))
+            for pm in profesores_materias
+            for lapso in lapsos
+        )
+        tareas_por_materia = max(1, round(NOTAS * self.escala / max(celdas, 1)))
+
+        tipos = list(TipoTarea.objects.order_by("pk"))
+        asignaciones: "list[tuple[ProfesorMateria, Lapso, datetime]]" = [
+            (
+                pm,
+                lapso,
+                fecha_con_zona(datetime.combine(lapso.fecha_inicio, FECHA_BASE.time()))
+                + timedelta(weeks=2 * (j + 1)),
+            )
+            for lapso in lapsos
+            for pm in profesores_materias
+            for j in range(tareas_por_materia)
+        ]
+
+        tareas = Tarea.objects.bulk_create(
+            (
+                Tarea(
+                    tipo=rng.choice(tipos),
+                    profesor_id=pm.profesor_id,  # type: ignore - sí existe "profesor_id"
+                    lapso=lapso,
+                    fecha_añadida=fecha,
+                )
+                for pm, lapso, fecha in asignaciones
+            ),
+            batch_size=5000,
+        )
+        tareas_materias = TareaProfesorMateria.objects.bulk_create(
+            (
+                TareaProfesorMateria(tarea=tarea, profesormateria=pm)
+                for tarea, (pm, _, _) in zip(tareas, asignaciones)
+            ),
+            batch_size=5000,
+        )
+
+        notas = (
+            Nota(
+                matricula_id=matricula_id,
+                tarea_profesormateria_id=tarea_materia.pk,
+                valor=rng.randint(1, 20),
+                fecha=fecha,
+            )
+            for tarea_materia, (pm, lapso, fecha) in zip(tareas_materias, asignaciones)
+            for matricula_id in matriculas_de(pm, lapso)
+        )
+
+        cantidad_notas = 0
+
+        for lote in en_lotes(notas, 20_000):
+            Nota.objects.bulk_create(lote)
+            cantidad_notas += len(lote)
+
+        self.stdout.write(f"✓ {len(tareas)} evaluaciones y {cantidad_notas} notas")
+
+        # el profesor con más materias es el usuario de las vistas de profesores
+        profesor = max(
+            profesores,
+            key=lambda p: sum(pm.profesor_id == p.pk for pm in profesores_materias),  # type: ignore - sí existe "profesor_id"
+        )
+        usuario = Usuario(username="profesor", email="profesor@liceo.edu")
+        usuario.set_password("1234")
+        usuario.save()
+        usuario.grupos.add(Grupo.objects.get(name=GruposBase.PROFESOR.value))
+
+        profesor.usuario = usuario
+        profesor.save(update_fields=["usuario"])
+
+        reconstruir_indice()
+
+        self.stdout.write(self.style.SUCCESS("✓ Conjunto de datos generado"))
+
+    def obtener_rutas(self) -> "list[tuple[str, str, dict, bool]]":
+        """Rutas a medir (nombre de la vista, ruta, datos GET, si es una lista): las de todas las vistas protegidas (listas, formularios y carga de notas) más las adicionales. Las rutas con parámetros usan el primer objeto de su modelo"""
+
+        profesor_materia = (
+            ProfesorMateria.objects.filter(profesor__usuario__username="profesor")
+            .order_by("pk")
+            .first()
+        )
+        rutas: "dict[str, tuple[str, str, dict, bool]]" = {}
+
+        for patron in recorrer_patrones(get_resolver().url_patterns):
+            vista = getattr(patron.callback, "view_class", None)
+
+            if vista is None or not issubclass(vista, Vista):
+                continue
+
+            kwargs = {}
+
+            for parametro in patron.pattern.converters:  # type: ignore - los patrones de "path" tienen "converters"
+                if parametro == "pk" and getattr(vista, "model", None):
+                    kwargs["pk"] = (
+                        vista.model.objects.order_by("pk")  # type: ignore - sí tiene "model"
+                        .values_list("pk", flat=True)
+                        .first()
+                    )
+                elif parametro == "profesormateria_id" and profesor_materia:
+                    kwargs[parametro] = profesor_materia.pk
+
+            if len(kwargs) != len(patron.pattern.converters) or None in kwargs.values():  # type: ignore - los patrones de "path" tienen "converters"
+                continue
+
+            ruta = reverse(patron.name, kwargs=kwargs)
+            rutas[ruta] = (
+                vista.__name__,
+                ruta,
+                {},
+                issubclass(vista, VistaListaObjetos),
+            )
+
+        for nombre, datos in RUTAS_ADICIONALES:
+            ruta = reverse(nombre)
+            rutas[ruta] = (nombre, ruta, datos, False)
+
+        return [rutas[ruta] for ruta in sorted(rutas)]
+
+    def medir_rutas(self) -> "dict[str, dict]":
+        self.cantidades = {
+            modelo.__name__: modelo.objects.count()
+            for modelo in (Estudiante, Profesor, Seccion, Lapso, Matricula, Tarea, Nota)
+        }
+
+        clientes: "dict[str, Client]" = {}
+
+        for nombre in USUARIOS_MEDICION:
+            clientes[nombre] = Client(raise_request_exception=False)
+            clientes[nombre].force_login(Usuario.objects.get(username=nombre))
+
+        resultados: "dict[str, dict]" = {}
+
+        # se mide sin modo de depuración, que guarda cada consulta, y sin llenar el registro de consultas
+        with override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            PRESUPUESTO_CONSULTAS_ACCION=None,
+        ):
+            logger_informes.disabled = True
+
+            try:
+                for vista, ruta, datos, es_lista in self.obtener_rutas():
+                    # las listas también se filtran con POST (HTMX), que solo devuelve la tabla
+                    metodos = [("GET", datos)]
+
+                    if es_lista:
+                        metodos.append(("POST", {"solo_tabla": "true"}))
+
+                    for usuario, cliente in clientes.items():
+                        for metodo, datos_metodo in metodos:
+                            clave = f"{usuario} {metodo} {unquote(ruta)}"
+                            resultados[clave] = resultado = self.medir(
+                                cliente, metodo, ruta, datos_metodo
+                            )
+                            resultado["vista"] = vista
+
+                            self.mostrar_resultado(clave, resultado)
+            finally:
+                logger_informes.disabled = False
+
+        return resultados
+
+    def medir(self, cliente: Client, metodo: str, ruta: str, datos: dict) -> dict:
+        peticion = cliente.get if metodo == "GET" else cliente.post
+
+        # la primera petición carga las plantillas y módulos, por lo que no se mide
+        estado = peticion(ruta, datos).status_code
+
+        if estado != 200:
+            return {"estado": estado}
+
+        consultas = []
+        tiempos_bd = []
+        tiempos_totales = []
+
+        for _ in range(self.repeticiones):
+            if not self.mantener_cache:
+                cache.clear()
+
+            contador = ContadorConsultas()
+
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(contador))
+
+                inicio = time.perf_counter()
+                peticion(ruta, datos)
+                tiempos_totales.append(time.perf_counter() - inicio)
+
+            consultas.append(contador.cantidad)
+            tiempos_bd.append(contador.tiempo)
+
+        # tracemalloc hace más lentas las peticiones, por eso la memoria se mide aparte
+        if not self.mantener_cache:
+            cache.clear()
+
+        tracemalloc.start()
+
+        try:
+            peticion(ruta, datos)
+            _, memoria_pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        tiempo_total = statistics.median(tiempos_totales)
+        tiempo_bd = statistics.median(tiempos_bd)
+
+        return {
+            "estado": estado,
+            "consultas": max(consultas),
+            "tiempo_total_ms": round(tiempo_total * 1000, 2),
+            "tiempo_bd_ms": round(tiempo_bd * 1000, 2),
+            # todo lo que no es la base de datos: la vista y las plantillas
+            "tiempo_render_ms": round(max(tiempo_total - tiempo_bd, 0) * 1000, 2),
+            "memoria_pico_kb": round(memoria_pico / 1024),
+        }
+
+    def mostrar_resultado(self, clave: str, resultado: dict):
+        if "consultas" not in resultado:
+            return self.stdout.write(f"  {clave:60} {resultado['estado']}")
+
+        self.stdout.write(
+            f"  {clave:60} {resultado['consultas']:>4} consultas"
+            f" {resultado['tiempo_total_ms']:>9.1f} ms"
+            f" (bd {resultado['tiempo_bd_ms']:.1f} ms)"
+            f" {resultado['memoria_pico_kb']:>7} KB"
+        )
+
+    def comparar(
+        self, actuales: "dict[str, dict]", anteriores: "dict[str, dict]", umbral: float
+    ) -> "list[str]":
+        """Muestra y retorna las regresiones: más consultas que antes (el conjunto de datos es el mismo), o tiempos o memoria que aumentaron más que el umbral"""
+
+        regresiones = []
+
+        for clave, actual in actuales.items():
+            anterior = anteriores.get(clave)
+
+            if not anterior or "consultas" not in anterior:
+                continue
+
+            if "consultas" not in actual:
+                regresiones.append(f"{clave}: estado {actual['estado']}")
+                continue
+
+            if actual["consultas"] > anterior["consultas"]:
+                regresiones.append(
+                    f"{clave}: {anterior['consultas']} → {actual['consultas']} consultas"
+                )
+
+            for metrica, aumento_minimo in METRICAS_COMPARADAS.items():
+                if actual[metrica] > max(
+                    anterior[metrica] * (1 + umbral),
+                    anterior[metrica] + aumento_minimo,
+                ):
+                    regresiones.append(
+                        f"{clave}: {metrica} {anterior[metrica]} → {actual[metrica]}"
+                    )
+
+        for regresion in regresiones:
+            self.stdout.write(self.style.ERROR(f"✗ {regresion}"))
+
+        return regresiones
@@ -1,4 +1,5 @@
 from typing import Any, OrderedDict
+from app.busqueda import indexar
 from app.util import nc
 from estudios.management.commands import BaseComandos, quitar_diacriticos
 from estudios.modelos.gestion.personas import (
@@ -199,6 +200,9 @@ class ArgumentosPersonasMixin(BaseComandos):
 
         Profesor.objects.bulk_create(profesores_crear)
 
+        # bulk_create no envía señales, por lo que se añaden al índice de búsqueda manualmente
+        indexar((*usuarios_crear, *profesores_crear))
+
         # Asignar grupos usando through model directamente para mejor performance
         Usuario_grupos = Usuario.grupos.through
 
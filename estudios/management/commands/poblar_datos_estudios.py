@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from app.busqueda import indexar
 from estudios.management.commands import (
     obtener_modelos_modulo,
     obtener_todos_los_modelos,
@@ -114,6 +115,8 @@ class Command(BaseCommand):
         Materia.objects.bulk_create(
             (Materia(nombre=materia) for materia in MATERIAS), ignore_conflicts=True
         )
+        # con ignore_conflicts los objetos no obtienen su pk, por eso se vuelven a consultar
+        indexar(Materia.objects.all())
 
         self.stdout.write("✓ Materias creadas")
 
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from app.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Vuelve a crear el índice de la búsqueda global de la barra lateral (estudiantes, profesores, secciones, materias y usuarios)"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconstruyendo el índice de búsqueda...")
+
+        cantidad = reconstruir_indice()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {cantidad} objetos indexados"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from estudios.servicios.cuadro_honor import reconstruir_promedios_generales
+
+
+class Command(BaseCommand):
+    help = "Vuelve a calcular los promedios generales del cuadro de honor a partir de los promedios por materia"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconstruyendo el cuadro de honor...")
+
+        cantidad = reconstruir_promedios_generales()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {cantidad} promedios generales calculados")
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from estudios.servicios.promedios import reconstruir_promedios
+
+
+class Command(BaseCommand):
+    help = "Vuelve a calcular los promedios por matrícula y materia a partir de todas las notas"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Reconstruyendo los promedios...")
+
+        cantidad = reconstruir_promedios()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {cantidad} promedios calculados"))
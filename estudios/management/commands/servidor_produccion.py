@@ -0,0 +1,153 @@
+import os
+import sys
+from importlib.util import find_spec
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVIDORES = ("gunicorn", "waitress")
+
+# SQLite hace las escrituras de a una, por lo que más procesos solo alargan las esperas por la base de datos
+MAXIMO_PROCESOS_DEFECTO = 4
+
+
+def cantidad_procesos_defecto() -> int:
+    """Uno por núcleo, hasta MAXIMO_PROCESOS_DEFECTO. No se usa la recomendada por Gunicorn (dos por núcleo más uno), pensada para bases de datos que admiten escrituras simultáneas"""
+
+    return min(os.cpu_count() or 1, MAXIMO_PROCESOS_DEFECTO)
+
+
+def iniciar_gunicorn(opciones: "dict[str, object]"):
+    """Reemplaza este proceso por el de Gunicorn, para que el proceso principal no tenga cargado el código de Django y los procesos que crea al recargar (con la señal HUP) carguen el código actualizado"""
+
+    argumentos = [sys.executable, "-m", "gunicorn", "app.wsgi:application"]
+
+    for nombre, valor in opciones.items():
+        if valor is not None:
+            argumentos += [f"--{nombre}", str(valor)]
+
+    # la configuración de los procesos de Gunicorn lo usa para no rotar los logs desde adentro (ver app.settings)
+    os.environ["VARIOS_PROCESOS"] = "1"
+
+    sys.stdout.flush()
+    os.chdir(settings.BASE_DIR)
+    os.execv(sys.executable, argumentos)
+
+
+def iniciar_waitress(direccion: str, hilos: int, tiempo_limite: int):
+    from waitress import serve
+    from app.wsgi import application
+
+    serve(application, listen=direccion, threads=hilos, channel_timeout=tiempo_limite)
+
+
+class Command(BaseCommand):
+    help = "Inicia el servidor de producción con varios procesos (Gunicorn). En Windows se usa Waitress, que atiende las peticiones con hilos en un solo proceso. Se debe iniciar con python run.py --produccion, para que se cargue la configuración sin DEBUG"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--direccion",
+            default="0.0.0.0:5000",
+            help="Dirección y puerto en los que escucha el servidor (por defecto, 0.0.0.0:5000)",
+        )
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=cantidad_procesos_defecto(),
+            help=f"Cantidad de procesos que atienden las peticiones (por defecto, uno por núcleo hasta {MAXIMO_PROCESOS_DEFECTO}). Todos escriben en el mismo archivo de SQLite, que solo admite una escritura a la vez: más procesos no aumentan las escrituras por segundo",
+        )
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=4,
+            help="Hilos de cada proceso (por defecto, 4)",
+        )
+        parser.add_argument(
+            "--tiempo-limite",
+            type=int,
+            default=60,
+            help="Segundos que puede tardar una petición antes de reiniciar el proceso que la atiende (por defecto, 60)",
+        )
+        parser.add_argument(
+            "--tiempo-cierre",
+            type=int,
+            default=30,
+            help="Segundos que tienen los procesos para terminar sus peticiones al recargar o detener el servidor (por defecto, 30)",
+        )
+        parser.add_argument(
+            "--maximo-peticiones",
+            type=int,
+            default=1000,
+            help="Peticiones que atiende un proceso antes de reemplazarlo, para liberar la memoria que acumula. 0 para no reemplazarlos (por defecto, 1000)",
+        )
+        parser.add_argument(
+            "--variacion-peticiones",
+            type=int,
+            default=100,
+            help="Peticiones aleatorias que se suman al máximo de cada proceso, para que no se reemplacen todos a la vez (por defecto, 100)",
+        )
+        parser.add_argument(
+            "--archivo-pid",
+            help="Archivo donde se guarda el PID del proceso principal, para recargar el servidor con: kill -HUP $(cat ARCHIVO)",
+        )
+        parser.add_argument(
+            "--servidor",
+            choices=SERVIDORES,
+            default="waitress" if sys.platform == "win32" else "gunicorn",
+            help="Servidor a usar (por defecto, Gunicorn, o Waitress en Windows)",
+        )
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            raise CommandError(
+                "El servidor de producción no se puede usar con DEBUG activo. Inícialo con: python run.py --produccion"
+            )
+
+        for opcion in ("procesos", "hilos", "tiempo_limite"):
+            if options[opcion] < 1:
+                raise CommandError(f"--{opcion.replace('_', '-')} debe ser mayor que 0")
+
+        if options["servidor"] == "waitress":
+            if find_spec("waitress") is None:
+                raise CommandError("Waitress no está instalado (pip install waitress)")
+
+            self.stdout.write(
+                self.style.WARNING(
+                    "Waitress usa un solo proceso: se ignoran --procesos, --tiempo-cierre, --maximo-peticiones y --archivo-pid"
+                )
+            )
+            self.stdout.write(
+                f"Iniciando Waitress en {options['direccion']} con {options['hilos']} hilos..."
+            )
+
+            iniciar_waitress(
+                options["direccion"], options["hilos"], options["tiempo_limite"]
+            )
+            return
+
+        if find_spec("gunicorn") is None:
+            raise CommandError(
+                "Gunicorn no está instalado (pip install gunicorn). En Windows usa --servidor waitress"
+            )
+
+        self.stdout.write(
+            f"Iniciando Gunicorn en {options['direccion']} con {options['procesos']} procesos de {options['hilos']} hilos..."
+        )
+        self.stdout.write(
+            "Para recargar el código sin cortar las peticiones, envía la señal HUP al proceso principal"
+        )
+
+        iniciar_gunicorn(
+            {
+                "bind": options["direccion"],
+                "workers": options["procesos"],
+                "threads": options["hilos"],
+                "worker-class": "gthread",
+                "timeout": options["tiempo_limite"],
+                "graceful-timeout": options["tiempo_cierre"],
+                "max-requests": options["maximo_peticiones"],
+                "max-requests-jitter": options["variacion_peticiones"],
+                "pid": options["archivo_pid"],
+                "access-logfile": "-",
+                "error-logfile": "-",
+            }
+        )
@@ -1,6 +1,8 @@
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from app.cache import eliminacion_masiva, incrementar_generacion
 from estudios.modelos.gestion.personas import (
     Matricula,
     Profesor,
@@ -8,12 +10,17 @@ from estudios.modelos.gestion.personas import (
     Estudiante,
     Seccion,
 )
-from estudios.modelos.parametros import Lapso, Materia
+from estudios.modelos.parametros import Año, Lapso, Materia
 
 
 class TipoTarea(models.Model):
     nombre = models.CharField(max_length=64, unique=True)
     descripcion = models.CharField(max_length=128, null=True, blank=True)
+    peso = models.FloatField(
+        default=1,
+        validators=[MinValueValidator(0)],
+        help_text="Peso de las evaluaciones de este tipo en la calificación del lapso",
+    )
 
     class Meta:
         verbose_name = "tipo de evaluación"
@@ -58,6 +65,93 @@ class TareaProfesorMateria(models.Model):
         return f"{self.tarea} - {self.profesormateria.materia.nombre} ({self.profesormateria.seccion.nombre})"
 
 
+# campos que cambian el par (matrícula, materia) o el valor que se suma en los promedios
+CAMPOS_PROMEDIOS = frozenset(("matricula", "tarea_profesormateria", "valor"))
+CAMPOS_PAR_PROMEDIOS = frozenset(("matricula", "tarea_profesormateria"))
+
+
+class NotaQuerySet(models.QuerySet):
+    """Mantiene los promedios por materia (PromedioMateria) y la generación de la caché de las notas también en las operaciones masivas, que no llaman a save() ni a delete() ni envían sus señales"""
+
+    # el servicio de promedios importa este módulo, por eso se importa al usarlo
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from estudios.servicios import promedios
+
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            promedios.actualizar_promedios(promedios.pares_de_objetos(objs))
+
+        incrementar_generacion(self.model)
+
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from estudios.servicios import promedios
+
+        objs = list(objs)
+
+        if CAMPOS_PROMEDIOS.isdisjoint(fields):
+            filas = super().bulk_update(objs, fields, *args, **kwargs)
+        else:
+            with transaction.atomic(using=self.db):
+                anteriores = (
+                    promedios.pares_de_notas(
+                        self.filter(pk__in=[obj.pk for obj in objs])
+                    )
+                    if not CAMPOS_PAR_PROMEDIOS.isdisjoint(fields)
+                    else set()
+                )
+                filas = super().bulk_update(objs, fields, *args, **kwargs)
+                promedios.actualizar_promedios(
+                    anteriores | promedios.pares_de_objetos(objs)
+                )
+
+        incrementar_generacion(self.model)
+
+        return filas
+
+    def update(self, **kwargs):
+        from estudios.servicios import promedios
+
+        if CAMPOS_PROMEDIOS.isdisjoint(kwargs):
+            filas = super().update(**kwargs)
+        else:
+            with transaction.atomic(using=self.db):
+                anteriores = promedios.pares_de_notas(self)
+                pks = (
+                    list(self.values_list("pk", flat=True))
+                    if not CAMPOS_PAR_PROMEDIOS.isdisjoint(kwargs)
+                    else None
+                )
+
+                filas = super().update(**kwargs)
+
+                if pks is not None:
+                    anteriores |= promedios.pares_de_notas(
+                        self.model.objects.filter(pk__in=pks)
+                    )
+
+                promedios.actualizar_promedios(anteriores)
+
+        incrementar_generacion(self.model)
+
+        return filas
+
+    def delete(self):
+        from estudios.servicios import promedios
+
+        with transaction.atomic(using=self.db):
+            pares = promedios.pares_de_notas(self)
+            resultado = super().delete()
+            promedios.actualizar_promedios(pares)
+
+        incrementar_generacion(self.model)
+
+        return resultado
+
+
+@eliminacion_masiva
 class Nota(models.Model):
     matricula = models.ForeignKey(Matricula, on_delete=models.CASCADE)
     valor = models.FloatField(validators=[MinValueValidator(0), MaxValueValidator(20)])
@@ -65,9 +159,67 @@ class Nota(models.Model):
     tarea_profesormateria = models.ForeignKey(
         TareaProfesorMateria, on_delete=models.CASCADE
     )
+    # aumenta en uno cada vez que se guarda la nota. El autoguardado rechaza las ediciones hechas sobre una versión anterior (ver servicios.notas.guardar_notas)
+    version = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="versión"
+    )
+
+    objects = NotaQuerySet.as_manager()
 
     class Meta:
         db_table = "notas"
+        unique_together = ["matricula", "tarea_profesormateria"]
+
+    def unique_error_message(self, model_class, unique_check, *args, **kwargs):
+        if model_class is type(self) and unique_check == (
+            "matricula",
+            "tarea_profesormateria",
+        ):
+            raise ValidationError(
+                "El estudiante ya tiene una nota en esta evaluación",
+                code="unique",
+            )
+        else:
+            return super().unique_error_message(model_class, unique_check)
+
+    def save(self, *args, **kwargs):
+        from estudios.servicios import promedios
+
+        campos = kwargs.get("update_fields")
+
+        # las ediciones desde otros formularios también cambian la versión, para que el autoguardado no las sobrescriba
+        if campos is None:
+            self.version += 1
+
+        if campos is not None and CAMPOS_PROMEDIOS.isdisjoint(campos):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            # la nota pudo cambiar de matrícula o de evaluación, y se debe actualizar también el promedio anterior
+            anteriores = (
+                promedios.pares_de_notas(Nota.objects.filter(pk=self.pk))
+                if self.pk is not None
+                and (campos is None or not CAMPOS_PAR_PROMEDIOS.isdisjoint(campos))
+                else set()
+            )
+
+            super().save(*args, **kwargs)
+
+            promedios.actualizar_promedios(
+                anteriores | promedios.pares_de_objetos([self])
+            )
+
+    def delete(self, *args, **kwargs):
+        from estudios.servicios import promedios
+
+        with transaction.atomic():
+            pares = promedios.pares_de_objetos([self])
+            resultado = super().delete(*args, **kwargs)
+            promedios.actualizar_promedios(pares)
+
+        incrementar_generacion(Nota)
+
+        return resultado
 
     def __str__(self):
         tarea: TareaProfesorMateria = self.tarea_profesormateria
@@ -102,3 +254,134 @@ class Nota(models.Model):
     @lapso.setter
     def lapso(self, lapso):
         self._lapso = lapso
+
+
+@eliminacion_masiva
+class PromedioMateria(models.Model):
+    """Suma, cantidad y promedio de las notas de una matrícula en una materia. Lo mantiene estudios.servicios.promedios cada vez que cambian las notas, para no recorrer todas las notas al mostrar los promedios"""
+
+    matricula = models.ForeignKey(
+        Matricula, on_delete=models.CASCADE, related_name="promedios"
+    )
+    materia = models.ForeignKey(Materia, on_delete=models.CASCADE)
+    suma = models.FloatField(default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+    promedio = models.FloatField(default=0)
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now, verbose_name="fecha de actualización"
+    )
+
+    class Meta:
+        db_table = "promedios_materias"
+        unique_together = ["matricula", "materia"]
+        verbose_name = "promedio de materia"
+        verbose_name_plural = "promedios de materias"
+
+    def __str__(self):
+        return f"{self.matricula} - {self.materia} ({self.promedio:.2f})"
+
+
+@eliminacion_masiva
+class PromedioGeneral(models.Model):
+    """Promedio general (el de los promedios por materia mayores a 0) de una matrícula, con su lapso, sección y año copiados para ordenar los cuadros de honor sin recorrer las notas. Lo mantiene estudios.servicios.cuadro_honor cada vez que cambian los promedios por materia"""
+
+    matricula = models.OneToOneField(
+        Matricula, on_delete=models.CASCADE, related_name="promedio_general"
+    )
+    lapso = models.ForeignKey(Lapso, on_delete=models.CASCADE)
+    seccion = models.ForeignKey(Seccion, on_delete=models.CASCADE)
+    año = models.ForeignKey(Año, on_delete=models.CASCADE)
+    promedio = models.FloatField(default=0)
+    materias = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now, verbose_name="fecha de actualización"
+    )
+
+    class Meta:
+        db_table = "promedios_generales"
+        indexes = [
+            models.Index(
+                fields=["lapso", "-promedio"], name="promedios_generales_orden"
+            )
+        ]
+        verbose_name = "promedio general"
+        verbose_name_plural = "promedios generales"
+
+    def __str__(self):
+        return f"{self.matricula} ({self.promedio:.2f})"
+
+
+@eliminacion_masiva
+class CalificacionLapso(models.Model):
+    """Calificación de una matrícula en una materia: el promedio de sus notas ponderado por el peso del tipo de cada evaluación. La calcula estudios.servicios.calificaciones"""
+
+    matricula = models.ForeignKey(
+        Matricula, on_delete=models.CASCADE, related_name="calificaciones"
+    )
+    materia = models.ForeignKey(Materia, on_delete=models.CASCADE)
+    calificacion = models.FloatField(verbose_name="calificación")
+    # huella de los pesos y lapsos con los que se calculó, para recalcular todo al cambiarlos
+    huella = models.CharField(max_length=64)
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now, verbose_name="fecha de actualización"
+    )
+
+    class Meta:
+        db_table = "calificaciones_lapsos"
+        unique_together = ["matricula", "materia"]
+        verbose_name = "calificación de lapso"
+        verbose_name_plural = "calificaciones de lapsos"
+
+    def __str__(self):
+        return f"{self.matricula} - {self.materia} ({self.calificacion:.2f})"
+
+
+@eliminacion_masiva
+class CalificacionFinal(models.Model):
+    """Calificación final de un estudiante en una materia en un año escolar: el promedio de sus calificaciones de los lapsos del año ponderado por el peso de cada lapso. La calcula estudios.servicios.calificaciones"""
+
+    estudiante = models.ForeignKey(
+        Estudiante, on_delete=models.CASCADE, related_name="calificaciones_finales"
+    )
+    materia = models.ForeignKey(Materia, on_delete=models.CASCADE)
+    # el año escolar se identifica por su primer lapso
+    primer_lapso = models.ForeignKey(
+        Lapso,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="primer lapso del año escolar",
+    )
+    calificacion = models.FloatField(verbose_name="calificación")
+    lapsos = models.PositiveSmallIntegerField(
+        default=0, verbose_name="lapsos calificados"
+    )
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now, verbose_name="fecha de actualización"
+    )
+
+    class Meta:
+        db_table = "calificaciones_finales"
+        unique_together = ["estudiante", "materia", "primer_lapso"]
+        verbose_name = "calificación final"
+        verbose_name_plural = "calificaciones finales"
+
+    def __str__(self):
+        return f"{self.estudiante} - {self.materia} ({self.calificacion:.2f})"
+
+
+@eliminacion_masiva
+class CalificacionPendiente(models.Model):
+    """Estudiante cuyas notas o matrículas cambiaron desde el último cálculo de las calificaciones"""
+
+    estudiante = models.OneToOneField(
+        Estudiante, on_delete=models.CASCADE, related_name="+"
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "calificaciones_pendientes"
+        verbose_name = "calificación pendiente"
+        verbose_name_plural = "calificaciones pendientes"
+
+    def __str__(self):
+        return str(self.estudiante)
@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, RegexValidator
 from django.forms import ValidationError
 from django.utils import timezone
 from app import settings
+from app.util import normalizar_busqueda
 from estudios.modelos.parametros import Seccion, Materia, Lapso
 
 
@@ -13,6 +14,52 @@ validador_alfa = RegexValidator(
 )
 
 
+class PersonaQuerySet(models.QuerySet):
+    """Mantiene las columnas de búsqueda también en las operaciones masivas, que no llaman a save()"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+
+        for obj in objs:
+            obj.actualizar_columnas_busqueda()
+
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = self.model.campos_con_columnas_busqueda(fields)
+
+        for obj in objs:
+            obj.actualizar_columnas_busqueda()
+
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        expresiones: "list[str]" = []
+
+        for campo, columna in self.model.columnas_normalizadas.items():
+            if campo not in kwargs:
+                continue
+
+            # las expresiones (F, Concat...) no se pueden normalizar en python, sus columnas de búsqueda se actualizan con los valores que resultan
+            if hasattr(kwargs[campo], "resolve_expression"):
+                expresiones.append(columna)
+            else:
+                kwargs.setdefault(columna, normalizar_busqueda(kwargs[campo]))
+
+        if not expresiones:
+            return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list("pk", flat=True))
+            filas = super().update(**kwargs)
+            self.model.objects.bulk_update(
+                self.model.objects.filter(pk__in=pks), expresiones
+            )
+
+        return filas
+
+
 class Persona(models.Model):
     class OpcionesSexo(models.TextChoices):
         MASCULINO = "M", "Masculino"
@@ -30,6 +77,26 @@ class Persona(models.Model):
         default=timezone.now, verbose_name="fecha de ingreso"
     )
 
+    # Columnas de búsqueda: copias normalizadas (sin diacríticos y en minúsculas) de las columnas anteriores, con índice para que las búsquedas "igual a" y "empieza con" no recorran toda la tabla
+    cedula_busqueda = models.CharField(
+        max_length=12, default="", editable=False, db_index=True
+    )
+    nombres_busqueda = models.CharField(
+        max_length=128, default="", editable=False, db_index=True
+    )
+    apellidos_busqueda = models.CharField(
+        max_length=128, default="", editable=False, db_index=True
+    )
+
+    # columna original: columna de búsqueda. La usan los filtros de texto para escoger la columna normalizada
+    columnas_normalizadas = {
+        "cedula": "cedula_busqueda",
+        "nombres": "nombres_busqueda",
+        "apellidos": "apellidos_busqueda",
+    }
+
+    objects = PersonaQuerySet.as_manager()
+
     @property
     def nombre_completo(self):
         return f"{self.nombres} {self.apellidos}"
@@ -40,6 +107,33 @@ class Persona(models.Model):
     def __str__(self):
         return self.nombre_completo
 
+    @classmethod
+    def campos_con_columnas_busqueda(cls, campos):
+        """Añade a los campos que se van a guardar las columnas de búsqueda de los que se modificaron"""
+
+        campos = list(campos)
+
+        for campo, columna in cls.columnas_normalizadas.items():
+            if campo in campos and columna not in campos:
+                campos.append(columna)
+
+        return campos
+
+    def actualizar_columnas_busqueda(self):
+        for campo, columna in self.columnas_normalizadas.items():
+            valor = getattr(self, campo)
+            setattr(self, columna, "" if valor is None else normalizar_busqueda(valor))
+
+    def save(self, *args, **kwargs):
+        self.actualizar_columnas_busqueda()
+
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = self.campos_con_columnas_busqueda(
+                kwargs["update_fields"]
+            )
+
+        super().save(*args, **kwargs)
+
 
 class Profesor(Persona):
     telefono = models.CharField(
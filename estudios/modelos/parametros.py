@@ -1,11 +1,14 @@
+import copy
+from contextvars import ContextVar
+from datetime import date
 from django.db import models
+from django.core.signals import request_finished, request_started
 from django.core.validators import MinValueValidator, RegexValidator
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.forms import ValidationError
 from django.utils import timezone
-
-
-def obtener_lapso_actual():
-    return Lapso.objects.last()
+from app.cache import obtener_generacion
 
 
 class Año(models.Model):
@@ -39,6 +42,11 @@ class Lapso(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
     fecha_inicio = models.DateField(verbose_name="fecha de inicio")
     fecha_fin = models.DateField(verbose_name="fecha de fin")
+    peso = models.FloatField(
+        default=1,
+        validators=[MinValueValidator(0)],
+        help_text="Peso del lapso en la calificación final del año escolar",
+    )
 
     class Meta:
         db_table = "lapsos"
@@ -47,6 +55,95 @@ class Lapso(models.Model):
         return f"{self.nombre} - {self.fecha_inicio} / {self.fecha_fin}"
 
 
+def resolver_lapso(fecha: date) -> "Lapso | None":
+    """Lapso en curso en la fecha: el que la incluye entre su inicio y su fin o, si no hay (ej: en vacaciones), el último que empezó antes. Si todos empiezan después, el primero de ellos"""
+
+    lapso = (
+        Lapso.objects.filter(fecha_inicio__lte=fecha)
+        .order_by(
+            models.Case(
+                models.When(fecha_fin__gte=fecha, then=models.Value(0)),
+                default=models.Value(1),
+            ),
+            "-fecha_inicio",
+            "-pk",
+        )
+        .first()
+    )
+
+    if lapso is None:
+        lapso = Lapso.objects.order_by("fecha_inicio", "pk").first()
+
+    return lapso
+
+
+# lapso actual resuelto en el proceso, con la generación de los lapsos y la fecha con las que se resolvió
+_lapso_actual_proceso: "tuple[int, date, Lapso | None] | None" = None
+
+# lapso actual de la petición en curso, para no consultar ni la caché en cada llamada. Fuera de las peticiones (ej: en los comandos) solo se usa el del proceso
+_FUERA_DE_PETICION = object()
+_SIN_RESOLVER = object()
+_lapso_actual_peticion: "ContextVar" = ContextVar(
+    "lapso_actual", default=_FUERA_DE_PETICION
+)
+
+
+def obtener_lapso_actual(fecha: "date | None" = None) -> "Lapso | None":
+    """Lapso en curso (ver resolver_lapso) en la fecha indicada o en la actual. El de la fecha actual se guarda durante la petición y en el proceso, hasta que cambie la fecha o se modifique algún lapso"""
+
+    global _lapso_actual_proceso
+
+    hoy = timezone.localdate()
+
+    if fecha is not None and fecha != hoy:
+        return resolver_lapso(fecha)
+
+    guardado = _lapso_actual_peticion.get()
+
+    if guardado is not _FUERA_DE_PETICION and guardado is not _SIN_RESOLVER:
+        return guardado
+
+    generacion = obtener_generacion(Lapso)
+    proceso = _lapso_actual_proceso
+
+    if proceso is not None and proceso[:2] == (generacion, hoy):
+        lapso = proceso[2]
+    else:
+        lapso = resolver_lapso(hoy)
+        _lapso_actual_proceso = (generacion, hoy, lapso)
+
+    # cada petición recibe su propia copia, ya que la del proceso se comparte entre hilos
+    lapso = copy.copy(lapso)
+
+    if guardado is _SIN_RESOLVER:
+        _lapso_actual_peticion.set(lapso)
+
+    return lapso
+
+
+@receiver(request_started, dispatch_uid="estudios.lapso_actual.inicio_peticion")
+def iniciar_lapso_actual_peticion(sender, **kwargs):
+    _lapso_actual_peticion.set(_SIN_RESOLVER)
+
+
+@receiver(request_finished, dispatch_uid="estudios.lapso_actual.fin_peticion")
+def terminar_lapso_actual_peticion(sender, **kwargs):
+    _lapso_actual_peticion.set(_FUERA_DE_PETICION)
+
+
+@receiver(post_save, sender=Lapso, dispatch_uid="estudios.lapso_actual.guardado")
+@receiver(post_delete, sender=Lapso, dispatch_uid="estudios.lapso_actual.eliminado")
+def invalidar_lapso_actual(sender, **kwargs):
+    """El lapso del proceso se invalida con la generación de los lapsos (que también cambia en los otros procesos), pero el de la petición se debe descartar aquí"""
+
+    global _lapso_actual_proceso
+
+    _lapso_actual_proceso = None
+
+    if _lapso_actual_peticion.get() is not _FUERA_DE_PETICION:
+        _lapso_actual_peticion.set(_SIN_RESOLVER)
+
+
 class Seccion(models.Model):
     año = models.ForeignKey(Año, on_delete=models.CASCADE)
     letra = models.CharField(
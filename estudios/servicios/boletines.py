@@ -0,0 +1,420 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import zipfile
+import django
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple, TypedDict
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+from app.pdf import ALTO_PAGINA, ANCHO_PAGINA, DocumentoPDF
+from estudios.modelos.gestion.calificaciones import Nota, TareaProfesorMateria
+from estudios.modelos.gestion.personas import (
+    Matricula,
+    MatriculaEstados,
+    ProfesorMateria,
+)
+from estudios.modelos.parametros import Lapso, Seccion
+
+DIRECTORIO_BOLETINES = Path(settings.BASE_DIR) / "boletines"
+
+PLANTILLA_BOLETIN = "calificaciones/boletines/boletin.html"
+
+# archivo de cada sección con la huella de los datos de cada boletín, para regenerar solo los que cambiaron
+NOMBRE_MANIFIESTO = "manifiesto.json"
+
+# se incrementa al cambiar el contenido o el formato de los boletines, para que se regeneren todos
+VERSION_BOLETINES = 2
+
+# secciones cuyos boletines se generan mientras se obtienen los datos de la siguiente. Limita los documentos en memoria
+SECCIONES_EN_CURSO = 2
+
+
+class EvaluacionBoletin(TypedDict):
+    tipo: str
+    fecha: str
+    valor: "float | None"
+
+
+class MateriaBoletin(TypedDict):
+    nombre: str
+    profesor: str
+    evaluaciones: "list[EvaluacionBoletin]"
+    promedio: "float | None"
+
+
+class DatosBoletin(TypedDict):
+    """Todo lo que muestra un boletín, sin objetos de los modelos: se envía a otros procesos y define su huella"""
+
+    matricula: int
+    cedula: int
+    nombres: str
+    apellidos: str
+    seccion: str
+    lapso: str
+    materias: "list[MateriaBoletin]"
+    promedio_general: "float | None"
+
+
+class ResultadoSeccion(NamedTuple):
+    seccion: str
+    archivo: Path
+    generados: int
+    reutilizados: int
+    eliminados: int
+
+
+def promedio(valores: "Iterable[float | None]") -> "float | None":
+    valores = [valor for valor in valores if valor is not None]
+    return sum(valores) / len(valores) if valores else None
+
+
+def obtener_datos_seccion(seccion: Seccion, lapso: Lapso) -> "list[DatosBoletin]":
+    """Datos de los boletines de los estudiantes activos de la sección en el lapso, con una consulta para las matrículas, una para las materias, una para las evaluaciones y una para todas las notas"""
+
+    matriculas = list(
+        Matricula.objects.filter(
+            seccion=seccion, lapso=lapso, estado=MatriculaEstados.ACTIVO
+        )
+        .select_related("estudiante")
+        .order_by("estudiante__apellidos", "estudiante__nombres")
+    )
+
+    if not matriculas:
+        return []
+
+    materias_impartidas = list(
+        ProfesorMateria.objects.filter(seccion=seccion)
+        .select_related("materia", "profesor")
+        .order_by("materia__nombre")
+    )
+
+    tareas_por_materia: "defaultdict[int, list[TareaProfesorMateria]]" = defaultdict(
+        list
+    )
+
+    for tarea in (
+        TareaProfesorMateria.objects.filter(
+            profesormateria__seccion=seccion, tarea__lapso=lapso
+        )
+        .select_related("tarea", "tarea__tipo")
+        .order_by("tarea__fecha_añadida", "pk")
+    ):
+        tareas_por_materia[tarea.profesormateria_id].append(tarea)  # type: ignore - sí existe "profesormateria_id"
+
+    notas = {
+        (matricula, tarea): valor
+        for matricula, tarea, valor in Nota.objects.filter(
+            matricula__seccion=seccion,
+            matricula__lapso=lapso,
+            tarea_profesormateria__tarea__lapso=lapso,
+        ).values_list("matricula_id", "tarea_profesormateria_id", "valor")
+    }
+
+    nombre_seccion = str(seccion)
+    nombre_lapso = lapso.nombre
+    boletines: "list[DatosBoletin]" = []
+
+    for matricula in matriculas:
+        estudiante = matricula.estudiante
+        materias: "list[MateriaBoletin]" = []
+
+        for materia_impartida in materias_impartidas:
+            evaluaciones: "list[EvaluacionBoletin]" = [
+                {
+                    "tipo": tarea.tarea.tipo.nombre,
+                    "fecha": timezone.localtime(tarea.tarea.fecha_añadida).strftime(
+                        "%d/%m/%Y"
+                    ),
+                    "valor": notas.get((matricula.pk, tarea.pk)),
+                }
+                for tarea in tareas_por_materia[materia_impartida.pk]
+            ]
+
+            materias.append(
+                {
+                    "nombre": materia_impartida.materia.nombre,
+                    "profesor": f"{materia_impartida.profesor.nombres} {materia_impartida.profesor.apellidos}",
+                    "evaluaciones": evaluaciones,
+                    "promedio": promedio(e["valor"] for e in evaluaciones),
+                }
+            )
+
+        boletines.append(
+            {
+                "matricula": matricula.pk,
+                "cedula": estudiante.cedula,
+                "nombres": estudiante.nombres,
+                "apellidos": estudiante.apellidos,
+                "seccion": nombre_seccion,
+                "lapso": nombre_lapso,
+                "materias": materias,
+                "promedio_general": promedio(m["promedio"] for m in materias),
+            }
+        )
+
+    return boletines
+
+
+def nombre_boletin(datos: DatosBoletin) -> str:
+    nombre = slugify(f"{datos['apellidos']} {datos['nombres']}")
+    return f"{datos['cedula']}-{nombre}"
+
+
+def huella_boletin(datos: DatosBoletin) -> str:
+    return hashlib.sha256(
+        json.dumps([VERSION_BOLETINES, datos], sort_keys=True).encode()
+    ).hexdigest()
+
+
+def ruta_archivo_seccion(directorio: Path, seccion: Seccion, lapso: Lapso) -> Path:
+    return directorio / f"lapso-{lapso.pk}" / f"{slugify(str(seccion))}.zip"
+
+
+def formatear_nota(valor: "float | None", decimales: int) -> str:
+    return "-" if valor is None else f"{valor:.{decimales}f}"
+
+
+def boletin_pdf(datos: DatosBoletin) -> bytes:
+    margen = 50
+    derecha = ANCHO_PAGINA - margen
+    centro = ANCHO_PAGINA / 2
+
+    documento = DocumentoPDF(f"Boletín - {datos['apellidos']}, {datos['nombres']}")
+
+    documento.texto(centro, 60, "Liceo Mijaguas", 16, "negrita", "centro")
+    documento.texto(centro, 80, "Boletín de calificaciones", 12, "negrita", "centro")
+    documento.texto(centro, 96, datos["lapso"], 10, alineacion="centro")
+    documento.linea(margen, 106, derecha, 106, 1.5)
+
+    documento.texto(margen, 126, "Estudiante:", fuente="negrita")
+    documento.texto(margen + 70, 126, f"{datos['apellidos']}, {datos['nombres']}")
+    documento.texto(margen + 360, 126, "Cédula:", fuente="negrita")
+    documento.texto(margen + 405, 126, str(datos["cedula"]))
+    documento.texto(margen, 142, "Sección:", fuente="negrita")
+    documento.texto(margen + 70, 142, datos["seccion"])
+
+    y = 172
+    inicio_pagina = margen + 10
+    limite = ALTO_PAGINA - margen
+
+    def encabezado_materia(materia: MateriaBoletin, y: float, sufijo: str = ""):
+        documento.texto(margen, y, materia["nombre"] + sufijo, 11, "negrita")
+        documento.texto(derecha, y, materia["profesor"], 9, alineacion="derecha")
+        documento.linea(margen, y + 4, derecha, y + 4)
+
+    def continuar_materia(materia: MateriaBoletin) -> float:
+        """Pasa a una nueva página y repite el encabezado de la materia. Retorna la posición de la siguiente fila"""
+
+        documento.nueva_pagina()
+        encabezado_materia(materia, inicio_pagina, " (continuación)")
+
+        return inicio_pagina + 16
+
+    for materia in datos["materias"]:
+        alto = 40 + len(materia["evaluaciones"]) * 14
+
+        # la materia no se separa de sus evaluaciones al cambiar de página, salvo que no quepan en una página. En ese caso se continúa en las siguientes, pero el encabezado no se queda solo al final de una página
+        if y + 30 > limite or (y + alto > limite and alto <= limite - inicio_pagina):
+            documento.nueva_pagina()
+            y = inicio_pagina
+
+        encabezado_materia(materia, y)
+        y += 16
+
+        for evaluacion in materia["evaluaciones"]:
+            if y > limite:
+                y = continuar_materia(materia)
+
+            documento.texto(margen + 10, y, evaluacion["tipo"], 9)
+            documento.texto(derecha - 120, y, evaluacion["fecha"], 9)
+            documento.texto(
+                derecha,
+                y,
+                formatear_nota(evaluacion["valor"], 1),
+                9,
+                alineacion="derecha",
+            )
+            y += 14
+
+        if y > limite:
+            y = continuar_materia(materia)
+
+        documento.texto(derecha - 120, y, "Promedio", 9, "negrita")
+        documento.texto(
+            derecha,
+            y,
+            formatear_nota(materia["promedio"], 2),
+            9,
+            "negrita",
+            "derecha",
+        )
+        y += 24
+
+    if y > limite:
+        documento.nueva_pagina()
+        y = inicio_pagina
+
+    documento.linea(margen, y - 12, derecha, y - 12, 1.5)
+    documento.texto(margen, y, "Promedio general", 11, "negrita")
+    documento.texto(
+        derecha,
+        y,
+        formatear_nota(datos["promedio_general"], 2),
+        11,
+        "negrita",
+        "derecha",
+    )
+
+    return documento.a_bytes()
+
+
+def renderizar_boletin(datos: DatosBoletin) -> "tuple[str, bytes, bytes]":
+    """Genera el HTML y el PDF de un boletín. Solo usa los datos recibidos, por lo que se puede ejecutar en otro proceso sin acceder a la base de datos"""
+
+    html = render_to_string(PLANTILLA_BOLETIN, {"boletin": datos})
+
+    return nombre_boletin(datos), html.encode(), boletin_pdf(datos)
+
+
+def crear_ejecutor(procesos: int) -> Executor:
+    if procesos <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+
+    # "spawn" en todas las plataformas: es la única disponible en Windows y evita copiar las conexiones a la base de datos. Los procesos se inician sin el estado del principal, por eso se prepara Django antes de recibir los boletines (que importan este módulo y los modelos)
+    return ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    )
+
+
+def leer_manifiesto(ruta: Path) -> "dict[str, str]":
+    try:
+        with zipfile.ZipFile(ruta) as archivo:
+            return json.loads(archivo.read(NOMBRE_MANIFIESTO))
+    except (FileNotFoundError, KeyError, zipfile.BadZipFile, json.JSONDecodeError):
+        return {}
+
+
+class SeccionEnCurso(NamedTuple):
+    seccion: str
+    ruta: Path
+    boletines: "list[DatosBoletin]"
+    huellas: "dict[str, str]"
+    futuros: "list[Future]"
+    eliminados: int
+
+
+def escribir_archivo_seccion(en_curso: SeccionEnCurso) -> ResultadoSeccion:
+    """Escribe el archivo de la sección con los boletines generados y los que no cambiaron copiados del archivo anterior. Se reemplaza al terminar, para no dejar un archivo incompleto si se interrumpe"""
+
+    generados = {
+        nombre: (html, pdf)
+        for nombre, html, pdf in (futuro.result() for futuro in en_curso.futuros)
+    }
+
+    en_curso.ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = en_curso.ruta.with_name(f"{en_curso.ruta.name}.tmp")
+    anterior = (
+        zipfile.ZipFile(en_curso.ruta)
+        if len(generados) < len(en_curso.boletines)
+        else None
+    )
+
+    try:
+        with zipfile.ZipFile(temporal, "w", zipfile.ZIP_DEFLATED) as archivo:
+            for nombre in en_curso.huellas:
+                if nombre in generados:
+                    html, pdf = generados[nombre]
+                else:
+                    html = anterior.read(f"{nombre}.html")  # type: ignore - hay archivo anterior si no se generaron todos
+                    pdf = anterior.read(f"{nombre}.pdf")  # type: ignore - hay archivo anterior si no se generaron todos
+
+                archivo.writestr(f"{nombre}.html", html)
+                archivo.writestr(f"{nombre}.pdf", pdf)
+
+            archivo.writestr(NOMBRE_MANIFIESTO, json.dumps(en_curso.huellas, indent=2))
+    finally:
+        if anterior is not None:
+            anterior.close()
+
+    os.replace(temporal, en_curso.ruta)
+
+    return ResultadoSeccion(
+        en_curso.seccion,
+        en_curso.ruta,
+        len(generados),
+        len(en_curso.boletines) - len(generados),
+        en_curso.eliminados,
+    )
+
+
+def generar_boletines(
+    lapso: Lapso,
+    secciones: "Iterable[Seccion] | None" = None,
+    procesos: "int | None" = None,
+    forzar: bool = False,
+    directorio: Path = DIRECTORIO_BOLETINES,
+) -> "list[ResultadoSeccion]":
+    """Genera los boletines (HTML y PDF) de los estudiantes de las secciones en el lapso, en un archivo .zip por sección. Los datos se obtienen por sección en el proceso principal y los documentos se generan en varios procesos. Sin "forzar" solo se generan los boletines cuyos datos cambiaron desde la última vez, y los demás se copian del archivo anterior"""
+
+    if secciones is None:
+        secciones = (
+            Seccion.objects.filter(matricula__lapso=lapso)
+            .select_related("año")
+            .distinct()
+        )
+
+    resultados: "list[ResultadoSeccion]" = []
+    en_curso: "deque[SeccionEnCurso]" = deque()
+
+    with crear_ejecutor(procesos or os.cpu_count() or 1) as ejecutor:
+        for seccion in secciones:
+            boletines = obtener_datos_seccion(seccion, lapso)
+            ruta = ruta_archivo_seccion(directorio, seccion, lapso)
+
+            huellas = {
+                nombre_boletin(datos): huella_boletin(datos) for datos in boletines
+            }
+            anteriores = {} if forzar or not ruta.exists() else leer_manifiesto(ruta)
+            pendientes = [
+                datos
+                for datos in boletines
+                if anteriores.get(nombre_boletin(datos))
+                != huellas[nombre_boletin(datos)]
+            ]
+            eliminados = len(anteriores.keys() - huellas.keys())
+
+            if not pendientes and not eliminados and ruta.exists():
+                resultados.append(
+                    ResultadoSeccion(str(seccion), ruta, 0, len(boletines), 0)
+                )
+                continue
+
+            en_curso.append(
+                SeccionEnCurso(
+                    str(seccion),
+                    ruta,
+                    boletines,
+                    huellas,
+                    [
+                        ejecutor.submit(renderizar_boletin, datos)
+                        for datos in pendientes
+                    ],
+                    eliminados,
+                )
+            )
+
+            if len(en_curso) > SECCIONES_EN_CURSO:
+                resultados.append(escribir_archivo_seccion(en_curso.popleft()))
+
+        while en_curso:
+            resultados.append(escribir_archivo_seccion(en_curso.popleft()))
+
+    return resultados
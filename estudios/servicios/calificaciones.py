@@ -0,0 +1,260 @@
+import hashlib
+import json
+from typing import Iterable, NamedTuple
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from app.cache import incrementar_generacion
+from estudios.modelos.gestion.calificaciones import (
+    CalificacionFinal,
+    CalificacionLapso,
+    CalificacionPendiente,
+    Nota,
+    Tarea,
+    TipoTarea,
+)
+from estudios.modelos.gestion.personas import Estudiante, Matricula
+from estudios.modelos.parametros import Lapso
+
+RUTA_MATERIA_NOTA = "tarea_profesormateria__profesormateria__materia"
+RUTA_PESO_NOTA = "tarea_profesormateria__tarea__tipo__peso"
+
+# estudiantes que se calculan por consulta, para no exceder el límite de parámetros de SQLite
+TAMAÑO_LOTE_CALIFICACIONES = 500
+
+
+class ConfiguracionCalificaciones(NamedTuple):
+    # primer lapso del año escolar de cada lapso
+    años_escolares: "dict[int, int]"
+    # huella de los pesos y de los años escolares, que se guarda con las calificaciones
+    huella: str
+
+
+class ResultadoCalificaciones(NamedTuple):
+    completo: bool
+    estudiantes: int
+    calificaciones_lapsos: int
+    calificaciones_finales: int
+
+
+def obtener_configuracion() -> ConfiguracionCalificaciones:
+    """Agrupa los lapsos en años escolares: en orden de inicio, cada año empieza en el lapso cuyo número no es mayor que el del anterior (normalmente el lapso 1)"""
+
+    años_escolares: "dict[int, int]" = {}
+    primer_lapso = numero_anterior = None
+    pesos_lapsos = []
+
+    for lapso_id, numero, peso in Lapso.objects.order_by(
+        "fecha_inicio", "pk"
+    ).values_list("pk", "numero", "peso"):
+        if primer_lapso is None or numero <= numero_anterior:
+            primer_lapso = lapso_id
+
+        años_escolares[lapso_id] = primer_lapso
+        numero_anterior = numero
+        pesos_lapsos.append((lapso_id, peso))
+
+    pesos_tipos = list(TipoTarea.objects.order_by("pk").values_list("pk", "peso"))
+
+    huella = hashlib.sha256(
+        json.dumps([pesos_tipos, pesos_lapsos, sorted(años_escolares.items())]).encode()
+    ).hexdigest()
+
+    return ConfiguracionCalificaciones(años_escolares, huella)
+
+
+def marcar_pendientes(estudiantes: "Iterable[int]"):
+    """Marca a los estudiantes para que se recalculen sus calificaciones. Si ya estaban marcados se actualiza la fecha, para no descartarlos en un cálculo que empezó antes del cambio"""
+
+    fecha = timezone.now()
+
+    CalificacionPendiente.objects.bulk_create(
+        [
+            CalificacionPendiente(estudiante_id=estudiante, fecha=fecha)
+            for estudiante in set(estudiantes)
+        ],
+        update_conflicts=True,
+        unique_fields=["estudiante"],
+        update_fields=["fecha"],
+    )
+
+
+def marcar_pendientes_matriculas(matriculas: "Iterable[int]"):
+    marcar_pendientes(
+        Matricula.objects.filter(pk__in=set(matriculas)).values_list(
+            "estudiante_id", flat=True
+        )
+    )
+
+
+def calcular_lote(
+    estudiantes: "list[int]", configuracion: ConfiguracionCalificaciones, fecha
+) -> "tuple[int, int]":
+    """Calcula las calificaciones de los lapsos y las finales de los estudiantes indicados con consultas agrupadas, y elimina las que ya no tienen notas. Retorna la cantidad de calificaciones de lapsos y finales"""
+
+    calificaciones_lapsos = [
+        CalificacionLapso(
+            matricula_id=fila["matricula_id"],
+            materia_id=fila["id_materia"],
+            calificacion=fila["suma"] / fila["pesos"],
+            huella=configuracion.huella,
+            fecha_actualizacion=fecha,
+        )
+        for fila in Nota.objects.filter(matricula__estudiante__in=estudiantes)
+        .order_by()
+        .values("matricula_id", id_materia=F(RUTA_MATERIA_NOTA))
+        .annotate(suma=Sum(F("valor") * F(RUTA_PESO_NOTA)), pesos=Sum(RUTA_PESO_NOTA))
+        .filter(pesos__gt=0)
+    ]
+
+    CalificacionLapso.objects.bulk_create(
+        calificaciones_lapsos,
+        update_conflicts=True,
+        unique_fields=["matricula", "materia"],
+        update_fields=["calificacion", "huella", "fecha_actualizacion"],
+    )
+    CalificacionLapso.objects.filter(
+        matricula__estudiante__in=estudiantes, fecha_actualizacion__lt=fecha
+    ).delete()
+
+    # el año escolar de cada calificación se obtiene del lapso de su matrícula
+    año_escolar = Case(
+        *(
+            When(matricula__lapso_id=lapso, then=Value(primer_lapso))
+            for lapso, primer_lapso in configuracion.años_escolares.items()
+        ),
+        output_field=IntegerField(),
+    )
+
+    calificaciones_finales = [
+        CalificacionFinal(
+            estudiante_id=fila["id_estudiante"],
+            materia_id=fila["materia_id"],
+            primer_lapso_id=fila["id_primer_lapso"],
+            calificacion=fila["suma"] / fila["pesos"],
+            lapsos=fila["lapsos"],
+            fecha_actualizacion=fecha,
+        )
+        for fila in CalificacionLapso.objects.filter(
+            matricula__estudiante__in=estudiantes
+        )
+        .order_by()
+        .values(
+            "materia_id",
+            id_estudiante=F("matricula__estudiante_id"),
+            id_primer_lapso=año_escolar,
+        )
+        .annotate(
+            suma=Sum(F("calificacion") * F("matricula__lapso__peso")),
+            pesos=Sum("matricula__lapso__peso"),
+            lapsos=Count("pk"),
+        )
+        .filter(pesos__gt=0)
+    ]
+
+    CalificacionFinal.objects.bulk_create(
+        calificaciones_finales,
+        update_conflicts=True,
+        unique_fields=["estudiante", "materia", "primer_lapso"],
+        update_fields=["calificacion", "lapsos", "fecha_actualizacion"],
+    )
+    CalificacionFinal.objects.filter(
+        estudiante__in=estudiantes, fecha_actualizacion__lt=fecha
+    ).delete()
+
+    return len(calificaciones_lapsos), len(calificaciones_finales)
+
+
+@transaction.atomic
+def calcular_calificaciones(completo: bool = False) -> ResultadoCalificaciones:
+    """Calcula las calificaciones ponderadas de los lapsos y las finales de los estudiantes cuyas notas cambiaron desde el último cálculo, o de todos si se indica, si no hay calificaciones o si cambiaron los pesos o los lapsos"""
+
+    configuracion = obtener_configuracion()
+    fecha = timezone.now()
+
+    completo = (
+        completo
+        or not CalificacionLapso.objects.exists()
+        or CalificacionLapso.objects.exclude(huella=configuracion.huella).exists()
+    )
+
+    if completo:
+        estudiantes = list(
+            Matricula.objects.order_by()
+            .values_list("estudiante_id", flat=True)
+            .distinct()
+        )
+    else:
+        estudiantes = list(
+            CalificacionPendiente.objects.filter(fecha__lte=fecha).values_list(
+                "estudiante_id", flat=True
+            )
+        )
+
+    total_lapsos = total_finales = 0
+
+    for i in range(0, len(estudiantes), TAMAÑO_LOTE_CALIFICACIONES):
+        lapsos, finales = calcular_lote(
+            estudiantes[i : i + TAMAÑO_LOTE_CALIFICACIONES], configuracion, fecha
+        )
+        total_lapsos += lapsos
+        total_finales += finales
+
+    if completo:
+        # calificaciones de los estudiantes que ya no tienen matrículas
+        CalificacionFinal.objects.filter(fecha_actualizacion__lt=fecha).delete()
+
+    CalificacionPendiente.objects.filter(fecha__lte=fecha).delete()
+
+    incrementar_generacion(CalificacionLapso, CalificacionFinal, CalificacionPendiente)
+
+    return ResultadoCalificaciones(
+        completo, len(estudiantes), total_lapsos, total_finales
+    )
+
+
+# los cambios en las notas se marcan desde estudios.servicios.promedios, que recibe los de todas las operaciones (incluidas las masivas y las eliminaciones en cascada)
+
+
+@receiver(post_save, sender=Tarea, dispatch_uid="estudios.calificaciones.tarea")
+def marcar_pendientes_tarea(
+    sender, instance: Tarea, created: bool, raw=False, **kwargs
+):
+    """El tipo de la tarea, y con él el peso de sus notas, pudo cambiar"""
+
+    if not created and not raw:
+        marcar_pendientes(
+            Nota.objects.filter(tarea_profesormateria__tarea=instance)
+            .order_by()
+            .values_list("matricula__estudiante_id", flat=True)
+            .distinct()
+        )
+
+
+@receiver(post_save, sender=Matricula, dispatch_uid="estudios.calificaciones.matricula")
+def marcar_pendiente_matricula(
+    sender, instance: Matricula, created: bool, raw=False, **kwargs
+):
+    """El lapso de la matrícula, y con él el año escolar de sus calificaciones, pudo cambiar"""
+
+    if not created and not raw:
+        marcar_pendientes((instance.estudiante_id,))  # type: ignore - sí existe "estudiante_id"
+
+
+@receiver(
+    post_delete,
+    sender=Matricula,
+    dispatch_uid="estudios.calificaciones.matricula_eliminada",
+)
+def marcar_pendiente_matricula_eliminada(sender, instance: Matricula, **kwargs):
+    """Las calificaciones de la matrícula ya no cuentan en la final. Se marca al confirmar la transacción y solo si el estudiante existe, ya que la matrícula se pudo eliminar en cascada con él"""
+
+    estudiante_id = instance.estudiante_id  # type: ignore - sí existe "estudiante_id"
+
+    transaction.on_commit(
+        lambda: marcar_pendientes(
+            Estudiante.objects.filter(pk=estudiante_id).values_list("pk", flat=True)
+        )
+    )
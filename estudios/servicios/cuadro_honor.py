@@ -0,0 +1,303 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, NamedTuple, TypedDict
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from app.cache import incrementar_generacion, obtener_generacion
+from estudios.modelos.gestion.calificaciones import PromedioGeneral, PromedioMateria
+from estudios.modelos.gestion.personas import Matricula, MatriculaEstados
+from estudios.modelos.parametros import Lapso, Seccion
+
+# matrículas que se recalculan por consulta, para no exceder el límite de parámetros de SQLite
+TAMAÑO_LOTE_PROMEDIOS_GENERALES = 500
+
+# tiempo máximo que se guardan las clasificaciones, por si se modifican los promedios sin enviar señales
+TIEMPO_CACHE_CUADRO_HONOR = 60 * 10
+
+CAMPOS_PROMEDIO_GENERAL = [
+    "lapso",
+    "seccion",
+    "año",
+    "promedio",
+    "materias",
+    "fecha_actualizacion",
+]
+
+
+def calcular_promedios_generales(promedios) -> "Iterable[dict]":
+    """Promedio general (de los promedios mayores a 0) por matrícula, con los datos de la matrícula que se copian"""
+
+    return (
+        promedios.filter(promedio__gt=0)
+        .order_by()
+        .values(
+            "matricula_id",
+            id_lapso=F("matricula__lapso_id"),
+            id_seccion=F("matricula__seccion_id"),
+            id_año=F("matricula__seccion__año_id"),
+        )
+        .annotate(promedio_general=Avg("promedio"), cantidad=Count("pk"))
+    )
+
+
+def crear_promedio_general(fila: dict, fecha) -> PromedioGeneral:
+    return PromedioGeneral(
+        matricula_id=fila["matricula_id"],
+        lapso_id=fila["id_lapso"],
+        seccion_id=fila["id_seccion"],
+        año_id=fila["id_año"],
+        promedio=fila["promedio_general"],
+        materias=fila["cantidad"],
+        fecha_actualizacion=fecha,
+    )
+
+
+@transaction.atomic
+def actualizar_promedios_generales(matriculas: "Iterable[int]"):
+    """Recalcula los promedios generales de las matrículas indicadas desde sus promedios por materia, y elimina los de las que se quedaron sin promedios"""
+
+    matriculas = list(set(matriculas))
+
+    if not matriculas:
+        return
+
+    fecha = timezone.now()
+
+    for i in range(0, len(matriculas), TAMAÑO_LOTE_PROMEDIOS_GENERALES):
+        lote = matriculas[i : i + TAMAÑO_LOTE_PROMEDIOS_GENERALES]
+
+        promedios = [
+            crear_promedio_general(fila, fecha)
+            for fila in calcular_promedios_generales(
+                PromedioMateria.objects.filter(matricula__in=lote)
+            )
+        ]
+
+        PromedioGeneral.objects.bulk_create(
+            promedios,
+            update_conflicts=True,
+            unique_fields=["matricula"],
+            update_fields=CAMPOS_PROMEDIO_GENERAL,
+        )
+
+        con_promedio = {p.matricula_id for p in promedios}  # type: ignore - sí existe "matricula_id"
+
+        if sin_promedios := set(lote).difference(con_promedio):
+            PromedioGeneral.objects.filter(matricula__in=sin_promedios).delete()
+
+    incrementar_generacion(PromedioGeneral)
+
+
+@transaction.atomic
+def reconstruir_promedios_generales(tamaño_lote: int = 1000) -> int:
+    """Vuelve a calcular todos los promedios generales desde los promedios por materia"""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PromedioGeneral._meta.db_table}")
+
+    fecha = timezone.now()
+    cantidad = 0
+    lote = []
+
+    for fila in calcular_promedios_generales(PromedioMateria.objects.all()).iterator(
+        chunk_size=tamaño_lote
+    ):
+        lote.append(crear_promedio_general(fila, fecha))
+
+        if len(lote) >= tamaño_lote:
+            PromedioGeneral.objects.bulk_create(lote)
+            cantidad += len(lote)
+            lote = []
+
+    PromedioGeneral.objects.bulk_create(lote)
+    cantidad += len(lote)
+
+    incrementar_generacion(PromedioGeneral)
+
+    return cantidad
+
+
+class PuestoCuadroHonor(NamedTuple):
+    puesto: int
+    matricula_id: int
+    promedio: float
+
+
+class Clasificacion:
+    """Matrículas de un año o una sección ordenadas por promedio general (de mayor a menor). Los promedios se guardan negados y en orden ascendente, para obtener los puestos y percentiles con búsquedas binarias"""
+
+    __slots__ = ("matriculas", "claves", "posiciones")
+
+    def __init__(self):
+        self.matriculas = array("q")
+        self.claves = array("d")
+        self.posiciones: "dict[int, int]" = {}
+
+    def __len__(self):
+        return len(self.matriculas)
+
+    def agregar(self, matricula_id: int, promedio: float):
+        """Agrega una matrícula al final, por lo que se deben agregar en orden"""
+
+        self.posiciones[matricula_id] = len(self.matriculas)
+        self.matriculas.append(matricula_id)
+        self.claves.append(-promedio)
+
+    def puesto_promedio(self, promedio: float) -> int:
+        """Puesto que ocuparía el promedio indicado. Los promedios iguales comparten el puesto"""
+
+        return bisect_left(self.claves, -promedio) + 1
+
+    def puesto(self, matricula_id: int) -> "int | None":
+        posicion = self.posiciones.get(matricula_id)
+
+        if posicion is None:
+            return None
+
+        return bisect_left(self.claves, self.claves[posicion]) + 1
+
+    def percentil(self, matricula_id: int) -> "float | None":
+        """Porcentaje de las matrículas con un promedio menor, contando la mitad de las que tienen el mismo promedio"""
+
+        posicion = self.posiciones.get(matricula_id)
+
+        if posicion is None:
+            return None
+
+        clave = self.claves[posicion]
+        mayores_o_iguales = bisect_right(self.claves, clave)
+        iguales = mayores_o_iguales - bisect_left(self.claves, clave)
+
+        return (len(self) - mayores_o_iguales + iguales / 2) / len(self) * 100
+
+    def primeros(self, cantidad: int) -> "list[PuestoCuadroHonor]":
+        """Las primeras matrículas, incluyendo las empatadas con la última"""
+
+        if cantidad <= 0 or not self.matriculas:
+            return []
+
+        fin = min(cantidad, len(self))
+        fin = bisect_right(self.claves, self.claves[fin - 1])
+
+        return [
+            PuestoCuadroHonor(
+                bisect_left(self.claves, self.claves[i]) + 1,
+                self.matriculas[i],
+                -self.claves[i],
+            )
+            for i in range(fin)
+        ]
+
+
+class PosicionCuadroHonor(TypedDict):
+    puesto: int
+    percentil: float
+    total: int
+
+
+def buscar_posicion(
+    clasificaciones: "dict[int, Clasificacion]", matricula_id: int
+) -> "PosicionCuadroHonor | None":
+    """Puesto y percentil de la matrícula en la clasificación (de las indicadas) en la que se encuentra"""
+
+    for clasificacion in clasificaciones.values():
+        if matricula_id in clasificacion.posiciones:
+            return {
+                "puesto": clasificacion.puesto(matricula_id),  # type: ignore - la matrícula está en la clasificación
+                "percentil": clasificacion.percentil(matricula_id),  # type: ignore - la matrícula está en la clasificación
+                "total": len(clasificacion),
+            }
+
+    return None
+
+
+class CuadroHonorLapso(NamedTuple):
+    años: "dict[int, Clasificacion]"
+    secciones: "dict[int, Clasificacion]"
+
+
+def calcular_cuadro_honor(lapso: Lapso) -> CuadroHonorLapso:
+    """Clasificaciones por año y por sección de las matrículas activas del lapso, con una sola consulta ordenada por el índice de los promedios generales"""
+
+    cuadro = CuadroHonorLapso({}, {})
+
+    for matricula_id, seccion_id, año_id, promedio in (
+        PromedioGeneral.objects.filter(
+            lapso=lapso, matricula__estado=MatriculaEstados.ACTIVO
+        )
+        .order_by("-promedio", "matricula_id")
+        .values_list("matricula_id", "seccion_id", "año_id", "promedio")
+    ):
+        if año_id not in cuadro.años:
+            cuadro.años[año_id] = Clasificacion()
+
+        if seccion_id not in cuadro.secciones:
+            cuadro.secciones[seccion_id] = Clasificacion()
+
+        cuadro.años[año_id].agregar(matricula_id, promedio)
+        cuadro.secciones[seccion_id].agregar(matricula_id, promedio)
+
+    return cuadro
+
+
+def obtener_cuadro_honor(lapso: Lapso) -> CuadroHonorLapso:
+    """Obtiene las clasificaciones del lapso, guardándolas en caché hasta que cambien los promedios generales o las matrículas"""
+
+    clave = "cuadro_honor:{}:{}:{}".format(
+        lapso.pk, obtener_generacion(PromedioGeneral), obtener_generacion(Matricula)
+    )
+    cuadro = cache.get(clave)
+
+    if cuadro is None:
+        cuadro = calcular_cuadro_honor(lapso)
+        cache.set(clave, cuadro, TIEMPO_CACHE_CUADRO_HONOR)
+
+    return cuadro
+
+
+# el año y la sección se copian en los promedios generales, por lo que se actualizan al cambiarlos en la matrícula o la sección
+
+
+@receiver(post_save, sender=Matricula, dispatch_uid="estudios.cuadro_honor.matricula")
+def actualizar_datos_matricula(
+    sender, instance: Matricula, created: bool, raw=False, **kwargs
+):
+    if created or raw:
+        return
+
+    filas = (
+        PromedioGeneral.objects.filter(matricula=instance)
+        .exclude(
+            lapso_id=instance.lapso_id,  # type: ignore - sí existen los "_id"
+            seccion_id=instance.seccion_id,  # type: ignore - sí existen los "_id"
+        )
+        .update(
+            lapso_id=instance.lapso_id,  # type: ignore - sí existen los "_id"
+            seccion_id=instance.seccion_id,  # type: ignore - sí existen los "_id"
+            año_id=Seccion.objects.filter(pk=instance.seccion_id).values("año_id"),  # type: ignore - sí existe "seccion_id"
+        )
+    )
+
+    if filas:
+        incrementar_generacion(PromedioGeneral)
+
+
+@receiver(post_save, sender=Seccion, dispatch_uid="estudios.cuadro_honor.seccion")
+def actualizar_año_seccion(
+    sender, instance: Seccion, created: bool, raw=False, **kwargs
+):
+    if created or raw:
+        return
+
+    filas = (
+        PromedioGeneral.objects.filter(seccion=instance)
+        .exclude(año_id=instance.año_id)  # type: ignore - sí existe "año_id"
+        .update(año_id=instance.año_id)  # type: ignore - sí existe "año_id"
+    )
+
+    if filas:
+        incrementar_generacion(PromedioGeneral)
@@ -0,0 +1,221 @@
+import math
+import operator
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable, TypedDict
+from django.core.cache import cache
+from app.cache import obtener_generaciones
+from estudios.modelos.gestion.calificaciones import (
+    Nota,
+    Tarea,
+    TareaProfesorMateria,
+    TipoTarea,
+)
+from estudios.modelos.gestion.personas import ProfesorMateria
+from estudios.modelos.parametros import Lapso, Materia, Seccion
+from estudios.servicios.notas import NOTA_MAXIMA, NOTA_MINIMA
+
+# tiempo máximo que se guardan las estadísticas, por si se modifican los registros sin enviar señales
+TIEMPO_CACHE_ESTADISTICAS = 60 * 10
+
+# modelos cuyos cambios modifican las estadísticas de un lapso
+MODELOS_ESTADISTICAS = (
+    Nota,
+    Tarea,
+    TareaProfesorMateria,
+    ProfesorMateria,
+    Seccion,
+    Materia,
+    TipoTarea,
+)
+
+NOTA_APROBATORIA = 10
+
+# intervalos del histograma: de 2 en 2 puntos, el último incluye la nota máxima
+ANCHO_INTERVALO = 2
+LIMITES_HISTOGRAMA = tuple(range(NOTA_MINIMA, NOTA_MAXIMA + 1, ANCHO_INTERVALO))
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# notas que se obtienen de la base de datos por consulta
+TAMAÑO_LOTE_ESTADISTICAS = 5000
+
+
+class IntervaloHistograma(TypedDict):
+    desde: int
+    hasta: int
+    cantidad: int
+    # porcentaje de las notas del grupo
+    porcentaje: float
+    # porcentaje respecto al intervalo con más notas, para dibujar las barras
+    relativo: float
+
+
+class Estadisticas(TypedDict):
+    cantidad: int
+    promedio: float
+    desviacion: float
+    minimo: float
+    maximo: float
+    percentiles: "dict[str, float]"
+    aprobados: int
+    tasa_aprobacion: float
+    histograma: "list[IntervaloHistograma]"
+
+
+class EstadisticasGrupo(Estadisticas):
+    id: int
+    nombre: str
+
+
+class EstadisticasLapso(TypedDict):
+    lapso: int
+    general: "Estadisticas | None"
+    secciones: "list[EstadisticasGrupo]"
+    materias: "list[EstadisticasGrupo]"
+    tipos: "list[EstadisticasGrupo]"
+
+
+def percentil(ordenados: "list[float]", p: float) -> float:
+    """Percentil con interpolación lineal entre los valores vecinos (igual que numpy.percentile)"""
+
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = math.floor(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (
+        posicion - inferior
+    )
+
+
+def calcular_estadisticas(valores: "Iterable[float]") -> "Estadisticas | None":
+    """Estadísticas de un grupo de notas. Se ordenan una vez y los conteos (aprobados, histograma) se obtienen con búsquedas binarias en vez de recorrer las notas: solo las recorren el ordenamiento y las dos sumas, que se hacen en C"""
+
+    ordenados = sorted(valores)
+    cantidad = len(ordenados)
+
+    if not cantidad:
+        return None
+
+    promedio = math.fsum(ordenados) / cantidad
+    cuadrados = math.fsum(map(operator.mul, ordenados, ordenados))
+    varianza = max(cuadrados / cantidad - promedio * promedio, 0)
+
+    reprobados = bisect_left(ordenados, NOTA_APROBATORIA)
+
+    # posición donde empieza cada intervalo, y el final de las notas para el último
+    posiciones = [bisect_left(ordenados, limite) for limite in LIMITES_HISTOGRAMA[:-1]]
+    posiciones.append(cantidad)
+
+    conteos = [fin - inicio for inicio, fin in zip(posiciones[:-1], posiciones[1:])]
+    mayor = max(conteos) or 1
+
+    return {
+        "cantidad": cantidad,
+        "promedio": promedio,
+        "desviacion": math.sqrt(varianza),
+        "minimo": ordenados[0],
+        "maximo": ordenados[-1],
+        "percentiles": {f"p{p}": percentil(ordenados, p) for p in PERCENTILES},
+        "aprobados": cantidad - reprobados,
+        "tasa_aprobacion": (cantidad - reprobados) / cantidad * 100,
+        "histograma": [
+            {
+                "desde": desde,
+                "hasta": hasta,
+                "cantidad": conteo,
+                "porcentaje": conteo / cantidad * 100,
+                "relativo": conteo / mayor * 100,
+            }
+            for desde, hasta, conteo in zip(
+                LIMITES_HISTOGRAMA[:-1], LIMITES_HISTOGRAMA[1:], conteos
+            )
+        ],
+    }
+
+
+def notas_agrupadas() -> "defaultdict[int, array]":
+    return defaultdict(lambda: array("d"))
+
+
+def estadisticas_por_grupo(
+    grupos: "dict[int, array]", nombres: "dict[int, str]"
+) -> "list[EstadisticasGrupo]":
+    resultado: "list[EstadisticasGrupo]" = []
+
+    for clave, notas in grupos.items():
+        estadisticas = calcular_estadisticas(notas)
+
+        if estadisticas is not None:
+            resultado.append(
+                {
+                    "id": clave,
+                    "nombre": nombres.get(clave, str(clave)),
+                    **estadisticas,
+                }
+            )
+
+    return sorted(resultado, key=operator.itemgetter("nombre"))
+
+
+def calcular_estadisticas_lapso(lapso: Lapso) -> EstadisticasLapso:
+    """Obtiene las notas del lapso con una sola consulta por lotes y, en el mismo recorrido, las agrupa por sección, materia y tipo de evaluación en arreglos planos. Luego calcula las estadísticas generales y de cada grupo"""
+
+    valores = array("d")
+    secciones = notas_agrupadas()
+    materias = notas_agrupadas()
+    tipos = notas_agrupadas()
+
+    for valor, seccion, materia, tipo in (
+        Nota.objects.filter(tarea_profesormateria__tarea__lapso=lapso)
+        .order_by()
+        .values_list(
+            "valor",
+            "tarea_profesormateria__profesormateria__seccion_id",
+            "tarea_profesormateria__profesormateria__materia_id",
+            "tarea_profesormateria__tarea__tipo_id",
+        )
+        .iterator(chunk_size=TAMAÑO_LOTE_ESTADISTICAS)
+    ):
+        valores.append(valor)
+        secciones[seccion].append(valor)
+        materias[materia].append(valor)
+        tipos[tipo].append(valor)
+
+    nombres_secciones = dict(
+        Seccion.objects.filter(pk__in=secciones).values_list("pk", "nombre")
+    )
+    nombres_materias = dict(
+        Materia.objects.filter(pk__in=materias).values_list("pk", "nombre")
+    )
+    nombres_tipos = dict(
+        TipoTarea.objects.filter(pk__in=tipos).values_list("pk", "nombre")
+    )
+
+    return {
+        "lapso": lapso.pk,
+        "general": calcular_estadisticas(valores),
+        "secciones": estadisticas_por_grupo(secciones, nombres_secciones),
+        "materias": estadisticas_por_grupo(materias, nombres_materias),
+        "tipos": estadisticas_por_grupo(tipos, nombres_tipos),
+    }
+
+
+def clave_estadisticas(lapso: Lapso) -> str:
+    return "estadisticas_notas:{}:{}".format(
+        lapso.pk, ":".join(map(str, obtener_generaciones(*MODELOS_ESTADISTICAS)))
+    )
+
+
+def obtener_estadisticas_lapso(lapso: Lapso) -> EstadisticasLapso:
+    """Obtiene las estadísticas de las notas del lapso, guardándolas en caché hasta que cambien las notas o los datos con los que se agrupan"""
+
+    clave = clave_estadisticas(lapso)
+    estadisticas = cache.get(clave)
+
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas_lapso(lapso)
+        cache.set(clave, estadisticas, TIEMPO_CACHE_ESTADISTICAS)
+
+    return estadisticas
@@ -0,0 +1,483 @@
+import datetime
+import math
+from collections import Counter
+from typing import Iterator, Mapping, NamedTuple, Sequence
+from django.db import models, transaction
+from django.db.models import Avg, Case, F, QuerySet, When, Window
+from estudios.modelos.gestion.calificaciones import Nota, TareaProfesorMateria
+from estudios.modelos.gestion.personas import (
+    Estudiante,
+    Matricula,
+    MatriculaEstados,
+    ProfesorMateria,
+)
+from estudios.modelos.parametros import Lapso
+
+
+class CeldaNota(NamedTuple):
+    tarea_id: int
+    valor: "float | None"
+    # versión guardada de la nota, que el autoguardado envía con cada edición (0 si no existe)
+    version: int = 0
+
+
+class FilaNotas(NamedTuple):
+    matricula: Matricula
+    celdas: "list[CeldaNota]"
+
+    @property
+    def estudiante(self) -> Estudiante:
+        return self.matricula.estudiante
+
+
+class MatrizNotas:
+    """Notas de una materia impartida en un lapso: una fila por matrícula y una columna por evaluación, con acceso directo a cada celda por sus índices"""
+
+    def __init__(
+        self,
+        matriculas: "Sequence[Matricula]",
+        tareas: "Sequence[TareaProfesorMateria]",
+    ):
+        self.matriculas = matriculas
+        self.tareas = tareas
+        self.indices_matriculas = {m.pk: i for i, m in enumerate(matriculas)}
+        self.indices_tareas = {t.pk: j for j, t in enumerate(tareas)}
+        self.valores: "list[list[float | None]]" = [
+            [None] * len(tareas) for _ in matriculas
+        ]
+        self.versiones: "list[list[int]]" = [[0] * len(tareas) for _ in matriculas]
+
+    def __len__(self):
+        return len(self.matriculas)
+
+    def __iter__(self) -> "Iterator[FilaNotas]":
+        for matricula, valores, versiones in zip(
+            self.matriculas, self.valores, self.versiones
+        ):
+            yield FilaNotas(
+                matricula,
+                [
+                    CeldaNota(tarea.pk, valor, version)  # type: ignore - sí tiene pk
+                    for tarea, valor, version in zip(self.tareas, valores, versiones)
+                ],
+            )
+
+    def asignar(self, matricula_id: int, tarea_id: int, valor: float, version: int = 0):
+        """Las notas de matrículas o evaluaciones que no están en la matriz se ignoran"""
+
+        i = self.indices_matriculas.get(matricula_id)
+        j = self.indices_tareas.get(tarea_id)
+
+        if i is not None and j is not None:
+            self.valores[i][j] = valor
+            self.versiones[i][j] = version
+
+    def valor(self, matricula_id: int, tarea_id: int) -> "float | None":
+        return self.valores[self.indices_matriculas[matricula_id]][
+            self.indices_tareas[tarea_id]
+        ]
+
+
+def construir_matriz_notas(
+    profesor_materia: ProfesorMateria, lapso: "Lapso | None"
+) -> MatrizNotas:
+    """Crea la matriz de notas de los estudiantes activos de la sección en las evaluaciones de la materia impartida en el lapso, con una consulta para cada eje y una para todas las notas"""
+
+    matriculas = list(
+        Matricula.objects.filter(
+            seccion=profesor_materia.seccion_id,  # type: ignore - sí existe "seccion_id"
+            lapso=lapso,
+            estado=MatriculaEstados.ACTIVO,
+        )
+        .select_related("estudiante")
+        .order_by("estudiante__apellidos", "estudiante__nombres")
+    )
+
+    tareas = list(
+        TareaProfesorMateria.objects.filter(
+            profesormateria=profesor_materia, tarea__lapso=lapso
+        )
+        .select_related("tarea", "tarea__tipo")
+        .order_by("tarea__fecha_añadida")
+    )
+
+    matriz = MatrizNotas(matriculas, tareas)
+
+    if matriculas and tareas:
+        for matricula_id, tarea_id, valor, version in Nota.objects.filter(
+            tarea_profesormateria__in=[tarea.pk for tarea in tareas],
+            matricula__seccion=profesor_materia.seccion_id,  # type: ignore - sí existe "seccion_id"
+            matricula__lapso=lapso,
+        ).values_list("matricula_id", "tarea_profesormateria_id", "valor", "version"):
+            matriz.asignar(matricula_id, tarea_id, valor, version)
+
+    return matriz
+
+
+# (evaluación de la materia, matrícula)
+Celda = "tuple[int, int]"
+
+PREFIJO_CAMPO_NOTA = "nota_"
+NOTA_MINIMA = 0
+NOTA_MAXIMA = 20
+
+
+class EstadoCelda(models.TextChoices):
+    CREADA = "creada", "Nueva"
+    ACTUALIZADA = "actualizada", "Actualizada"
+    SIN_CAMBIOS = "sin_cambios", "Sin cambios"
+    OBSOLETA = (
+        "obsoleta",
+        "La nota se modificó en otra pestaña o por otro usuario. Se muestra el valor guardado",
+    )
+    VALOR_INVALIDO = "valor_invalido", "Valor inválido"
+    FUERA_DE_RANGO = (
+        "fuera_de_rango",
+        f"Fuera del rango permitido ({NOTA_MINIMA}-{NOTA_MAXIMA})",
+    )
+    EVALUACION_INVALIDA = (
+        "evaluacion_invalida",
+        "La evaluación no pertenece a la materia en el lapso",
+    )
+    MATRICULA_INVALIDA = (
+        "matricula_invalida",
+        "El estudiante no está matriculado en la sección en el lapso",
+    )
+
+
+ESTADOS_GUARDADOS = frozenset(
+    (EstadoCelda.CREADA, EstadoCelda.ACTUALIZADA, EstadoCelda.SIN_CAMBIOS)
+)
+
+
+class NotaGuardada(NamedTuple):
+    valor: float
+    version: int
+
+
+class ResultadoGuardado:
+    """Estado de cada celda enviada (por evaluación y matrícula) luego de guardar las notas"""
+
+    def __init__(self):
+        self.celdas: "dict[Celda, EstadoCelda]" = {}
+        # valor y versión guardados de las celdas que no se rechazaron
+        self.notas: "dict[Celda, NotaGuardada]" = {}
+
+    @property
+    def cantidades(self) -> "Counter[EstadoCelda]":
+        return Counter(self.celdas.values())
+
+    @property
+    def creadas(self) -> int:
+        return self.cantidades[EstadoCelda.CREADA]
+
+    @property
+    def actualizadas(self) -> int:
+        return self.cantidades[EstadoCelda.ACTUALIZADA]
+
+    @property
+    def rechazadas(self) -> "dict[Celda, EstadoCelda]":
+        return {
+            celda: estado
+            for celda, estado in self.celdas.items()
+            if estado not in ESTADOS_GUARDADOS
+        }
+
+
+def celdas_de_formulario(datos: "Mapping[str, str]") -> "dict[Celda, str]":
+    """Valores de los campos "nota_[id de la evaluación]_[id de la matrícula]" enviados, sin los vacíos. Los campos con otro formato se ignoran"""
+
+    celdas = {}
+
+    for campo, valor in datos.items():
+        if not campo.startswith(PREFIJO_CAMPO_NOTA) or not valor.strip():
+            continue
+
+        partes = campo.split("_")
+
+        if len(partes) >= 3 and partes[1].isdigit() and partes[2].isdigit():
+            celdas[(int(partes[1]), int(partes[2]))] = valor
+
+    return celdas
+
+
+def validar_valor(valor: "str | float") -> "float | EstadoCelda":
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return EstadoCelda.VALOR_INVALIDO
+
+    if not math.isfinite(valor):
+        return EstadoCelda.VALOR_INVALIDO
+
+    if not NOTA_MINIMA <= valor <= NOTA_MAXIMA:
+        return EstadoCelda.FUERA_DE_RANGO
+
+    return valor
+
+
+@transaction.atomic
+def guardar_notas(
+    profesor_materia: ProfesorMateria,
+    lapso: "Lapso | None",
+    celdas: "Mapping[Celda, str | float]",
+    versiones: "Mapping[Celda, int] | None" = None,
+) -> ResultadoGuardado:
+    """Guarda las notas enviadas de la materia impartida en el lapso, con una consulta para validar las evaluaciones, otra para las matrículas, otra para las notas existentes y una sola escritura (más la actualización de los promedios) para todas. Las celdas con valores o ids inválidos se rechazan sin impedir guardar las demás.
+
+    Las versiones las asigna el servidor: cada nota que cambia aumenta la suya en uno. Con versiones (autoguardado, la última versión de cada celda que conoce el navegador) las ediciones hechas sobre una versión anterior a la guardada se rechazan, salvo que tengan el mismo valor (ej: reintentos de una edición ya guardada). Sin ellas gana la última edición
+    """
+
+    resultado = ResultadoGuardado()
+    valores: "dict[Celda, float]" = {}
+
+    for celda, valor in celdas.items():
+        valor = validar_valor(valor)
+
+        if isinstance(valor, EstadoCelda):
+            resultado.celdas[celda] = valor
+        else:
+            valores[celda] = valor
+
+    if not valores:
+        return resultado
+
+    tareas_validas = set(
+        TareaProfesorMateria.objects.filter(
+            pk__in={tarea for tarea, _ in valores},
+            profesormateria=profesor_materia,
+            tarea__lapso=lapso,
+        ).values_list("pk", flat=True)
+    )
+    matriculas_validas = set(
+        Matricula.objects.filter(
+            pk__in={matricula for _, matricula in valores},
+            seccion=profesor_materia.seccion_id,  # type: ignore - sí existe "seccion_id"
+            lapso=lapso,
+        ).values_list("pk", flat=True)
+    )
+
+    for celda in list(valores):
+        tarea, matricula = celda
+
+        if tarea not in tareas_validas:
+            resultado.celdas[celda] = EstadoCelda.EVALUACION_INVALIDA
+        elif matricula not in matriculas_validas:
+            resultado.celdas[celda] = EstadoCelda.MATRICULA_INVALIDA
+        else:
+            continue
+
+        del valores[celda]
+
+    if not valores:
+        return resultado
+
+    existentes = {
+        (tarea, matricula): NotaGuardada(valor, version)
+        for matricula, tarea, valor, version in Nota.objects.filter(
+            tarea_profesormateria__in=tareas_validas,
+            matricula__in=matriculas_validas,
+        ).values_list("matricula_id", "tarea_profesormateria_id", "valor", "version")
+    }
+
+    notas = []
+
+    for celda, valor in valores.items():
+        anterior = existentes.get(celda)
+
+        if anterior is None:
+            resultado.celdas[celda] = EstadoCelda.CREADA
+            version = 1
+        elif anterior.valor == valor:
+            resultado.celdas[celda] = EstadoCelda.SIN_CAMBIOS
+            resultado.notas[celda] = anterior
+            continue
+        elif versiones is not None and versiones[celda] < anterior.version:
+            # otra edición se guardó después de la última versión que recibió el navegador
+            resultado.celdas[celda] = EstadoCelda.OBSOLETA
+            resultado.notas[celda] = anterior
+            continue
+        else:
+            resultado.celdas[celda] = EstadoCelda.ACTUALIZADA
+            version = anterior.version + 1
+
+        tarea, matricula = celda
+        resultado.notas[celda] = NotaGuardada(valor, version)
+        notas.append(
+            Nota(
+                matricula_id=matricula,
+                tarea_profesormateria_id=tarea,
+                valor=valor,
+                version=version,
+            )
+        )
+
+    if notas:
+        Nota.objects.bulk_create(
+            notas,
+            update_conflicts=True,
+            unique_fields=["matricula", "tarea_profesormateria"],
+            update_fields=["valor", "version"],
+        )
+
+    return resultado
+
+
+MAXIMO_CAMBIOS_AUTOGUARDADO = 500
+
+# versión máxima que se acepta, la de PositiveBigIntegerField
+VERSION_MAXIMA = 2**63 - 1
+
+
+class CambioNota(NamedTuple):
+    """Edición de una celda enviada por el autoguardado. La clave la genera el navegador para identificar la edición en la respuesta, y la versión es la última de la celda que recibió del servidor"""
+
+    clave: str
+    tarea_id: int
+    matricula_id: int
+    valor: "str | float"
+    version: int
+
+
+def autoguardar_notas(
+    profesor_materia: ProfesorMateria,
+    lapso: "Lapso | None",
+    cambios: "Sequence[CambioNota]",
+) -> "dict[str, dict]":
+    """Aplica un lote de ediciones del autoguardado en una transacción y devuelve el resultado de cada una por su clave, con el valor y la versión guardados de la celda. De las ediciones de una misma celda solo se aplica la última.
+
+    No hace falta guardar los resultados para responder a los reintentos: una edición ya guardada tiene el mismo valor que la nota, y se responde como sin cambios con la versión actual
+    """
+
+    ultimos: "dict[Celda, CambioNota]" = {}
+
+    for cambio in cambios:
+        ultimos[(cambio.tarea_id, cambio.matricula_id)] = cambio
+
+    guardado = guardar_notas(
+        profesor_materia,
+        lapso,
+        {celda: cambio.valor for celda, cambio in ultimos.items()},
+        {celda: cambio.version for celda, cambio in ultimos.items()},
+    )
+
+    resultados = {}
+
+    for cambio in cambios:
+        celda = (cambio.tarea_id, cambio.matricula_id)
+        estado = guardado.celdas[celda]
+        nota = guardado.notas.get(celda)
+
+        resultados[cambio.clave] = {
+            "estado": estado.value,
+            "mensaje": estado.label,
+            "valor": nota.valor if nota else None,
+            "version": nota.version if nota else None,
+        }
+
+    return resultados
+
+
+class NotaLista(NamedTuple):
+    """Nota de la lista de notas: solo los datos que se muestran, sin instancias de los modelos"""
+
+    id: int
+    valor: float
+    fecha: datetime.datetime
+    tipo: str
+    tarea_id: int
+
+
+class MateriaCursada:
+    __slots__ = ("id", "nombre", "promedio", "notas")
+
+    def __init__(self, id: int, nombre: str, promedio: float):
+        self.id = id
+        self.nombre = nombre
+        self.promedio = promedio
+        self.notas: "list[NotaLista]" = []
+
+
+class MatriculaNotas:
+    __slots__ = (
+        "id",
+        "estudiante",
+        "seccion",
+        "lapso",
+        "materias_cursadas",
+        "promedio_general",
+    )
+
+    def __init__(self, matricula: Matricula, promedio_general: float):
+        self.id = matricula.pk
+        self.estudiante = matricula.estudiante
+        self.seccion = matricula.seccion
+        self.lapso = matricula.lapso
+        self.materias_cursadas: "list[MateriaCursada]" = []
+        self.promedio_general = promedio_general
+
+    @property
+    def total_materias(self) -> int:
+        return len(self.materias_cursadas)
+
+
+def agrupar_notas_matriculas(
+    matriculas: "Sequence[Matricula]",
+    notas: QuerySet,
+    promedios: QuerySet,
+) -> "list[MatriculaNotas]":
+    """Agrupa por materia las notas de las matrículas (de las indicadas en "notas", ya ordenadas por materia). Los promedios por materia y el general se leen de "promedios" (PromedioMateria) en una sola consulta, y las notas se obtienen como tuplas en otra"""
+
+    ids = [matricula.pk for matricula in matriculas]
+    promedios_materias: "dict[tuple[int, int], float]" = {}
+    promedios_generales: "dict[int, float]" = {}
+
+    # el promedio general es el de los promedios mayores a 0 de cada matrícula, calculado sobre la partición de la matrícula
+    for matricula_id, materia_id, promedio, promedio_general in (
+        promedios.filter(matricula__in=ids)
+        .annotate(
+            promedio_general=Window(
+                Avg(Case(When(promedio__gt=0, then=F("promedio")))),
+                partition_by=[F("matricula_id")],
+            )
+        )
+        .values_list("matricula_id", "materia_id", "promedio", "promedio_general")
+    ):
+        promedios_materias[(matricula_id, materia_id)] = promedio
+        promedios_generales[matricula_id] = promedio_general or 0.0
+
+    resultado = {
+        matricula.pk: MatriculaNotas(
+            matricula, promedios_generales.get(matricula.pk, 0.0)
+        )
+        for matricula in matriculas
+    }
+    materias: "dict[tuple[int, int], MateriaCursada]" = {}
+
+    for (
+        matricula_id,
+        materia_id,
+        nombre_materia,
+        *datos_nota,
+    ) in notas.filter(matricula__in=ids).values_list(
+        "matricula_id",
+        "tarea_profesormateria__profesormateria__materia_id",
+        "tarea_profesormateria__profesormateria__materia__nombre",
+        "id",
+        "valor",
+        "fecha",
+        "tarea_profesormateria__tarea__tipo__nombre",
+        "tarea_profesormateria__tarea_id",
+    ):
+        clave = (matricula_id, materia_id)
+        materia = materias.get(clave)
+
+        if materia is None:
+            materia = materias[clave] = MateriaCursada(
+                materia_id, nombre_materia, promedios_materias.get(clave, 0.0)
+            )
+            resultado[matricula_id].materias_cursadas.append(materia)
+
+        materia.notas.append(NotaLista._make(datos_nota))
+
+    return list(resultado.values())
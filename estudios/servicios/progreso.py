@@ -0,0 +1,134 @@
+from typing import Iterable, TypedDict
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from app.cache import obtener_generaciones
+from estudios.modelos.gestion.calificaciones import (
+    Nota,
+    Tarea,
+    TareaProfesorMateria,
+)
+from estudios.modelos.gestion.personas import (
+    Matricula,
+    MatriculaEstados,
+    Profesor,
+    ProfesorMateria,
+)
+from estudios.modelos.parametros import Lapso
+
+# tiempo máximo que se guarda el progreso, por si se modifican los registros sin enviar señales
+TIEMPO_CACHE_PROGRESO = 60 * 10
+
+# modelos cuyos cambios modifican el progreso de la carga de notas
+MODELOS_PROGRESO = (Nota, Tarea, TareaProfesorMateria, Matricula, ProfesorMateria)
+
+
+class ProgresoMateria(TypedDict):
+    total_matriculas: int
+    total_tareas: int
+    estudiantes_tareas_incompletas: int
+    progreso_general: float
+
+
+def progreso_vacio() -> ProgresoMateria:
+    return {
+        "total_matriculas": 0,
+        "total_tareas": 0,
+        "estudiantes_tareas_incompletas": 0,
+        "progreso_general": 0,
+    }
+
+
+def clave_progreso(profesor: Profesor, lapso: "Lapso | None") -> str:
+    return "progreso:{}:{}:{}".format(
+        profesor.pk,
+        getattr(lapso, "pk", None),
+        ":".join(map(str, obtener_generaciones(*MODELOS_PROGRESO))),
+    )
+
+
+def calcular_progreso_profesor(
+    profesor: Profesor, lapso: "Lapso | None"
+) -> "dict[int, ProgresoMateria]":
+    """Calcula el progreso de la carga de notas de todas las materias impartidas por el profesor en el lapso, con dos consultas agrupadas: una para las matrículas y evaluaciones de cada materia y otra para las notas de cada estudiante"""
+
+    matriculas_seccion = (
+        Matricula.objects.filter(
+            seccion=OuterRef("seccion"), lapso=lapso, estado=MatriculaEstados.ACTIVO
+        )
+        .order_by()
+        .values("seccion")
+        .annotate(cantidad=Count("pk"))
+        .values("cantidad")
+    )
+
+    totales = ProfesorMateria.objects.filter(profesor=profesor).annotate(
+        total_matriculas=Coalesce(
+            Subquery(matriculas_seccion, output_field=IntegerField()), 0
+        ),
+        total_tareas=Count(
+            "tareaprofesormateria",
+            filter=Q(tareaprofesormateria__tarea__lapso=lapso),
+            distinct=True,
+        ),
+    )
+
+    # evaluaciones con nota de cada estudiante activo de la sección, por materia
+    notas_por_estudiante = (
+        Nota.objects.filter(
+            tarea_profesormateria__profesormateria__profesor=profesor,
+            tarea_profesormateria__tarea__lapso=lapso,
+            matricula__lapso=lapso,
+            matricula__estado=MatriculaEstados.ACTIVO,
+            matricula__seccion=F("tarea_profesormateria__profesormateria__seccion"),
+        )
+        .order_by()
+        .values_list("tarea_profesormateria__profesormateria", "matricula")
+        .annotate(cantidad=Count("tarea_profesormateria", distinct=True))
+    )
+
+    total_tareas = {}
+    progreso: "dict[int, ProgresoMateria]" = {}
+
+    for pk, matriculas, tareas in totales.values_list(
+        "pk", "total_matriculas", "total_tareas"
+    ):
+        total_tareas[pk] = tareas
+        progreso[pk] = {
+            "total_matriculas": matriculas,
+            "total_tareas": tareas,
+            "estudiantes_tareas_incompletas": matriculas,
+            "progreso_general": 0,
+        }
+
+    for pk, _, cantidad in notas_por_estudiante:
+        # la materia pudo asignarse entre las dos consultas
+        if total_tareas.get(pk) and cantidad >= total_tareas[pk]:
+            progreso[pk]["estudiantes_tareas_incompletas"] -= 1
+
+    for estadisticas in progreso.values():
+        if estadisticas["total_tareas"] and estadisticas["total_matriculas"]:
+            completos = (
+                estadisticas["total_matriculas"]
+                - estadisticas["estudiantes_tareas_incompletas"]
+            )
+            estadisticas["progreso_general"] = round(
+                completos / estadisticas["total_matriculas"] * 100, 1
+            )
+
+    return progreso
+
+
+def obtener_progreso_profesor(
+    profesor: Profesor, lapso: "Lapso | None", materias: "Iterable[int]" = ()
+) -> "dict[int, ProgresoMateria]":
+    """Obtiene el progreso de la carga de notas del profesor en el lapso (por id de materia impartida), guardándolo en caché hasta que cambien las notas, evaluaciones, matrículas o materias impartidas. Si al guardado le falta alguna de las materias indicadas (ej: se asignó mientras se calculaba), se vuelve a calcular"""
+
+    clave = clave_progreso(profesor, lapso)
+    progreso = cache.get(clave)
+
+    if progreso is None or any(pk not in progreso for pk in materias):
+        progreso = calcular_progreso_profesor(profesor, lapso)
+        cache.set(clave, progreso, TIEMPO_CACHE_PROGRESO)
+
+    return progreso
@@ -0,0 +1,227 @@
+from collections import defaultdict
+from typing import Iterable
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from app.cache import incrementar_generacion
+from estudios.servicios.calificaciones import marcar_pendientes_matriculas
+from estudios.servicios.cuadro_honor import (
+    actualizar_promedios_generales,
+    reconstruir_promedios_generales,
+)
+from estudios.modelos.gestion.calificaciones import (
+    Nota,
+    PromedioMateria,
+    TareaProfesorMateria,
+)
+from estudios.modelos.gestion.personas import ProfesorMateria
+
+# (matrícula, materia)
+Par = "tuple[int, int]"
+
+RUTA_MATERIA_NOTA = "tarea_profesormateria__profesormateria__materia"
+
+# pares que se recalculan por consulta, para no exceder el límite de parámetros de SQLite
+TAMAÑO_LOTE_PROMEDIOS = 500
+
+
+def pares_de_notas(notas: QuerySet) -> "set[Par]":
+    """Pares (matrícula, materia) de los promedios que dependen de las notas indicadas"""
+
+    return set(
+        notas.order_by().values_list("matricula_id", RUTA_MATERIA_NOTA).distinct()
+    )
+
+
+def pares_de_objetos(notas: "Iterable[Nota]") -> "set[Par]":
+    """Igual que pares_de_notas, para notas en memoria (ej: las de bulk_create). Solo consulta las materias de sus evaluaciones"""
+
+    notas = list(notas)
+
+    materias = dict(
+        TareaProfesorMateria.objects.filter(
+            pk__in={nota.tarea_profesormateria_id for nota in notas}  # type: ignore - sí existe "tarea_profesormateria_id"
+        ).values_list("pk", "profesormateria__materia")
+    )
+
+    return {
+        (nota.matricula_id, materias[nota.tarea_profesormateria_id])  # type: ignore - sí existen los "_id"
+        for nota in notas
+        if nota.tarea_profesormateria_id in materias  # type: ignore - sí existe "tarea_profesormateria_id"
+    }
+
+
+def filtro_pares(pares: "Iterable[Par]", campo_materia: str) -> Q:
+    """Filtro de los registros de los pares indicados, agrupando las matrículas por materia"""
+
+    matriculas_por_materia: "defaultdict[int, set[int]]" = defaultdict(set)
+
+    for matricula, materia in pares:
+        matriculas_por_materia[materia].add(matricula)
+
+    filtro = Q(pk__in=())
+
+    for materia, matriculas in matriculas_por_materia.items():
+        filtro |= Q(**{campo_materia: materia, "matricula__in": matriculas})
+
+    return filtro
+
+
+def calcular_promedios(notas: QuerySet) -> QuerySet:
+    """Suma y cantidad de las notas indicadas por matrícula y materia"""
+
+    return (
+        notas.order_by()
+        .values("matricula_id", id_materia=F(RUTA_MATERIA_NOTA))
+        .annotate(suma=Sum("valor"), cantidad=Count("pk"))
+    )
+
+
+def crear_promedio(fila: dict, fecha) -> PromedioMateria:
+    return PromedioMateria(
+        matricula_id=fila["matricula_id"],
+        materia_id=fila["id_materia"],
+        suma=fila["suma"],
+        cantidad=fila["cantidad"],
+        promedio=fila["suma"] / fila["cantidad"],
+        fecha_actualizacion=fecha,
+    )
+
+
+@transaction.atomic
+def actualizar_promedios(pares: "Iterable[Par]"):
+    """Recalcula los promedios de los pares (matrícula, materia) indicados con sus notas, y elimina los que se quedaron sin notas. Solo se consultan las notas de esos pares, por lo que el costo depende de las notas modificadas y no de todas las notas"""
+
+    pares = list(set(pares))
+
+    if not pares:
+        return
+
+    fecha = timezone.now()
+
+    for i in range(0, len(pares), TAMAÑO_LOTE_PROMEDIOS):
+        lote = pares[i : i + TAMAÑO_LOTE_PROMEDIOS]
+
+        promedios = [
+            crear_promedio(fila, fecha)
+            for fila in calcular_promedios(
+                Nota.objects.filter(filtro_pares(lote, RUTA_MATERIA_NOTA))
+            )
+        ]
+
+        PromedioMateria.objects.bulk_create(
+            promedios,
+            update_conflicts=True,
+            unique_fields=["matricula", "materia"],
+            update_fields=["suma", "cantidad", "promedio", "fecha_actualizacion"],
+        )
+
+        con_notas = {(p.matricula_id, p.materia_id) for p in promedios}  # type: ignore - sí existen los "_id"
+
+        if sin_notas := set(lote).difference(con_notas):
+            PromedioMateria.objects.filter(filtro_pares(sin_notas, "materia")).delete()
+
+    incrementar_generacion(PromedioMateria)
+
+    matriculas = {matricula for matricula, _ in pares}
+    actualizar_promedios_generales(matriculas)
+    marcar_pendientes_matriculas(matriculas)
+
+
+@transaction.atomic
+def reconstruir_promedios(tamaño_lote: int = 1000) -> int:
+    """Vuelve a calcular todos los promedios desde las notas (ej: luego de crear la tabla o de modificar notas sin pasar por el modelo), y con ellos los promedios generales"""
+
+    # las filas se eliminan sin cargarlas como objetos, son tantas como pares de matrícula y materia
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PromedioMateria._meta.db_table}")
+
+    fecha = timezone.now()
+    cantidad = 0
+    lote = []
+
+    for fila in calcular_promedios(Nota.objects.all()).iterator(chunk_size=tamaño_lote):
+        lote.append(crear_promedio(fila, fecha))
+
+        if len(lote) >= tamaño_lote:
+            PromedioMateria.objects.bulk_create(lote)
+            cantidad += len(lote)
+            lote = []
+
+    PromedioMateria.objects.bulk_create(lote)
+    cantidad += len(lote)
+
+    incrementar_generacion(PromedioMateria)
+
+    reconstruir_promedios_generales(tamaño_lote)
+
+    return cantidad
+
+
+# al eliminar evaluaciones (o sus tareas, materias impartidas o lapsos) sus notas se eliminan en cascada, sin pasar por el modelo de las notas
+
+
+@receiver(
+    pre_delete,
+    sender=TareaProfesorMateria,
+    dispatch_uid="estudios.promedios.pre_eliminado",
+)
+def guardar_pares_evaluacion(sender, instance: TareaProfesorMateria, **kwargs):
+    instance._pares_promedios = pares_de_notas(  # type: ignore - se agrega el atributo
+        Nota.objects.filter(tarea_profesormateria=instance)
+    )
+
+
+@receiver(
+    post_delete,
+    sender=TareaProfesorMateria,
+    dispatch_uid="estudios.promedios.eliminado",
+)
+def actualizar_promedios_evaluacion(sender, instance: TareaProfesorMateria, **kwargs):
+    actualizar_promedios(getattr(instance, "_pares_promedios", ()))
+
+
+# al cambiar la materia de una materia impartida, sus notas pasan de los promedios de la materia anterior a los de la nueva
+
+
+@receiver(
+    pre_save,
+    sender=ProfesorMateria,
+    dispatch_uid="estudios.promedios.pre_guardado_materia_impartida",
+)
+def guardar_materia_anterior(sender, instance: ProfesorMateria, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._materia_anterior = (  # type: ignore - se agrega el atributo
+            ProfesorMateria.objects.filter(pk=instance.pk)
+            .values_list("materia_id", flat=True)
+            .first()
+        )
+
+
+@receiver(
+    post_save,
+    sender=ProfesorMateria,
+    dispatch_uid="estudios.promedios.materia_impartida",
+)
+def actualizar_promedios_materia_impartida(
+    sender, instance: ProfesorMateria, created: bool, raw=False, **kwargs
+):
+    materia_anterior = getattr(instance, "_materia_anterior", None)
+    materia = instance.materia_id  # type: ignore - sí existe "materia_id"
+
+    if created or raw or materia_anterior in (None, materia):
+        return
+
+    matriculas = set(
+        Nota.objects.filter(tarea_profesormateria__profesormateria=instance)
+        .order_by()
+        .values_list("matricula_id", flat=True)
+        .distinct()
+    )
+
+    actualizar_promedios(
+        [(matricula, materia_anterior) for matricula in matriculas]
+        + [(matricula, materia) for matricula in matriculas]
+    )
@@ -1,13 +1,185 @@
 "use strict";
 
+// tiempo que se esperan más ediciones antes de enviarlas juntas
+const VENTANA_AUTOGUARDADO_MS = 800;
+// tiempo antes de reintentar un envío fallido, que se duplica en cada intento
+const REINTENTO_AUTOGUARDADO_MS = 2000;
+const REINTENTO_MAXIMO_MS = 30000;
+
+const ESTADOS_GUARDADOS = ["creada", "actualizada", "sin_cambios"];
+
+function generarClave() {
+  return (
+    crypto.randomUUID?.() ??
+    `${Date.now()}-${Math.random().toString(36).slice(2)}`
+  );
+}
+
 // oxlint-disable-next-line no-unused-vars
-function notasApp() {
+function notasApp(urlAutoguardado, csrfToken) {
   return {
+    enviando: false,
+
+    /**
+     * ediciones por enviar, una por celda ("tarea:matricula"): si se edita de nuevo antes de enviarla se reemplaza
+     * @type {Map<string, {clave: string, tarea_id: number, matricula_id: number, valor: number}>}
+     **/
+    pendientes: new Map(),
+
+    /**
+     * envío fallido, que se repite igual (mismas claves y versiones) antes de enviar las ediciones nuevas
+     * @type {Array<{clave: string, tarea_id: number, matricula_id: number, valor: number, version: number}> | null}
+     **/
+    fallidos: null,
+
+    /**
+     * clave de la última edición de cada celda, para descartar las respuestas de ediciones anteriores
+     * @type {Map<string, string>}
+     **/
+    ultimas: new Map(),
+
+    /** @type {Map<string, HTMLInputElement>} */
+    inputs: new Map(),
+
+    temporizador: null,
+    reintento: REINTENTO_AUTOGUARDADO_MS,
+
     marcarCambio() {
       /** @type { HTMLInputElement } */
       const input = this.$event.target;
+      const { tareaId, matriculaId } = input.dataset;
+
+      if (!tareaId || !matriculaId) return;
 
       input.setAttribute("data-estado", "C");
+
+      const valor = parseFloat(input.value);
+      const celda = `${tareaId}:${matriculaId}`;
+
+      this.inputs.set(celda, input);
+
+      // los valores vacíos o incompletos no se envían
+      if (isNaN(valor)) {
+        this.pendientes.delete(celda);
+        return;
+      }
+
+      const clave = generarClave();
+      this.ultimas.set(celda, clave);
+
+      this.pendientes.set(celda, {
+        clave,
+        tarea_id: Number(tareaId),
+        matricula_id: Number(matriculaId),
+        valor,
+      });
+
+      this.programarEnvio(VENTANA_AUTOGUARDADO_MS);
+    },
+
+    programarEnvio(espera) {
+      clearTimeout(this.temporizador);
+      this.temporizador = setTimeout(() => this.enviarCambios(), espera);
+    },
+
+    async enviarCambios() {
+      clearTimeout(this.temporizador);
+
+      // solo hay un envío a la vez, el siguiente lleva las ediciones hechas mientras tanto
+      if (this.enviando || (!this.fallidos && !this.pendientes.size)) return;
+
+      let cambios = this.fallidos;
+
+      if (!cambios) {
+        // la versión es la última que devolvió el servidor para la celda (o con la que se cargó la página), y se fija al enviar para que incluya la respuesta del envío anterior
+        cambios = [...this.pendientes].map(([celda, cambio]) => ({
+          ...cambio,
+          version: Number(this.inputs.get(celda)?.dataset.version ?? 0),
+        }));
+        this.pendientes.clear();
+      }
+
+      this.fallidos = null;
+      this.enviando = true;
+
+      let datos;
+
+      try {
+        const respuesta = await fetch(urlAutoguardado, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": csrfToken,
+          },
+          body: JSON.stringify({ cambios }),
+          // para que se complete aunque se cierre la página
+          keepalive: true,
+        });
+
+        datos = await respuesta.json();
+
+        if (!respuesta.ok) {
+          this.notificar(datos.mensaje, false);
+
+          // la petición completa se rechazó (ej: sin permisos), reintentar no cambiaría el resultado
+          if (respuesta.status < 500) {
+            for (const cambio of cambios)
+              this.marcarResultado(cambio, { estado: "rechazada" });
+            return;
+          }
+
+          throw new Error(datos.mensaje);
+        }
+      } catch {
+        // se reenvían iguales: si el servidor ya guardó alguna, tiene el mismo valor que la nota y responde sin cambios
+        this.fallidos = cambios;
+
+        this.programarEnvio(this.reintento);
+        this.reintento = Math.min(this.reintento * 2, REINTENTO_MAXIMO_MS);
+        return;
+      } finally {
+        this.enviando = false;
+      }
+
+      this.reintento = REINTENTO_AUTOGUARDADO_MS;
+
+      for (const cambio of cambios)
+        this.marcarResultado(cambio, datos.resultados[cambio.clave]);
+
+      this.notificar(
+        datos.mensaje,
+        Object.values(datos.resultados).every((r) =>
+          ESTADOS_GUARDADOS.includes(r.estado),
+        ),
+      );
+
+      if (this.pendientes.size) this.programarEnvio(VENTANA_AUTOGUARDADO_MS);
+    },
+
+    marcarResultado(cambio, resultado) {
+      const celda = `${cambio.tarea_id}:${cambio.matricula_id}`;
+      const input = this.inputs.get(celda);
+
+      if (!input || !resultado) return;
+
+      // la versión guardada se actualiza aunque la celda se haya vuelto a editar, así la edición siguiente se envía sobre ella
+      if (resultado.version != null) input.dataset.version = resultado.version;
+
+      // la celda se volvió a editar, su estado depende de la edición más reciente
+      if (this.ultimas.get(celda) !== cambio.clave) return;
+
+      if (ESTADOS_GUARDADOS.includes(resultado.estado)) {
+        input.setAttribute("data-estado", "G");
+        input.title = "";
+      } else if (resultado.estado === "obsoleta") {
+        // otra pestaña u otro usuario la modificó: se muestra el valor guardado, marcado hasta que se vuelva a editar
+        input.value = resultado.valor;
+        input.setAttribute("data-estado", "X");
+        input.title = resultado.mensaje;
+      } else {
+        input.setAttribute("data-estado", "X");
+        input.title = resultado.mensaje ?? "";
+      }
     },
 
     $listaMensajes: $id("lista-mensajes"),
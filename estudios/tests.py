@@ -1,3 +1,457 @@
+import datetime
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.test import TestCase
+from app.vistas.paginacion import (
+    filtro_cursor,
+    orden_admite_cursor,
+    paginar_por_cursor,
+)
+from estudios.modelos.gestion.calificaciones import (
+    CalificacionFinal,
+    CalificacionLapso,
+    CalificacionPendiente,
+    Nota,
+    PromedioGeneral,
+    PromedioMateria,
+    Tarea,
+    TareaProfesorMateria,
+    TipoTarea,
+)
+from estudios.modelos.gestion.personas import (
+    Estudiante,
+    Matricula,
+    Profesor,
+    ProfesorMateria,
+)
+from estudios.modelos.parametros import Año, Lapso, Materia, Seccion
+from estudios.servicios.calificaciones import (
+    calcular_calificaciones,
+    calcular_lote,
+    obtener_configuracion,
+)
+from estudios.servicios.cuadro_honor import Clasificacion
+from estudios.servicios.notas import (
+    CambioNota,
+    EstadoCelda,
+    autoguardar_notas,
+    guardar_notas,
+)
 
-# Create your tests here.
+
+def crear_estudiante(cedula: int) -> Estudiante:
+    return Estudiante.objects.create(
+        cedula=cedula,
+        nombres="Ana",
+        apellidos=f"Pérez {cedula}",
+        sexo=Estudiante.OpcionesSexo.FEMENINO,
+        fecha_nacimiento=datetime.date(2010, 1, 1),
+    )
+
+
+class DatosNotas(TestCase):
+    """Una sección con dos estudiantes matriculados en dos lapsos, y una materia impartida con una evaluación por lapso"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.año = Año.objects.create(nombre="Primer año", nombre_corto="1ro")
+        cls.seccion = Seccion.objects.create(año=cls.año, letra="A", nombre="1ro A")
+        cls.lapso = Lapso.objects.create(
+            numero=1,
+            nombre="Lapso 1",
+            fecha_inicio=datetime.date(2024, 9, 15),
+            fecha_fin=datetime.date(2024, 12, 15),
+        )
+        cls.lapso_2 = Lapso.objects.create(
+            numero=2,
+            nombre="Lapso 2",
+            fecha_inicio=datetime.date(2025, 1, 7),
+            fecha_fin=datetime.date(2025, 3, 31),
+            peso=3,
+        )
+        cls.materia = Materia.objects.create(nombre="Matemática")
+        cls.otra_materia = Materia.objects.create(nombre="Física")
+        cls.profesor = Profesor.objects.create(
+            cedula=1, nombres="Luis", apellidos="Rojas", sexo="M"
+        )
+        cls.profesor_materia = ProfesorMateria.objects.create(
+            profesor=cls.profesor, materia=cls.materia, seccion=cls.seccion
+        )
+        cls.tipo = TipoTarea.objects.create(nombre="Examen", peso=3)
+        cls.otro_tipo = TipoTarea.objects.create(nombre="Taller", peso=1)
+
+        cls.estudiantes = [crear_estudiante(10), crear_estudiante(11)]
+        cls.matriculas = [
+            Matricula.objects.create(
+                estudiante=estudiante, seccion=cls.seccion, lapso=cls.lapso
+            )
+            for estudiante in cls.estudiantes
+        ]
+        cls.matriculas_2 = [
+            Matricula.objects.create(
+                estudiante=estudiante, seccion=cls.seccion, lapso=cls.lapso_2
+            )
+            for estudiante in cls.estudiantes
+        ]
+
+        cls.evaluacion = cls.crear_evaluacion(cls.tipo, cls.lapso)
+        cls.evaluacion_2 = cls.crear_evaluacion(cls.tipo, cls.lapso_2)
+
+    @classmethod
+    def crear_evaluacion(cls, tipo: TipoTarea, lapso: Lapso) -> TareaProfesorMateria:
+        tarea = Tarea.objects.create(tipo=tipo, profesor=cls.profesor, lapso=lapso)
+
+        return TareaProfesorMateria.objects.create(
+            tarea=tarea, profesormateria=cls.profesor_materia
+        )
+
+    def nota(self, evaluacion: TareaProfesorMateria, matricula: Matricula) -> Nota:
+        return Nota.objects.get(tarea_profesormateria=evaluacion, matricula=matricula)
+
+
+class GuardarNotasTests(DatosNotas):
+    def guardar(self, celdas, versiones=None, lapso=None):
+        return guardar_notas(
+            self.profesor_materia, lapso or self.lapso, celdas, versiones
+        )
+
+    def test_crea_y_actualiza_notas(self):
+        celda = (self.evaluacion.pk, self.matriculas[0].pk)
+
+        resultado = self.guardar({celda: "15"})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.CREADA)
+        self.assertEqual(resultado.notas[celda], (15, 1))
+
+        resultado = self.guardar({celda: 18})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.ACTUALIZADA)
+        self.assertEqual(resultado.notas[celda], (18, 2))
+
+        resultado = self.guardar({celda: "18"})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.SIN_CAMBIOS)
+
+        nota = self.nota(self.evaluacion, self.matriculas[0])
+        self.assertEqual((nota.valor, nota.version), (18, 2))
+
+    def test_rechaza_celdas_invalidas_sin_impedir_las_demas(self):
+        valida = (self.evaluacion.pk, self.matriculas[0].pk)
+        celdas = {
+            valida: "12",
+            (self.evaluacion.pk, self.matriculas[1].pk): "abc",
+            (self.evaluacion.pk, self.matriculas_2[1].pk): "25",
+            (self.evaluacion_2.pk, self.matriculas[1].pk): "10",
+            (self.evaluacion.pk, self.matriculas_2[0].pk): "10",
+        }
+
+        resultado = self.guardar(celdas)
+
+        self.assertEqual(
+            list(resultado.rechazadas.values()),
+            [
+                EstadoCelda.VALOR_INVALIDO,
+                EstadoCelda.FUERA_DE_RANGO,
+                EstadoCelda.EVALUACION_INVALIDA,
+                EstadoCelda.MATRICULA_INVALIDA,
+            ],
+        )
+        self.assertEqual(resultado.celdas[valida], EstadoCelda.CREADA)
+        self.assertEqual(Nota.objects.count(), 1)
+
+    def test_rechaza_ediciones_sobre_versiones_anteriores(self):
+        celda = (self.evaluacion.pk, self.matriculas[0].pk)
+        self.guardar({celda: 10})
+        self.guardar({celda: 11})
+
+        resultado = self.guardar({celda: 12}, {celda: 1})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.OBSOLETA)
+        self.assertEqual(resultado.notas[celda], (11, 2))
+
+        # el mismo valor que el guardado no es un conflicto
+        resultado = self.guardar({celda: 11}, {celda: 1})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.SIN_CAMBIOS)
+
+        resultado = self.guardar({celda: 12}, {celda: 2})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.ACTUALIZADA)
+        self.assertEqual(resultado.notas[celda], (12, 3))
+
+    def test_las_ediciones_de_otros_formularios_cambian_la_version(self):
+        celda = (self.evaluacion.pk, self.matriculas[0].pk)
+        self.guardar({celda: 10})
+
+        nota = self.nota(self.evaluacion, self.matriculas[0])
+        nota.valor = 14
+        nota.save()
+
+        resultado = self.guardar({celda: 16}, {celda: 1})
+        self.assertEqual(resultado.celdas[celda], EstadoCelda.OBSOLETA)
+        self.assertEqual(resultado.notas[celda], (14, 2))
+
+
+class AutoguardarNotasTests(DatosNotas):
+    def autoguardar(self, *cambios):
+        return autoguardar_notas(
+            self.profesor_materia,
+            self.lapso,
+            [
+                CambioNota(clave, self.evaluacion.pk, matricula.pk, valor, version)
+                for clave, matricula, valor, version in cambios
+            ],
+        )
+
+    def test_los_reintentos_no_modifican_la_nota(self):
+        cambio = ("a", self.matriculas[0], "14", 0)
+
+        primero = self.autoguardar(cambio)
+        reintento = self.autoguardar(cambio)
+
+        self.assertEqual(primero["a"]["estado"], EstadoCelda.CREADA)
+        self.assertEqual(reintento["a"]["estado"], EstadoCelda.SIN_CAMBIOS)
+        self.assertEqual(reintento["a"]["version"], primero["a"]["version"])
+        self.assertEqual(self.nota(self.evaluacion, self.matriculas[0]).version, 1)
+
+    def test_aplica_la_ultima_edicion_de_cada_celda(self):
+        resultados = self.autoguardar(
+            ("a", self.matriculas[0], "10", 0),
+            ("b", self.matriculas[1], "12", 0),
+            ("c", self.matriculas[0], "11", 0),
+        )
+
+        self.assertEqual(resultados["a"], resultados["c"])
+        self.assertEqual(resultados["c"]["valor"], 11)
+        self.assertEqual(resultados["b"]["valor"], 12)
+        self.assertEqual(self.nota(self.evaluacion, self.matriculas[0]).valor, 11)
+
+    def test_responde_el_valor_guardado_a_las_ediciones_obsoletas(self):
+        self.autoguardar(("a", self.matriculas[0], "10", 0))
+        self.autoguardar(("b", self.matriculas[0], "13", 1))
+
+        resultados = self.autoguardar(("c", self.matriculas[0], "17", 1))
+
+        self.assertEqual(resultados["c"]["estado"], EstadoCelda.OBSOLETA)
+        self.assertEqual(
+            (resultados["c"]["valor"], resultados["c"]["version"]), (13, 2)
+        )
+
+
+class PromediosTests(DatosNotas):
+    def promedios(self) -> "dict[tuple[int, int], float]":
+        return {
+            (matricula, materia): promedio
+            for matricula, materia, promedio in PromedioMateria.objects.values_list(
+                "matricula_id", "materia_id", "promedio"
+            )
+        }
+
+    def test_se_actualizan_con_las_notas(self):
+        otra_evaluacion = self.crear_evaluacion(self.otro_tipo, self.lapso)
+        matricula = self.matriculas[0]
+
+        Nota.objects.create(
+            tarea_profesormateria=self.evaluacion, matricula=matricula, valor=10
+        )
+        Nota.objects.create(
+            tarea_profesormateria=otra_evaluacion, matricula=matricula, valor=20
+        )
+        self.assertEqual(self.promedios(), {(matricula.pk, self.materia.pk): 15})
+        self.assertEqual(PromedioGeneral.objects.get(matricula=matricula).promedio, 15)
+
+        self.nota(otra_evaluacion, matricula).delete()
+        self.assertEqual(self.promedios(), {(matricula.pk, self.materia.pk): 10})
+
+        otra_evaluacion.delete()
+        self.nota(self.evaluacion, matricula).delete()
+        self.assertEqual(self.promedios(), {})
+        self.assertFalse(PromedioGeneral.objects.exists())
+
+    def test_se_actualizan_con_las_operaciones_masivas(self):
+        Nota.objects.bulk_create(
+            Nota(tarea_profesormateria=self.evaluacion, matricula=matricula, valor=8)
+            for matricula in self.matriculas
+        )
+        self.assertEqual(set(self.promedios().values()), {8})
+
+        Nota.objects.filter(matricula=self.matriculas[1]).update(valor=16)
+        self.assertEqual(
+            self.promedios(),
+            {
+                (self.matriculas[0].pk, self.materia.pk): 8,
+                (self.matriculas[1].pk, self.materia.pk): 16,
+            },
+        )
+
+        Nota.objects.all().delete()
+        self.assertEqual(self.promedios(), {})
+
+    def test_al_cambiar_la_materia_impartida_se_mueven_sus_promedios(self):
+        matricula = self.matriculas[0]
+        guardar_notas(
+            self.profesor_materia, self.lapso, {(self.evaluacion.pk, matricula.pk): 12}
+        )
+        CalificacionPendiente.objects.all().delete()
+
+        profesor_materia = ProfesorMateria.objects.get(pk=self.profesor_materia.pk)
+        profesor_materia.materia = self.otra_materia
+        profesor_materia.save()
+
+        self.assertEqual(self.promedios(), {(matricula.pk, self.otra_materia.pk): 12})
+        self.assertTrue(
+            CalificacionPendiente.objects.filter(
+                estudiante=matricula.estudiante
+            ).exists()
+        )
+
+
+class CalificacionesTests(DatosNotas):
+    def test_calcula_las_calificaciones_ponderadas(self):
+        otra_evaluacion = self.crear_evaluacion(self.otro_tipo, self.lapso)
+        matricula, matricula_2 = self.matriculas[0], self.matriculas_2[0]
+
+        guardar_notas(
+            self.profesor_materia,
+            self.lapso,
+            {
+                (self.evaluacion.pk, matricula.pk): 20,
+                (otra_evaluacion.pk, matricula.pk): 12,
+            },
+        )
+        guardar_notas(
+            self.profesor_materia,
+            self.lapso_2,
+            {(self.evaluacion_2.pk, matricula_2.pk): 10},
+        )
+
+        fecha = datetime.datetime.now(datetime.timezone.utc)
+        estudiantes = [matricula.estudiante_id]  # type: ignore - sí existe "estudiante_id"
+        lapsos, finales = calcular_lote(estudiantes, obtener_configuracion(), fecha)
+
+        self.assertEqual((lapsos, finales), (2, 1))
+        self.assertEqual(
+            CalificacionLapso.objects.get(matricula=matricula).calificacion,
+            (20 * 3 + 12 * 1) / 4,
+        )
+        # los dos lapsos son del mismo año escolar, y el segundo pesa el triple
+        final = CalificacionFinal.objects.get(estudiante=matricula.estudiante)
+        self.assertEqual(final.calificacion, (18 * 1 + 10 * 3) / 4)
+        self.assertEqual(final.lapsos, 2)
+
+    def test_solo_recalcula_los_estudiantes_pendientes(self):
+        guardar_notas(
+            self.profesor_materia,
+            self.lapso,
+            {
+                (self.evaluacion.pk, self.matriculas[0].pk): 15,
+                (self.evaluacion.pk, self.matriculas[1].pk): 16,
+            },
+        )
+
+        self.assertTrue(calcular_calificaciones().completo)
+        self.assertFalse(CalificacionPendiente.objects.exists())
+
+        guardar_notas(
+            self.profesor_materia,
+            self.lapso,
+            {(self.evaluacion.pk, self.matriculas[1].pk): 8},
+        )
+        resultado = calcular_calificaciones()
+
+        self.assertFalse(resultado.completo)
+        self.assertEqual(resultado.estudiantes, 1)
+        self.assertEqual(
+            CalificacionLapso.objects.get(matricula=self.matriculas[1]).calificacion, 8
+        )
+
+
+class ClasificacionTests(TestCase):
+    def setUp(self):
+        self.clasificacion = Clasificacion()
+
+        for matricula, promedio in ((1, 19), (2, 17), (3, 17), (4, 12)):
+            self.clasificacion.agregar(matricula, promedio)
+
+    def test_los_empates_comparten_el_puesto(self):
+        self.assertEqual(
+            [self.clasificacion.puesto(matricula) for matricula in (1, 2, 3, 4)],
+            [1, 2, 2, 4],
+        )
+        self.assertIsNone(self.clasificacion.puesto(5))
+        self.assertEqual(self.clasificacion.puesto_promedio(18), 2)
+        self.assertEqual(self.clasificacion.puesto_promedio(10), 5)
+
+    def test_percentiles(self):
+        self.assertEqual(self.clasificacion.percentil(1), 87.5)
+        self.assertEqual(self.clasificacion.percentil(2), 50)
+        self.assertEqual(self.clasificacion.percentil(4), 12.5)
+        self.assertIsNone(self.clasificacion.percentil(5))
+
+    def test_primeros_incluye_los_empatados_con_el_ultimo(self):
+        self.assertEqual(
+            [tuple(puesto) for puesto in self.clasificacion.primeros(2)],
+            [(1, 1, 19), (2, 2, 17), (2, 3, 17)],
+        )
+        self.assertEqual(self.clasificacion.primeros(0), [])
+        self.assertEqual(len(self.clasificacion.primeros(10)), 4)
+
+
+class PaginacionCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # apellidos repetidos, para que el orden necesite desempatar por el id
+        for cedula, apellido in enumerate("AABBBC", start=1):
+            Estudiante.objects.create(
+                cedula=cedula,
+                nombres="Ana",
+                apellidos=apellido,
+                sexo=Estudiante.OpcionesSexo.FEMENINO,
+                fecha_nacimiento=datetime.date(2010, 1, 1),
+            )
+
+    def test_filtro_cursor_equivale_a_comparar_tuplas(self):
+        orden = ("-apellidos", "id")
+        tercero = Estudiante.objects.order_by(*orden)[2]
+
+        despues = Estudiante.objects.order_by(*orden).filter(
+            filtro_cursor(orden, (tercero.apellidos, tercero.pk))
+        )
+
+        self.assertEqual(list(despues), list(Estudiante.objects.order_by(*orden)[3:]))
+
+    def test_recorre_todas_las_paginas_en_ambas_direcciones(self):
+        queryset = Estudiante.objects.order_by("apellidos")
+        esperados = list(queryset.order_by("apellidos", "id"))
+
+        paginas = [paginar_por_cursor(queryset, 4)]
+        paginas.append(
+            paginar_por_cursor(queryset, 4, despues=paginas[0].cursor_siguiente)
+        )
+
+        self.assertEqual(list(paginas[0]) + list(paginas[1]), esperados)
+        self.assertFalse(paginas[0].has_previous())
+        self.assertFalse(paginas[1].has_next())
+
+        anterior = paginar_por_cursor(queryset, 4, antes=paginas[1].cursor_anterior)
+        self.assertEqual(list(anterior), esperados[:4])
+
+    def test_rechaza_ordenes_con_nulos(self):
+        with self.assertRaises(ValueError):
+            paginar_por_cursor(Estudiante.objects.order_by("secciones_vocero"), 4)
+
+    def test_rechaza_ordenes_por_relaciones(self):
+        # Django ordena "seccion" por el "ordering" de Seccion, no por su id
+        self.assertFalse(orden_admite_cursor(Matricula.objects.order_by("seccion")))
+        self.assertTrue(orden_admite_cursor(Matricula.objects.order_by("seccion__id")))
+
+
+class ColumnasBusquedaTests(TestCase):
+    def test_las_actualizaciones_masivas_normalizan_las_expresiones(self):
+        estudiante = crear_estudiante(1)
+        otro = crear_estudiante(2)
+
+        Estudiante.objects.filter(pk=estudiante.pk).update(
+            apellidos=Concat(Value("Ñañez "), "nombres")
+        )
+        Estudiante.objects.filter(pk=otro.pk).update(nombres="José")
+
+        estudiante.refresh_from_db()
+        otro.refresh_from_db()
+        self.assertEqual(estudiante.apellidos_busqueda, "nanez ana")
+        self.assertEqual(otro.nombres_busqueda, "jose")
+        self.assertEqual(otro.apellidos_busqueda, "perez 2")
@@ -11,6 +11,16 @@ urlpatterns = (
         vistas.ListaNotas.as_view(),
         name=nombre_url_lista_auto(Nota),
     ),
+    path(
+        "notas/estadisticas/",
+        vistas.VistaEstadisticasNotas.as_view(),
+        name="estadisticas_notas",
+    ),
+    path(
+        "notas/cuadro-de-honor/",
+        vistas.VistaCuadroHonor.as_view(),
+        name="cuadro_honor",
+    ),
     path(
         "notas/cargar",
         vistas.VistaMateriasProfesor.as_view(),
@@ -22,9 +32,9 @@ urlpatterns = (
         name="cargar_notas",
     ),
     path(
-        "api/guardar-nota/",
-        vistas.guardar_nota_individual,
-        name="guardar_nota_individual",
+        "api/notas/<int:profesormateria_id>/autoguardado/",
+        vistas.autoguardado_notas,
+        name="autoguardado_notas",
     ),
     *crear_crud_urls(
         TipoTarea,
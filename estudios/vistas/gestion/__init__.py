@@ -4,13 +4,14 @@ from django.http import HttpRequest
 from django.shortcuts import render
 from app.vistas.listas import VistaListaObjetos
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from estudios.modelos.parametros import Materia, Año, Lapso, Seccion
+from django.db.models import Avg, Count, Q
+from estudios.modelos.parametros import Materia, Año, Seccion, obtener_lapso_actual
 from estudios.modelos.gestion.personas import (
     Estudiante,
     Profesor,
     Matricula,
 )
+from estudios.modelos.gestion.calificaciones import PromedioMateria
 
 
 def aplicar_filtros_secciones_y_lapsos(
@@ -34,7 +35,7 @@ def aplicar_filtros_secciones_y_lapsos(
 @login_required
 def inicio(request: HttpRequest):
     # Obtener el lapso actual
-    lapso_actual = Lapso.objects.last()
+    lapso_actual = obtener_lapso_actual()
 
     # Estadísticas generales
     total_estudiantes = Estudiante.objects.count()
@@ -42,6 +43,11 @@ def inicio(request: HttpRequest):
 
     total_materias = Materia.objects.count()
 
+    # promedio de los promedios por materia de las matrículas del lapso, desde la tabla de promedios
+    promedio_lapso = PromedioMateria.objects.filter(
+        matricula__lapso=lapso_actual
+    ).aggregate(promedio=Avg("promedio"))["promedio"]
+
     # distribucion_materias = []
 
     # for materia in Materia.objects.all():
@@ -91,6 +97,7 @@ def inicio(request: HttpRequest):
         "total_estudiantes": total_estudiantes,
         "profesores_activos": profesores_activos,
         "total_materias": total_materias,
+        "promedio_lapso": promedio_lapso,
         "distribucion_años": distribucion_años,
         "secciones": secciones,
         "lapso_actual": lapso_actual,
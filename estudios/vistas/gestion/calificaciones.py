@@ -1,3 +1,5 @@
+import json
+from collections import Counter
 from django.core.paginator import Page
 from django.contrib.auth.decorators import login_required
 from django.http import (
@@ -5,8 +7,9 @@ from django.http import (
     HttpResponseForbidden,
     JsonResponse,
 )
-from django.db.models import Avg, Count, Prefetch, QuerySet
+from django.db.models import Count, Prefetch, QuerySet
 from django.views.generic import TemplateView
+from app.middleware import presupuesto_consultas
 from app.vistas import Vista, nombre_url_crear_auto
 from django.shortcuts import get_object_or_404, redirect
 from app.vistas.forms import (
@@ -24,20 +27,46 @@ from estudios.forms.gestion.busqueda import (
     TareaBusquedaForm,
 )
 from estudios.modelos.gestion.personas import (
+    Estudiante,
     Matricula,
     Profesor,
     ProfesorMateria,
 )
-from django.db import transaction
-from estudios.modelos.parametros import Lapso, obtener_lapso_actual
+from estudios.modelos.parametros import (
+    Año,
+    Lapso,
+    Materia,
+    Seccion,
+    obtener_lapso_actual,
+)
+from estudios.servicios.notas import (
+    ESTADOS_GUARDADOS,
+    MAXIMO_CAMBIOS_AUTOGUARDADO,
+    VERSION_MAXIMA,
+    CambioNota,
+    agrupar_notas_matriculas,
+    autoguardar_notas,
+    celdas_de_formulario,
+    construir_matriz_notas,
+    guardar_notas,
+)
+from estudios.servicios.cuadro_honor import (
+    Clasificacion,
+    buscar_posicion,
+    obtener_cuadro_honor,
+)
+from estudios.servicios.estadisticas import obtener_estadisticas_lapso
+from estudios.servicios.progreso import obtener_progreso_profesor, progreso_vacio
 from estudios.modelos.gestion.calificaciones import (
     Nota,
+    PromedioMateria,
     Tarea,
     TareaProfesorMateria,
     TipoTarea,
 )
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
+from usuarios.backends import pertenece_grupo
 from usuarios.models import GruposBase
 
 
@@ -70,11 +99,8 @@ class EditarTipoTarea(VistaFormTipoTarea, VistaActualizarObjeto):
 def nada_que_ver_profesor(request: HttpRequest):
     """Indica que un usuario no es profesor ni admin"""
 
-    return (
-        not hasattr(request.user, "profesor")
-        and not request.user.grupos.filter(  # type: ignore - sí existe "grupos" como atributo
-            name=GruposBase.ADMIN.value
-        ).exists()
+    return not hasattr(request.user, "profesor") and not pertenece_grupo(
+        request.user, GruposBase.ADMIN.value
     )
 
 
@@ -86,20 +112,6 @@ class ListaTareasMixin(VistaListaObjetos):
     plantilla_lista = "calificaciones/tareas/lista.html"
     genero_sustantivo_objeto = "F"
 
-    def aplicar_filtros(self, queryset, datos_form):
-        queryset = super().aplicar_filtros(queryset, datos_form)
-
-        if tipos := datos_form.get(TareaBusquedaForm.Campos.TIPOS):
-            queryset = queryset.filter(tareaprofesormateria__tarea__tipo__in=tipos)
-
-        if materias := datos_form.get(TareaBusquedaForm.Campos.MATERIAS):
-            queryset = queryset.filter(materia__in=materias)
-
-        if secciones := datos_form.get(TareaBusquedaForm.Campos.SECCIONES):
-            queryset = queryset.filter(seccion__in=secciones)
-
-        return queryset
-
 
 class ProfesorPropioMixin:
     request: HttpRequest
@@ -126,6 +138,11 @@ class ListaTareasProfesor(
     paginate_by = 10
     http_method_names = ("get", "post", "delete")
     lapso_actual: "Lapso | None"
+    modelos_cache = (ProfesorMateria, Materia, Seccion, Lapso)
+
+    def obtener_clave_cache_extra(self):
+        """La lista solo muestra las tareas del profesor, no basta con los permisos"""
+        return str(self.request.user.profesor.pk)  # type: ignore - sí existe "profesor" como atributo
 
     def get_queryset(self, *args, **kwargs):
         lapso_actual = self.lapso_actual = obtener_lapso_actual()
@@ -152,17 +169,11 @@ class ListaTareasProfesor(
             )
         )
 
-    def obtener_total(self, ctx):
-        return self.model.objects.filter(
-            profesor=self.request.user.profesor,  # type: ignore - sí existe "profesor" como atributo
-            lapso=self.lapso_actual,
-        ).count()
-
-    def al_menos_uno(self):
+    def obtener_queryset_total(self):
         return self.model.objects.filter(
             profesor=self.request.user.profesor,  # type: ignore - sí existe "profesor" como atributo
             lapso=self.lapso_actual,
-        ).exists()  # type: ignore - sí existe "profesor" como atributo
+        )
 
     def delete(self, request: HttpRequest, *args, **kwargs):
         if not self.es_profesor():
@@ -245,20 +256,41 @@ class ListaNotas(VistaListaObjetos):
     template_name = "calificaciones/notas/index.html"
     plantilla_lista = "calificaciones/notas/lista.html"
     paginate_by = 1
+    paginacion_cursor = True
     form_filtros = NotasBusquedaForm
     genero_sustantivo_objeto = "F"
+    modelos_cache = (
+        Estudiante,
+        Tarea,
+        TipoTarea,
+        ProfesorMateria,
+        Materia,
+        Seccion,
+        Lapso,
+        PromedioMateria,
+    )
+    columnas_exportacion = (
+        {"titulo": "Cédula", "clave": "matricula__estudiante__cedula"},
+        {"titulo": "Nombres", "clave": "matricula__estudiante__nombres"},
+        {"titulo": "Apellidos", "clave": "matricula__estudiante__apellidos"},
+        {"titulo": "Sección", "clave": "matricula__seccion__nombre"},
+        {"titulo": "Lapso", "clave": "matricula__lapso__nombre"},
+        {
+            "titulo": "Materia",
+            "clave": "tarea_profesormateria__profesormateria__materia__nombre",
+        },
+        {
+            "titulo": "Evaluación",
+            "clave": "tarea_profesormateria__tarea__tipo__nombre",
+        },
+        {"titulo": "Nota", "clave": "valor", "alinear": "derecha"},
+        {"titulo": "Fecha", "clave": "fecha"},
+    )
 
     def get_queryset(self, *args, **kwargs):
-        queryset = (
-            Matricula.objects.annotate(promedio=Avg("nota__valor"))
-            .select_related("estudiante", "seccion", "seccion__año", "lapso")
-            .order_by("estudiante__apellidos", "estudiante__nombres")
-        )
-
-        notas_qs = Nota.objects.select_related(
-            "tarea_profesormateria__profesormateria__materia",
-            "tarea_profesormateria__tarea",
-        ).order_by("tarea_profesormateria__profesormateria__materia__nombre")
+        queryset = Matricula.objects.select_related(
+            "estudiante", "seccion", "seccion__año", "lapso"
+        ).order_by("estudiante__apellidos", "estudiante__nombres")
 
         datos_form = self.inicializar_form_filtros()
 
@@ -268,107 +300,79 @@ class ListaNotas(VistaListaObjetos):
         queryset = self.aplicar_filtros(queryset, datos_form)
         queryset = self.aplicar_orden(queryset, datos_form)
 
+        # las matrículas se filtran con el plan de filtros del form, las notas y los promedios de la página se filtran aparte al procesar las matrículas
+        self.notas_qs = self.filtrar_notas(
+            Nota.objects.order_by(
+                "tarea_profesormateria__profesormateria__materia__nombre",
+                "fecha",
+                "pk",
+            ),
+            datos_form,
+        )
+        self.promedios_qs = self.filtrar_promedios(
+            PromedioMateria.objects.order_by(), datos_form
+        )
+
+        return queryset
+
+    def filtrar_notas(self, notas_qs: QuerySet, datos_form) -> QuerySet:
+        """Filtra las notas de acuerdo a los filtros del form que no se aplican a las matrículas sino a las notas"""
+
         if secciones := datos_form.get(NotasBusquedaForm.Campos.SECCIONES):
             notas_qs = notas_qs.filter(
                 tarea_profesormateria__profesormateria__seccion__in=secciones
             )
-            queryset = queryset.filter(seccion__in=secciones)
 
         if años := datos_form.get("anios"):
             notas_qs = notas_qs.filter(
                 tarea_profesormateria__profesormateria__seccion__año__in=años
             )
-            queryset = queryset.filter(seccion__año__in=años)
 
         if lapsos := datos_form.get(NotasBusquedaForm.Campos.LAPSOS):
             notas_qs = notas_qs.filter(tarea_profesormateria__tarea__lapso__in=lapsos)
-            queryset = queryset.filter(lapso__in=lapsos)
 
         if materias := datos_form.get(NotasBusquedaForm.Campos.MATERIAS):
             notas_qs = notas_qs.filter(
                 tarea_profesormateria__profesormateria__materia__in=materias
             )
 
-        # Prefetch optimizado para notas con sus relaciones
-        notas_prefetch = Prefetch(
-            "nota_set",
-            queryset=notas_qs,
-            to_attr="notas_prefetch",
-        )
+        return notas_qs
 
-        # Consulta principal con optimizaciones
-        return queryset.prefetch_related(notas_prefetch)
+    def filtrar_promedios(self, promedios_qs: QuerySet, datos_form) -> QuerySet:
+        """Los promedios son de las notas de la sección y lapso de su matrícula, por lo que de los filtros de las notas solo les aplica el de materias"""
 
-    def paginate_queryset(self, queryset, page_size):
-        """Sobrescribe el método de paginación para mantener la paginación estándar."""
-        return super().paginate_queryset(queryset, page_size)
+        if materias := datos_form.get(NotasBusquedaForm.Campos.MATERIAS):
+            promedios_qs = promedios_qs.filter(materia__in=materias)
 
-    def procesar_matriculas(self, matriculas):
-        """Procesa las matrículas para agrupar notas por materia"""
-        matriculas_procesadas = []
-
-        for matricula in matriculas:
-            # Diccionario para agrupar notas por materia
-            materias_dict = {}
-
-            # Procesar las notas prefetched
-            for nota in getattr(matricula, "notas_prefetch", []):
-                materia = nota.tarea_profesormateria.profesormateria.materia
-                materia_id = materia.id
-
-                if materia_id not in materias_dict:
-                    materias_dict[materia_id] = {
-                        "materia": materia,
-                        "notas": [],
-                        "promedio": 0.0,
-                    }
-
-                # Agregar nota con información relevante
-                materias_dict[materia_id]["notas"].append(
-                    {
-                        "id": nota.id,
-                        "valor": nota.valor,
-                        "fecha": nota.fecha,
-                        "tipo": nota.tarea_profesormateria.tarea.tipo.nombre,
-                        "tarea_id": nota.tarea_profesormateria.tarea.id,
-                    }
-                )
+        return promedios_qs
 
-            # Calcular promedios por materia
-            for materia_data in materias_dict.values():
-                notas = [n["valor"] for n in materia_data["notas"]]
-                if notas:
-                    materia_data["promedio"] = sum(notas) / len(notas)
+    def obtener_queryset_total(self):
+        # la lista muestra las matrículas, aunque el modelo de la vista sea Nota
+        return Matricula.objects.all()
 
-            # Convertir diccionario a lista ordenada por nombre de materia
-            materias_lista = sorted(
-                materias_dict.values(), key=lambda x: x["materia"].nombre
-            )
+    def obtener_queryset_exportacion(self):
+        """La lista muestra las notas agrupadas por matrícula, por lo que se exportan las notas (una por fila) de las matrículas filtradas, con los mismos filtros que las notas de la lista"""
 
-            # Calcular promedio general
-            promedios_materias = [
-                m["promedio"] for m in materias_lista if m["promedio"] > 0
-            ]
-            promedio_general = (
-                sum(promedios_materias) / len(promedios_materias)
-                if promedios_materias
-                else 0.0
-            )
+        datos_form = self.inicializar_form_filtros()
 
-            # Crear estructura procesada para la matrícula
-            matricula_procesada = {
-                "id": matricula.id,
-                "estudiante": matricula.estudiante,
-                "seccion": matricula.seccion,
-                "lapso": matricula.lapso,
-                "materias_cursadas": materias_lista,
-                "promedio_general": promedio_general,
-                "total_materias": len(materias_lista),
-            }
+        matriculas = self.aplicar_filtros(Matricula.objects.all(), datos_form)
 
-            matriculas_procesadas.append(matricula_procesada)
+        notas = Nota.objects.filter(matricula__in=matriculas.values("id"))
+        notas = self.filtrar_notas(notas, datos_form)
 
-        return matriculas_procesadas
+        return notas.order_by(
+            "matricula__estudiante__apellidos",
+            "matricula__estudiante__nombres",
+            "tarea_profesormateria__profesormateria__materia__nombre",
+            "fecha",
+        )
+
+    def procesar_matriculas(self, matriculas):
+        """Agrupa por materia las notas de las matrículas de la página, con sus promedios por materia y general calculados en la base de datos"""
+
+        return agrupar_notas_matriculas(
+            list(matriculas), self.notas_qs, self.promedios_qs
+        )
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -406,62 +410,26 @@ class VistaMateriasProfesor(VistaNotasProfesorMixin):
 
     tipo_permiso = "view"
     template_name = "calificaciones/notas/seleccionar-materia.html"
+    presupuesto_consultas = 15
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         lapso_actual = obtener_lapso_actual()
 
         # Obtener todas las materias que imparte este profesor
-        materias_impartidas = (
+        materias_impartidas = list(
             ProfesorMateria.objects.filter(profesor=self.profesor)
             .select_related("materia", "seccion", "seccion__año")
             .order_by("seccion__año__nombre", "seccion__letra", "materia__nombre")
         )
 
-        # Enriquecer cada materia con estadísticas
-        materias_con_estadisticas = []
-
-        for materia in materias_impartidas:
-            # Obtener matrículas activas de la sección
-            matriculas = Matricula.objects.filter(
-                seccion=materia.seccion, lapso=lapso_actual, estado="A"
-            )
-
-            total_matriculas = matriculas.count()
-
-            # Obtener todas las tareas asignadas para esta materia
-            tareas_asignadas = TareaProfesorMateria.objects.filter(
-                profesormateria=materia, tarea__lapso=lapso_actual
-            )
+        # estadísticas de todas las materias, calculadas en conjunto y guardadas en caché
+        progreso = obtener_progreso_profesor(
+            self.profesor, lapso_actual, (materia.pk for materia in materias_impartidas)
+        )
 
-            total_tareas = tareas_asignadas.count()
-
-            # Calcular estudiantes con todas las notas
-            if total_tareas > 0:
-                # Estudiantes que tienen todas las notas registradas
-                estudiantes_con_todas_notas = 0
-
-                for matricula in matriculas:
-                    # Contar notas existentes para este estudiante en todas las tareas
-                    notas_estudiante = Nota.objects.filter(
-                        matricula=matricula, tarea_profesormateria__in=tareas_asignadas
-                    ).count()
-
-                    if notas_estudiante >= total_tareas:
-                        estudiantes_con_todas_notas += 1
-
-                # Calcular progreso general
-                progreso_general = 0
-                if total_matriculas > 0:
-                    progreso_general = (
-                        estudiantes_con_todas_notas / total_matriculas
-                    ) * 100
-            else:
-                estudiantes_con_todas_notas = 0
-                progreso_general = 0
-
-            # Crear objeto enriquecido
-            materia_dict = {
+        materias_con_estadisticas = [
+            {
                 "id": materia.pk,
                 "materia": {
                     "id": materia.materia.id,
@@ -471,16 +439,10 @@ class VistaMateriasProfesor(VistaNotasProfesorMixin):
                     "id": materia.seccion.id,
                     "nombre": materia.seccion.nombre,
                 },
-                "estadisticas": {
-                    "total_matriculas": total_matriculas,
-                    "total_tareas": total_tareas,
-                    "estudiantes_tareas_incompletas": total_matriculas
-                    - estudiantes_con_todas_notas,
-                    "progreso_general": round(progreso_general, 1),
-                },
+                "estadisticas": progreso.get(materia.pk) or progreso_vacio(),
             }
-
-            materias_con_estadisticas.append(materia_dict)
+            for materia in materias_impartidas
+        ]
 
         context.update(
             {
@@ -497,6 +459,8 @@ class VistaCargarNotas(VistaNotasProfesorMixin):
     tipo_permiso = "add"
     template_name = "calificaciones/notas/form.html"
     url_volver = nombre_url_crear_auto(Nota)
+    # el guardado de todas las notas hace un número fijo de consultas (incluidas las de la transacción y las que mantienen los promedios, el cuadro de honor y las calificaciones pendientes), sin importar la cantidad de celdas
+    presupuesto_consultas = 30
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -505,65 +469,26 @@ class VistaCargarNotas(VistaNotasProfesorMixin):
         materia_impartida_id = self.kwargs.get("profesormateria_id")
 
         self.materia_impartida = get_object_or_404(
-            ProfesorMateria, id=materia_impartida_id, profesor=self.profesor
+            ProfesorMateria.objects.select_related("materia", "seccion"),
+            id=materia_impartida_id,
+            profesor=self.profesor,
         )
 
         # Obtener el lapso actual
         lapso_actual = obtener_lapso_actual()
 
-        # Obtener todas las matrículas activas de la sección para el lapso actual
-        matriculas = (
-            Matricula.objects.filter(
-                seccion=self.materia_impartida.seccion,
-                lapso=lapso_actual,
-                estado="A",  # Solo estudiantes activos
-            )
-            .select_related("estudiante")
-            .order_by("estudiante__apellidos", "estudiante__nombres")
-        )
-
-        # Obtener todas las tareas asignadas para esta materia
-        tareas_asignadas = (
-            TareaProfesorMateria.objects.filter(
-                profesormateria=self.materia_impartida, tarea__lapso=lapso_actual
-            )
-            .select_related("tarea", "tarea__tipo")
-            .order_by("tarea__fecha_añadida")
-        )
-
-        # Crear estructura de datos para la tabla
-        tabla_notas = []
-        for matricula in matriculas:
-            fila = {
-                "matricula": matricula,
-                "estudiante": matricula.estudiante,
-                "notas": {},
-            }
-
-            # Obtener todas las notas existentes para esta matrícula
-            notas_existentes = (
-                Nota.objects.filter(
-                    matricula=matricula, tarea_profesormateria__in=tareas_asignadas
-                )
-                .select_related("tarea_profesormateria")
-                .values("id", "tarea_profesormateria_id", "valor", "matricula")
-            )
-
-            # Mapear notas por tarea
-            for nota in notas_existentes:
-                fila["notas"][nota["tarea_profesormateria_id"]] = nota
-
-            tabla_notas.append(fila)
+        # matrículas activas de la sección por evaluaciones de la materia, con todas las notas obtenidas en una consulta
+        tabla_notas = construir_matriz_notas(self.materia_impartida, lapso_actual)
 
         context.update(
             {
                 "profesor": self.profesor,
                 "materia_impartida": self.materia_impartida,
                 "lapso_actual": lapso_actual,
-                "tareas": tareas_asignadas,
+                "tareas": tabla_notas.tareas,
                 "tabla_notas": tabla_notas,
-                "total_tareas": tareas_asignadas.count(),
-                "total_estudiantes": matriculas.count(),
+                "total_tareas": len(tabla_notas.tareas),
+                "total_estudiantes": len(tabla_notas),
             }
         )
 
@@ -571,143 +496,315 @@ class VistaCargarNotas(VistaNotasProfesorMixin):
 
     @method_decorator(require_http_methods(["POST"]))
     def post(self, request, *args, **kwargs):
-        try:
-            with transaction.atomic():
-                # Obtener la materia impartida
-                materia_impartida_id = self.kwargs.get("profesormateria_id")
-                materia_impartida = get_object_or_404(
-                    ProfesorMateria, id=materia_impartida_id, profesor=self.profesor
-                )
-
-                lapso_actual = obtener_lapso_actual()
-
-                # Procesar cada nota enviada
-                notas_guardadas = 0
-                notas_actualizadas = 0
-
-                for key, value in request.POST.items():
-                    if key.startswith("nota_"):
-                        # El formato es: nota_[tarea_profesormateria_id]_[matricula_id]
-                        parts = key.split("_")
-                        if len(parts) >= 4:
-                            tarea_profesormateria_id = parts[1]
-                            matricula_id = parts[2]
-
-                            # Validar que el valor sea un número válido
-                            try:
-                                valor_nota = float(value)
-                                if valor_nota < 0 or valor_nota > 20:
-                                    messages.warning(
-                                        request,
-                                        f"La nota {valor_nota} está fuera del rango permitido (0-20)",
-                                    )
-                                    continue
-                            except ValueError:
-                                if (
-                                    value.strip()
-                                ):  # Si no está vacío pero no es número válido
-                                    messages.warning(
-                                        request, f"Valor inválido para nota: {value}"
-                                    )
-                                continue
-
-                            # Verificar que la tarea pertenezca a esta materia
-                            tarea_profesormateria = get_object_or_404(
-                                TareaProfesorMateria,
-                                id=tarea_profesormateria_id,
-                                profesormateria=materia_impartida,
-                            )
-
-                            # Verificar que la matrícula sea válida
-                            matricula = get_object_or_404(
-                                Matricula,
-                                id=matricula_id,
-                                seccion=materia_impartida.seccion,
-                                lapso=lapso_actual,
-                            )
-
-                            # Crear o actualizar la nota
-                            nota, created = Nota.objects.update_or_create(
-                                matricula=matricula,
-                                tarea_profesormateria=tarea_profesormateria,
-                                defaults={"valor": valor_nota},
-                            )
-
-                            if created:
-                                notas_guardadas += 1
-                            else:
-                                notas_actualizadas += 1
-
-                messages.success(
-                    request,
-                    f"Notas guardadas correctamente. "
-                    f"{notas_guardadas} nuevas, {notas_actualizadas} actualizadas.",
-                )
+        materia_impartida_id = self.kwargs.get("profesormateria_id")
+        materia_impartida = get_object_or_404(
+            ProfesorMateria, id=materia_impartida_id, profesor=self.profesor
+        )
 
+        try:
+            resultado = guardar_notas(
+                materia_impartida,
+                obtener_lapso_actual(),
+                celdas_de_formulario(request.POST),
+            )
         except Exception as e:
             messages.error(request, f"Error al guardar las notas: {str(e)}")
+            return redirect("cargar_notas", profesormateria_id=materia_impartida_id)
+
+        # un aviso por cada motivo de rechazo, no por cada celda
+        for estado, cantidad in Counter(resultado.rechazadas.values()).items():
+            messages.warning(
+                request, f"{cantidad} nota(s) no se guardaron: {estado.label}"
+            )
+
+        messages.success(
+            request,
+            f"Notas guardadas correctamente. "
+            f"{resultado.creadas} nuevas, {resultado.actualizadas} actualizadas.",
+        )
 
         return redirect("cargar_notas", profesormateria_id=materia_impartida_id)
 
 
-# API endpoint para guardar notas individuales (útil para guardado automático)
+def leer_cambios_autoguardado(cuerpo: bytes) -> "list[CambioNota]":
+    """Lee las ediciones del cuerpo JSON del autoguardado ({"cambios": [{"clave", "tarea_id", "matricula_id", "valor", "version"}, ...]}). Lanza ValueError si no tiene ese formato"""
+
+    try:
+        cambios = json.loads(cuerpo)["cambios"]
+    except (json.JSONDecodeError, TypeError, KeyError) as e:
+        raise ValueError("El cuerpo de la petición no es válido") from e
+
+    if not isinstance(cambios, list) or not cambios:
+        raise ValueError("No se enviaron cambios")
+
+    if len(cambios) > MAXIMO_CAMBIOS_AUTOGUARDADO:
+        raise ValueError(
+            f"No se pueden enviar más de {MAXIMO_CAMBIOS_AUTOGUARDADO} cambios a la vez"
+        )
+
+    try:
+        leidos = [
+            CambioNota(
+                clave=str(cambio["clave"])[:64],
+                tarea_id=int(cambio["tarea_id"]),
+                matricula_id=int(cambio["matricula_id"]),
+                valor=cambio["valor"],
+                version=int(cambio["version"]),
+            )
+            for cambio in cambios
+        ]
+    except (TypeError, KeyError, ValueError, OverflowError) as e:
+        # OverflowError: json acepta Infinity, que no se puede convertir a entero
+        raise ValueError("Alguno de los cambios enviados no es válido") from e
+
+    if any(not 0 <= cambio.version <= VERSION_MAXIMA for cambio in leidos):
+        raise ValueError("Alguna de las versiones enviadas no es válida")
+
+    return leidos
+
+
+# guardado automático de la carga de notas: recibe las ediciones de varias celdas a la vez
+@presupuesto_consultas(30)
 @login_required
 @require_http_methods(["POST"])
-def guardar_nota_individual(request):
+def autoguardado_notas(request: HttpRequest, profesormateria_id: int):
+    if not request.user.has_perm("estudios.add_nota"):
+        return JsonResponse(
+            {"mensaje": "No tienes permiso para guardar notas"}, status=403
+        )
+
+    materia_impartida = ProfesorMateria.objects.filter(
+        id=profesormateria_id, profesor__usuario=request.user
+    ).first()
+
+    if materia_impartida is None:
+        return JsonResponse({"mensaje": "Materia no encontrada"}, status=404)
+
     try:
-        profesor = Profesor.objects.get(usuario=request.user)
+        cambios = leer_cambios_autoguardado(request.body)
+    except ValueError as e:
+        return JsonResponse({"mensaje": str(e)}, status=400)
 
-        tarea_profesormateria_id = request.POST.get("tarea_id")
-        matricula_id = request.POST.get("matricula_id")
-        valor_nota = request.POST.get("valor")
+    try:
+        resultados = autoguardar_notas(
+            materia_impartida, obtener_lapso_actual(), cambios
+        )
+    except Exception as e:
+        return JsonResponse({"mensaje": str(e)}, status=500)
 
-        # Validaciones
-        if not all([tarea_profesormateria_id, matricula_id, valor_nota]):
-            return JsonResponse({"mensaje": "Faltan datos requeridos"}, status=400)
+    rechazadas = sum(
+        resultado["estado"] not in ESTADOS_GUARDADOS
+        for resultado in resultados.values()
+    )
 
-        try:
-            valor_nota = float(valor_nota)
-            if valor_nota < 0 or valor_nota > 20:
+    return JsonResponse(
+        {
+            "resultados": resultados,
+            "mensaje": (
+                f"{rechazadas} nota(s) no se guardaron"
+                if rechazadas
+                else "Notas guardadas correctamente."
+            ),
+        }
+    )
+
+
+class VistaDatosLapsoMixin(Vista, TemplateView):
+    """Datos de un lapso (el indicado con "lapso" o el actual) que se muestran como página, o como JSON si se piden con "formato=json" o con el header Accept"""
+
+    model = Nota
+    tipo_permiso = "view"
+    presupuesto_consultas = 15
+
+    def obtener_lapso(self) -> "Lapso | None":
+        lapso_id = self.request.GET.get("lapso", "")
+
+        if lapso_id.isdigit():
+            return get_object_or_404(Lapso, pk=lapso_id)
+
+        return obtener_lapso_actual()
+
+    def obtener_datos(self, lapso: Lapso) -> dict:
+        raise NotImplementedError
+
+    def es_peticion_json(self) -> bool:
+        # no se usa request.accepts, ya que también acepta JSON con "Accept: */*"
+        pide_json = self.request.GET.get("formato") == "json"
+        pide_json |= "application/json" in self.request.headers.get("Accept", "")
+
+        return pide_json
+
+    def get(self, request, *args, **kwargs):
+        self.lapso = self.obtener_lapso()
+        self.datos = self.obtener_datos(self.lapso) if self.lapso else None
+
+        if self.es_peticion_json():
+            if self.datos is None:
                 return JsonResponse(
-                    {"mensaje": "El valor de La nota debe ser entre 0 y 20"},
-                    status=400,
+                    {"mensaje": "No hay lapsos registrados"}, status=404
                 )
-        except ValueError:
-            return JsonResponse({"mensaje": "Valor de nota inválido"}, status=400)
-
-        # Verificar que la tarea pertenezca al profesor
-        tarea_profesormateria = get_object_or_404(
-            TareaProfesorMateria,
-            id=tarea_profesormateria_id,
-            profesormateria__profesor=profesor,
+
+            return JsonResponse(self.datos)
+
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        context.update({"lapso": self.lapso, "lapsos": Lapso.objects.order_by("-pk")})
+
+        return context
+
+
+class VistaEstadisticasNotas(VistaDatosLapsoMixin):
+    """Estadísticas de las notas de un lapso (general, por sección, materia y tipo de evaluación)"""
+
+    template_name = "calificaciones/notas/estadisticas.html"
+
+    def obtener_datos(self, lapso: Lapso) -> dict:
+        return obtener_estadisticas_lapso(lapso)  # type: ignore - es un diccionario
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        context.update(
+            {
+                "estadisticas": self.datos,
+                "grupos": (
+                    [
+                        ("Por sección", self.datos["secciones"]),
+                        ("Por materia", self.datos["materias"]),
+                        ("Por tipo de evaluación", self.datos["tipos"]),
+                    ]
+                    if self.datos
+                    else []
+                ),
+            }
         )
 
-        # Verificar que la matrícula sea válida
-        matricula = get_object_or_404(
-            Matricula,
-            id=matricula_id,
-            seccion=tarea_profesormateria.profesormateria.seccion,
+        return context
+
+
+class VistaCuadroHonor(VistaDatosLapsoMixin):
+    """Primeros puestos por promedio general de cada año y sección de un lapso. Con "matricula" se incluyen el puesto y el percentil de esa matrícula"""
+
+    template_name = "calificaciones/notas/cuadro-honor.html"
+    cantidad_por_defecto = 10
+    cantidad_maxima = 50
+
+    def obtener_cantidad(self) -> int:
+        cantidad = self.request.GET.get("cantidad", "")
+
+        if not cantidad.isdigit():
+            return self.cantidad_por_defecto
+
+        return max(1, min(int(cantidad), self.cantidad_maxima))
+
+    def crear_grupos(
+        self,
+        clasificaciones: "dict[int, Clasificacion]",
+        nombres: "dict[int, str]",
+        cantidad: int,
+    ) -> "list[dict]":
+        return sorted(
+            (
+                {
+                    "id": grupo_id,
+                    "nombre": nombres.get(grupo_id, ""),
+                    "total": len(clasificacion),
+                    "primeros": clasificacion.primeros(cantidad),
+                }
+                for grupo_id, clasificacion in clasificaciones.items()
+            ),
+            key=lambda grupo: grupo["nombre"],
         )
 
-        # Guardar la nota
-        nota, created = Nota.objects.update_or_create(
-            matricula=matricula,
-            tarea_profesormateria=tarea_profesormateria,
-            defaults={"valor": valor_nota},
+    def obtener_datos(self, lapso: Lapso) -> dict:
+        cuadro = obtener_cuadro_honor(lapso)
+        cantidad = self.obtener_cantidad()
+
+        años = self.crear_grupos(
+            cuadro.años,
+            dict(Año.objects.filter(pk__in=cuadro.años).values_list("pk", "nombre")),
+            cantidad,
+        )
+        secciones = self.crear_grupos(
+            cuadro.secciones,
+            dict(
+                Seccion.objects.filter(pk__in=cuadro.secciones).values_list(
+                    "pk", "nombre"
+                )
+            ),
+            cantidad,
         )
 
-        return JsonResponse(
+        # datos de los estudiantes de todos los puestos mostrados, en una sola consulta
+        ids = {
+            puesto.matricula_id
+            for grupo in (*años, *secciones)
+            for puesto in grupo["primeros"]
+        }
+        estudiantes = {
+            matricula_id: {
+                "nombres": nombres,
+                "apellidos": apellidos,
+                "cedula": cedula,
+                "seccion": seccion,
+            }
+            for matricula_id, nombres, apellidos, cedula, seccion in Matricula.objects.filter(
+                pk__in=ids
+            ).values_list(
+                "pk",
+                "estudiante__nombres",
+                "estudiante__apellidos",
+                "estudiante__cedula",
+                "seccion__nombre",
+            )
+        }
+
+        for grupo in (*años, *secciones):
+            grupo["primeros"] = [
+                {**puesto._asdict(), **estudiantes[puesto.matricula_id]}
+                for puesto in grupo["primeros"]
+            ]
+
+        matricula = None
+        matricula_id = self.request.GET.get("matricula", "")
+
+        if matricula_id.isdigit():
+            matricula_id = int(matricula_id)
+
+            matricula = {
+                "id": matricula_id,
+                "año": buscar_posicion(cuadro.años, matricula_id),
+                "seccion": buscar_posicion(cuadro.secciones, matricula_id),
+            }
+
+        return {
+            "lapso": lapso.pk,
+            "cantidad": cantidad,
+            "años": años,
+            "secciones": secciones,
+            "matricula": matricula,
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+
+        context.update(
             {
-                "success": True,
-                "created": created,
-                "nota_id": nota.pk,
-                "valor": valor_nota,
-                "tarea_id": tarea_profesormateria_id,
-                "mensaje": f"Nota {'creada' if created else 'actualizada'} correctamente.",
+                "cuadro": self.datos,
+                "cantidades": (3, 5, 10, 20, 50),
+                # en los años se muestra la sección de cada estudiante
+                "grupos_cuadro": (
+                    [
+                        ("Por año", self.datos["años"], True),
+                        ("Por sección", self.datos["secciones"], False),
+                    ]
+                    if self.datos
+                    else []
+                ),
             }
         )
 
-    except Profesor.DoesNotExist:
-        return JsonResponse({"mensaje": "Profesor no encontrado"}, status=403)
-    except Exception as e:
-        return JsonResponse({"mensaje": str(e)}, status=500)
+        return context
@@ -16,18 +16,22 @@ from django.db.models import (
     F,
     Case,
     Count,
+    Exists,
+    OuterRef,
     Prefetch,
     When,
 )
-from django.views.generic import CreateView, FormView, ListView, UpdateView
+from django.views.generic import CreateView, FormView, UpdateView
 from app import HTTPResponseHXRedirect
-from app.util import mn, nc, obtener_filtro_bool_o_nulo
+from app.cache import incrementar_generacion
+from app.util import mn, nc
 from app.vistas import nombre_url_lista_auto
 from app.vistas.forms import (
     VistaActualizarObjeto,
     VistaCrearObjeto,
     VistaForm,
 )
+from app.vistas.estadisticas import obtener_total_en_cache
 from app.vistas.listas import VistaListaObjetos
 from estudios.forms.gestion.personas import (
     FormEstudiante,
@@ -62,54 +66,26 @@ class ListaProfesores(VistaListaObjetos):
     template_name = "personas/profesores/index.html"
     plantilla_lista = "personas/profesores/lista.html"
     form_filtros = ProfesorBusquedaForm
+    # los campos que muestran las tarjetas
+    campos_requeridos = (
+        nc(Profesor.nombres),
+        nc(Profesor.apellidos),
+        nc(Profesor.cedula),
+        nc(Profesor.telefono),
+        nc(Profesor.activo),
+        nc(Profesor.fecha_ingreso),
+        "usuario__username",
+    )
 
     def get_queryset(self, *args, **kwargs):
         q = Profesor.objects.annotate(
             foto_perfil=F("usuario__foto_perfil"),
             miniatura_foto=F("usuario__miniatura_foto"),
             materias_asignadas=Count("profesormateria"),
-        ).only(
-            "id",
-            *(
-                nc(Profesor.cedula),
-                nc(Profesor.telefono),
-                nc(Profesor.usuario),
-                nc(Profesor.fecha_ingreso),
-            ),
         )
 
         return super().get_queryset(q)
 
-    def aplicar_filtros(self, queryset, datos_form):
-        queryset = super().aplicar_filtros(queryset, datos_form)
-
-        if (
-            tiene_usuario := obtener_filtro_bool_o_nulo(
-                ProfesorBusquedaForm.Campos.TIENE_USUARIO, datos_form
-            )
-        ) is not None:
-            f = Q(usuario__isnull=False)
-            queryset = queryset.filter(f if tiene_usuario else ~f)
-
-        if (
-            activo := obtener_filtro_bool_o_nulo(
-                ProfesorBusquedaForm.Campos.ACTIVO, datos_form
-            )
-        ) is not None:
-            f = Q(activo=True)
-            queryset = queryset.filter(f if activo else ~f)
-
-        if (
-            tiene_telefono := obtener_filtro_bool_o_nulo(
-                ProfesorBusquedaForm.Campos.TIENE_TELEFONO, datos_form
-            )
-        ) is not None:
-            f = Q(telefono__isnull=False) & ~Q(telefono="")
-
-            queryset = queryset.filter(f if tiene_telefono else ~f)
-
-        return queryset
-
 
 class ProfesorFormMixin(PermissionRequiredMixin, FormView):
     usuario_form_class: Type[FormUsuario] = FormUsuario
@@ -283,6 +259,13 @@ class ListaProfesoresMaterias(VistaListaObjetos):
     plantilla_lista = "personas/profesores_materias/lista.html"
     # igual al nombre del campo del form de transferencia, para pasarle la lista y que verifique
     ids_objetos_kwarg = FormTransferirProfesorMateria.Campos.MATERIAS
+    # la lista es de profesores, con sus materias
+    columnas_exportacion = (
+        {"titulo": "Cédula", "clave": nc(Profesor.cedula)},
+        {"titulo": "Nombres", "clave": nc(Profesor.nombres)},
+        {"titulo": "Apellidos", "clave": nc(Profesor.apellidos)},
+        {"titulo": "Materias asignadas", "clave": "cantidad_materias"},
+    )
 
     def get_queryset(self, *args, **kwargs):
         q = Profesor.objects.annotate(cantidad_materias=Count("profesormateria"))
@@ -305,7 +288,10 @@ class ListaProfesoresMaterias(VistaListaObjetos):
         if secciones := datos_form.get("secciones"):
             pm_queryset = pm_queryset.filter(seccion__in=secciones)
 
-        return queryset.filter(profesormateria__in=pm_queryset).prefetch_related(
+        # se usa una subconsulta en lugar de un join, para no repetir profesores
+        return queryset.filter(
+            Exists(pm_queryset.filter(profesor=OuterRef("pk")))
+        ).prefetch_related(
             Prefetch(
                 "profesormateria_set",
                 queryset=pm_queryset,
@@ -313,13 +299,6 @@ class ListaProfesoresMaterias(VistaListaObjetos):
             )
         )
 
-    def get(self, request: HttpRequest, *args, **kwargs):
-        r = super(ListView, self).get(request, *args, **kwargs)
-
-        self.total = ProfesorMateria.objects.count()
-
-        return r
-
     def actualizar(
         self, request: HttpRequest, ids: "list[str]", datos: QueryDict, *args, **kwargs
     ):
@@ -356,6 +335,7 @@ class ListaProfesoresMaterias(VistaListaObjetos):
                 a_transferir,
                 fields=[nc(ProfesorMateria.profesor)],
             )
+            incrementar_generacion(ProfesorMateria)
 
             if cantidad:
                 messages.success(
@@ -467,27 +447,32 @@ class CrearProfesorMateria(VistaForm, FormView):
 class ListaEstudiantes(VistaListaObjetos):
     model = Estudiante
     paginate_by = 20
+    paginacion_cursor = True
     form_filtros = EstudianteBusquedaForm
     form_matricular = FormMatricularEstudiantes
+    modelos_cache = (Lapso,)
     template_name = "personas/estudiantes/index.html"
     plantilla_lista = "personas/estudiantes/lista.html"
     # igual al nombre del campo del form de matricular, para pasarle la lista y que verifique
     ids_objetos_kwarg = "estudiantes"
+    # los campos que muestran las tarjetas
+    campos_requeridos = (
+        nc(Estudiante.nombres),
+        nc(Estudiante.apellidos),
+        nc(Estudiante.cedula),
+        nc(Estudiante.fecha_nacimiento),
+        nc(Estudiante.fecha_ingreso),
+    )
 
     def get_queryset(self, *args, **kwargs):
         q = self.model.objects.all().annotate()
 
-        lapsos = Lapso.objects.order_by("-id")
-
-        try:
-            lapso_actual = self.lapso_actual = lapsos[0]
-        except IndexError:
-            lapso_actual = self.lapso_actual = None
+        lapso_actual = self.lapso_actual = obtener_lapso_actual()
 
         if lapso_actual:
-            matriculas_actuales = Matricula.objects.filter(lapso=lapso_actual).only(
-                "seccion__nombre"
-            )
+            matriculas_actuales = Matricula.objects.filter(
+                lapso=lapso_actual
+            ).select_related("seccion", "lapso")
             """ promedios_actuales = Nota.objects.annotate(promedio=Avg("valor")).filter(
                 matricula__in=matriculas_actuales
             ) """
@@ -500,15 +485,18 @@ class ListaEstudiantes(VistaListaObjetos):
                 )
             )
 
-        try:
-            lapso_anterior = lapsos[1]
-        except IndexError:
-            lapso_anterior = None
+        lapso_anterior = (
+            Lapso.objects.filter(fecha_inicio__lt=lapso_actual.fecha_inicio)
+            .order_by("-fecha_inicio", "-pk")
+            .first()
+            if lapso_actual
+            else None
+        )
 
         if lapso_anterior:
-            matriculas_anteriores = Matricula.objects.filter(lapso=lapso_anterior).only(
-                "seccion__nombre"
-            )
+            matriculas_anteriores = Matricula.objects.filter(
+                lapso=lapso_anterior
+            ).select_related("seccion", "lapso")
 
             q = q.prefetch_related(
                 Prefetch(
@@ -520,28 +508,6 @@ class ListaEstudiantes(VistaListaObjetos):
 
         return super().get_queryset(q)
 
-    def aplicar_filtros(self, queryset: models.QuerySet, datos_form):
-        q = super().aplicar_filtros(queryset, datos_form)
-
-        if (
-            matricula_actual := obtener_filtro_bool_o_nulo(
-                EstudianteBusquedaForm.Campos.MATRICULA_ACTUAL, datos_form
-            )
-        ) is not None:
-            if matricula_actual:
-                q = q.filter(
-                    matricula__isnull=False, matricula__lapso=self.lapso_actual
-                )
-            else:
-                q = q.filter(matricula__isnull=True).exclude(
-                    matricula__lapso=self.lapso_actual
-                )
-
-        if secciones := datos_form.get(EstudianteBusquedaForm.Campos.SECCIONES):
-            q = q.filter(matricula__seccion__in=secciones)
-
-        return q
-
     def actualizar(
         self, request: HttpRequest, ids: "list[str]", datos: QueryDict, *args, **kwargs
     ):
@@ -630,28 +596,12 @@ class ListaMatriculas(VistaListaObjetos):
 
         return self.procesar_secciones(queryset, datos_form)
 
-    def aplicar_filtros(self, queryset, datos_form):
-        queryset = super().aplicar_filtros(queryset, datos_form)
-
-        if lapsos := datos_form.get("lapsos"):
-            queryset = queryset.filter(lapso__in=lapsos)
-
-        if secciones := datos_form.get("secciones"):
-            queryset = queryset.filter(seccion__in=secciones)
-
-        if años := datos_form.get("anios"):
-            queryset = queryset.filter(seccion__año__in=años)
-
-        if estado := datos_form.get("estado"):
-            queryset = queryset.filter(estado=estado)
-
-        return queryset
-
     def eliminar(self, request: HttpRequest, ids: "list[str]"):
         return Matricula.objects.filter(id__in=ids, lapso=self.lapso_actual).delete()
 
     def obtener_total(self, ctx):
-        return self.model.objects.count()
+        # la lista está formada por grupos, por lo que el total no es la cantidad del paginador
+        return obtener_total_en_cache(self.obtener_queryset_total())
 
     def paginate_queryset(self, queryset, page_size):
         """Sobrescribe el método de paginación para trabajar con la lista personalizada"""
@@ -727,6 +677,35 @@ class ListaMatriculas(VistaListaObjetos):
 
         return queryset
 
+    columnas_exportacion = (
+        {"titulo": "Cédula", "clave": "estudiante__cedula"},
+        {"titulo": "Nombres", "clave": "estudiante__nombres"},
+        {"titulo": "Apellidos", "clave": "estudiante__apellidos"},
+        {"titulo": "Año", "clave": "seccion__año__nombre"},
+        {"titulo": "Sección", "clave": "seccion__nombre"},
+        {"titulo": "Lapso", "clave": "lapso__nombre"},
+        {"titulo": "Estado", "clave": "estado"},
+        {"titulo": "Fecha de añadida", "clave": "fecha_añadida"},
+    )
+
+    def obtener_queryset_exportacion(self):
+        """La lista está formada por grupos, por lo que se exportan las matrículas de todos los grupos filtrados, en el mismo orden"""
+
+        datos_form = self.inicializar_form_filtros()
+
+        queryset = self.aplicar_orden(Matricula.objects.all(), datos_form)
+        queryset = queryset.order_by(
+            "seccion__año__id",
+            "seccion__letra",
+            "lapso__numero",
+            *(
+                queryset.query.order_by
+                or ("estudiante__apellidos", "estudiante__nombres")
+            ),
+        )
+
+        return self.aplicar_filtros(queryset, datos_form)
+
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)
 
@@ -5,10 +5,8 @@ from django.db.models.functions.datetime import TruncMinute
 from django.http import (
     HttpResponseBadRequest,
 )
-from django.db.models import Case, Count, Q, F, Prefetch, When
-from app.campos import FiltrosConjuntoOpciones
-from app.forms import ConjuntoOpcionesForm
-from app.util import obtener_filtro_bool_o_nulo
+from django.db.models import Case, Count, Prefetch, When
+from app.cache import incrementar_generacion
 from app.vistas.forms import (
     VistaActualizarObjeto,
     VistaCrearObjeto,
@@ -24,7 +22,6 @@ from estudios.forms.parametros import (
 from estudios.forms.parametros.busqueda import (
     LapsoBusquedaForm,
     MateriaBusquedaForm,
-    OpcionesFormSeccion,
     SeccionBusquedaForm,
 )
 from estudios.modelos.parametros import (
@@ -42,6 +39,9 @@ class ListaLapsos(VistaListaObjetos):
     plantilla_lista = "parametros/lapsos/lista.html"
     model = Lapso
     form_filtros = LapsoBusquedaForm
+    # cada lapso arrastra sus matrículas, evaluaciones y notas al eliminarse, por lo que los pocos que se eliminan a la vez se procesan en la petición, y en segundo plano se procesan de a uno
+    umbral_segundo_plano = 5
+    tamaño_lote_segundo_plano = 1
 
     def get_queryset(self, *args, **kwargs):
         lapso_actual = obtener_lapso_actual()
@@ -74,6 +74,7 @@ class ListaMaterias(VistaListaObjetos):
     model = Materia
     form_filtros = MateriaBusquedaForm
     form_asignaciones = FormAsignaciones
+    modelos_cache = (Año,)
     genero_sustantivo_objeto = "F"
     columnas_totales = (
         {"titulo": "Nombre", "clave": "nombre"},
@@ -82,16 +83,9 @@ class ListaMaterias(VistaListaObjetos):
     )
 
     def get_queryset(self, *args, **kwargs):
-        queryset = (
-            Materia.objects.annotate(
-                fecha=TruncMinute("fecha_creacion"),
-            )
-            .only(
-                "id",
-                "nombre",
-            )
-            .order_by("nombre")
-        )
+        queryset = Materia.objects.annotate(
+            fecha=TruncMinute("fecha_creacion"),
+        ).order_by("nombre")
 
         return super().get_queryset(queryset)
 
@@ -102,53 +96,10 @@ class ListaMaterias(VistaListaObjetos):
     ):
         queryset = super().aplicar_filtros(queryset, datos_form)
 
-        if años_asignados := datos_form.get(MateriaBusquedaForm.Campos.ANIOS_ASIGNADOS):
-            tipo_busqueda_anios = datos_form.get(
-                f"{MateriaBusquedaForm.Campos.ANIOS_ASIGNADOS}{ConjuntoOpcionesForm.sufijo_tipo_q}"
-            )
-
-            # busqueda exacta de años asignados, ya sea todos o ninguno
-            if (
-                todos := tipo_busqueda_anios
-                == FiltrosConjuntoOpciones.CONTIENE_TODAS.value[0]
-            ) or tipo_busqueda_anios == FiltrosConjuntoOpciones.NO_CONTIENE_TODAS.value[
-                0
-            ]:
-                queryset = queryset.annotate(
-                    total_asignaciones=Count("añomateria"),
-                    asignaciones_especificas=Count(
-                        "añomateria", filter=Q(añomateria__año__in=años_asignados)
-                    ),
-                )
-
-                if todos:
-                    queryset = queryset.filter(
-                        total_asignaciones=len(años_asignados),
-                        asignaciones_especificas=len(años_asignados),
-                    )
-                else:
-                    queryset = queryset.exclude(
-                        total_asignaciones=len(años_asignados),
-                        asignaciones_especificas=len(años_asignados),
-                    )
-
-            # busqueda de al menos un año asignado en la lista
-            elif (
-                tipo_busqueda_anios == FiltrosConjuntoOpciones.CONTIENE_ALGUNA.value[0]
-            ):
-                queryset = queryset.filter(añomateria__año__in=años_asignados)
-
-            # busqueda de ningún año asignado en la lista
-            elif (
-                tipo_busqueda_anios
-                == FiltrosConjuntoOpciones.NO_CONTIENE_ALGUNA.value[0]
-            ):
-                queryset = queryset.exclude(añomateria__año__in=años_asignados)
-
         return queryset.prefetch_related(
             Prefetch(
                 "añomateria_set",
-                queryset=AñoMateria.objects.all(),
+                queryset=AñoMateria.objects.select_related("año"),
                 to_attr="asignaciones",
             )
         )
@@ -190,6 +141,8 @@ class ListaMaterias(VistaListaObjetos):
                         )
                     )
 
+                incrementar_generacion(AñoMateria)
+
                 if asignadas > 0:
                     messages.success(
                         request,
@@ -231,6 +184,7 @@ class CrearMateria(VistaCrearObjeto):
             AñoMateria.objects.bulk_create(
                 [AñoMateria(año=año, materia=materia) for año in años_seleccionados]
             )
+            incrementar_generacion(AñoMateria)
 
         return r
 
@@ -269,6 +223,7 @@ class ActualizarMateria(VistaActualizarObjeto):
                 AñoMateria.objects.bulk_create(
                     [AñoMateria(año=año, materia=self.object) for año in años_a_asignar]
                 )
+                incrementar_generacion(AñoMateria)
 
         return super().form_valid(form)
 
@@ -318,36 +273,6 @@ class ListaSecciones(VistaListaObjetos):
         q = self.model.objects.annotate(cantidad_matriculas=Count("matricula")).all()
         return super().get_queryset(q)
 
-    def aplicar_filtros(self, queryset, datos_form):
-        queryset = super().aplicar_filtros(queryset, datos_form)
-
-        if letra := datos_form.get(SeccionBusquedaForm.Campos.LETRA):
-            queryset = queryset.filter(letra__in=letra)
-
-        if (
-            vocero := obtener_filtro_bool_o_nulo(
-                SeccionBusquedaForm.Campos.VOCERO, datos_form
-            )
-        ) is not None:
-            valor_filtro = Q(vocero__isnull=True)
-
-            if vocero:
-                queryset = queryset.exclude(valor_filtro)
-            else:
-                queryset = queryset.filter(valor_filtro)
-
-        if disponibilidad := datos_form.get(SeccionBusquedaForm.Campos.DISPONIBILIDAD):
-            if disponibilidad == OpcionesFormSeccion.Disponibilidad.LLENA.value[0]:
-                queryset = queryset.filter(cantidad_matriculas__gte=F("capacidad"))
-            elif (
-                disponibilidad == OpcionesFormSeccion.Disponibilidad.DISPONIBLE.value[0]
-            ):
-                queryset = queryset.filter(cantidad_matriculas__lt=F("capacidad"))
-            elif disponibilidad == OpcionesFormSeccion.Disponibilidad.VACIA.value[0]:
-                queryset = queryset.filter(cantidad_matriculas=0)
-
-        return queryset
-
     def agrupar_queryset(self, lista_objetos):
         return (
             Año.objects.annotate(Count("seccion"))
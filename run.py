@@ -1,12 +1,25 @@
 import os
+import sys
 
 from django.core.management import execute_from_command_line
 
 
 if __name__ == "__main__":
+    # python run.py --produccion [opciones de servidor_produccion]
+    produccion = "--produccion" in sys.argv[1:]
+
+    if produccion:
+        # se debe definir antes de cargar la configuración
+        os.environ["PRODUCCION"] = "1"
+
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
-    comandos_apertura = ["manage.py", "runserver", "--insecure", "0.0.0.0:5000"]
+    if produccion:
+        comandos_apertura = ["manage.py", "servidor_produccion"] + [
+            argumento for argumento in sys.argv[1:] if argumento != "--produccion"
+        ]
+    else:
+        comandos_apertura = ["manage.py", "runserver", "--insecure", "0.0.0.0:5000"]
 
     try:
         execute_from_command_line(comandos_apertura)
@@ -1,6 +1,7 @@
 import json
 from django import forms, template
 import re
+from usuarios.backends import obtener_permisos_usuario
 
 register = template.Library()
 
@@ -30,6 +31,15 @@ def valor_por_clave(obj, clave):
         return obj.get(clave)
     elif hasattr(obj, clave):
         return getattr(obj, clave)
+    elif "__" in clave:
+        # columna de un objeto relacionado (ej: "seccion__nombre")
+        for parte in clave.split("__"):
+            obj = getattr(obj, parte, None)
+
+            if obj is None:
+                return None
+
+        return obj
 
 
 @register.filter(is_safe=True)
@@ -128,3 +138,10 @@ def encontrar_retraso(value: str):
     r = re.search(r"retraso=(\d+)", value)
     if r:
         return r.group(1)
+
+
+@register.filter
+def nombres_grupos(usuario):
+    """Nombres de los grupos del usuario, desde la caché de permisos"""
+
+    return obtener_permisos_usuario(usuario).grupos if usuario.is_authenticated else ()
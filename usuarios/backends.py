@@ -0,0 +1,72 @@
+from typing import NamedTuple
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from app.cache import obtener_generaciones
+from usuarios.models import Grupo, Usuario
+
+# modelos cuyos cambios modifican los permisos de los usuarios. Los cambios en las relaciones muchos a muchos los registra app.cache con la señal m2m_changed
+MODELOS_PERMISOS = (
+    Permission,
+    Grupo,
+    Grupo.permissions.through,
+    Usuario.grupos.through,
+    Usuario.user_permissions.through,
+)
+
+# tiempo máximo que se guardan los permisos de un usuario, por si se modifican sin enviar señales (ej: con update). Es corto porque de ellos depende el acceso
+TIEMPO_CACHE_PERMISOS = 60 * 5
+
+
+class PermisosUsuario(NamedTuple):
+    permisos: "frozenset[str]"
+    # nombres de los grupos, en el orden en que se muestran
+    grupos: "tuple[str, ...]"
+
+
+def version_permisos() -> str:
+    return ":".join(map(str, obtener_generaciones(*MODELOS_PERMISOS)))
+
+
+def obtener_permisos_usuario(usuario: Usuario) -> PermisosUsuario:
+    """Permisos efectivos y nombres de los grupos del usuario. Se guardan en la caché compartida hasta que cambien los grupos o los permisos de cualquier usuario, y en el usuario durante la petición"""
+
+    compilados = getattr(usuario, "_permisos_compilados", None)
+
+    if compilados is not None:
+        return compilados
+
+    clave = "permisos_usuario:{}:{}:{}".format(
+        usuario.pk, int(usuario.is_superuser), version_permisos()
+    )
+    compilados = cache.get(clave)
+
+    if compilados is None:
+        compilados = PermisosUsuario(
+            frozenset(ModelBackend().get_all_permissions(usuario)),
+            tuple(usuario.grupos.order_by("pk").values_list("name", flat=True)),
+        )
+        cache.set(clave, compilados, TIEMPO_CACHE_PERMISOS)
+
+    usuario._permisos_compilados = compilados  # type: ignore - se guarda en el usuario de la petición
+    # ModelBackend (que sigue en AUTHENTICATION_BACKENDS para las sesiones iniciadas con él) usa los mismos permisos en vez de consultarlos
+    usuario._perm_cache = compilados.permisos  # type: ignore - se guarda en el usuario de la petición
+
+    return compilados
+
+
+def pertenece_grupo(usuario, nombre: str) -> bool:
+    if not usuario.is_active or usuario.is_anonymous:
+        return False
+
+    return nombre in obtener_permisos_usuario(usuario).grupos
+
+
+class BackendPermisos(ModelBackend):
+    """Igual que el de Django, pero los permisos de cada usuario se obtienen de la caché, por lo que las peticiones no consultan los permisos mientras no cambien"""
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+
+        return obtener_permisos_usuario(user_obj).permisos
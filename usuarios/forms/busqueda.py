@@ -1,5 +1,7 @@
 from django import forms
+from django.db.models import Q
 from app.campos import CampoBooleanoONulo
+from app.filtros import FiltroBooleano, FiltroEn
 from app.forms import (
     BusquedaFormMixin,
     OrdenFormMixin,
@@ -15,6 +17,11 @@ class UsuarioBusquedaForm(OrdenFormMixin, BusquedaFormMixin):
         GRUPOS = "grupos"
 
     campos_prefijo_cookie = "usuarios"
+    filtros = (
+        FiltroEn(Campos.GRUPOS, "grupos"),
+        FiltroBooleano(Campos.TIENE_EMAIL, ~Q(email="")),
+        FiltroBooleano(Campos.ACTIVO, Q(is_active=True)),
+    )
     columnas_busqueda = (
         {
             "columna_db": nc(Usuario.username),
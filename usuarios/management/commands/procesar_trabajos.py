@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from app.trabajos import TIEMPO_INTERRUMPIDO, ejecutar_pendientes
+
+
+class Command(BaseCommand):
+    help = "Ejecuta las acciones en segundo plano de las listas que están pendientes o que se interrumpieron (ej: al reiniciar el servidor). Los procesos del servidor las ejecutan solos, este comando es para programarlo (ej: con cron) o dejarlo corriendo con --continuo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Sigue buscando trabajos hasta que se detenga el comando",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            cantidad = ejecutar_pendientes()
+
+            if cantidad:
+                self.stdout.write(
+                    self.style.SUCCESS(f"✓ {cantidad} trabajos procesados")
+                )
+
+            if not options["continuo"]:
+                break
+
+            time.sleep(TIEMPO_INTERRUMPIDO.total_seconds() / 5)
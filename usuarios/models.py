@@ -1,3 +1,4 @@
+import uuid
 from enum import Enum
 from django.contrib.auth.models import AbstractUser
 from PIL import Image
@@ -120,3 +121,45 @@ class Usuario(AbstractUser):
             self.miniatura_foto = archivo_miniatura
 
         return new_image
+
+
+class EstadosTrabajo(models.TextChoices):
+    PENDIENTE = "pendiente", "Pendiente"
+    EN_CURSO = "en_curso", "En curso"
+    COMPLETADO = "completado", "Completado"
+    ERROR = "error", "Error"
+
+
+class Trabajo(models.Model):
+    """Acción sobre muchos registros de una lista que se procesa por lotes fuera de la petición (ver app.trabajos). Se guarda en la base de datos para que un reinicio del servidor no la pierda: se continúa desde el último lote procesado"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    # ruta de la clase de la vista que procesa cada lote, y los argumentos de su URL
+    vista = models.CharField(max_length=255)
+    argumentos = models.JSONField(default=dict)
+    # acción que se realiza (ej: "delete"), para procesar los lotes e interpretar el resultado
+    tipo = models.CharField(max_length=16)
+    descripcion = models.CharField(max_length=255)
+    elementos = models.JSONField(default=list)
+    # datos enviados con la acción (ej: el cuerpo del PUT)
+    datos = models.TextField(blank=True, default="")
+    tamaño_lote = models.PositiveIntegerField()
+    estado = models.CharField(
+        max_length=16, choices=EstadosTrabajo.choices, default=EstadosTrabajo.PENDIENTE
+    )
+    procesados = models.PositiveIntegerField(default=0)
+    # resultado acumulado de los lotes, que interpreta la vista
+    resultado = models.JSONField(default=dict)
+    error = models.CharField(max_length=255, blank=True, default="")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # se actualiza con cada lote, para detectar los trabajos interrumpidos
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    @property
+    def total(self) -> int:
+        return len(self.elementos)
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (EstadosTrabajo.COMPLETADO, EstadosTrabajo.ERROR)
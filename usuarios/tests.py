@@ -1,3 +1,167 @@
-from django.test import TestCase
+import datetime
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from app.trabajos import (
+    TIEMPO_INTERRUMPIDO,
+    ErrorTrabajo,
+    ejecutar_pendientes,
+    ejecutar_trabajo,
+    obtener_trabajo,
+)
+from usuarios.backends import obtener_permisos_usuario, pertenece_grupo
+from usuarios.models import EstadosTrabajo, Grupo, Trabajo, Usuario
 
-# Create your tests here.
+
+class PermisosUsuarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.grupo = Grupo.objects.create(name="Profesor")
+        cls.permiso = Permission.objects.get(codename="view_usuario")
+        cls.usuario = Usuario.objects.create_user("profesor", password="clave")
+        cls.usuario.grupos.add(cls.grupo)
+
+    def setUp(self):
+        cache.clear()
+
+    def obtener_usuario(self) -> Usuario:
+        """Una instancia nueva, como la de cada petición"""
+
+        return Usuario.objects.get(pk=self.usuario.pk)
+
+    def test_los_permisos_se_obtienen_de_la_cache(self):
+        obtener_permisos_usuario(self.obtener_usuario())
+        usuario = self.obtener_usuario()
+
+        with self.assertNumQueries(0):
+            compilados = obtener_permisos_usuario(usuario)
+            usuario.has_perm("usuarios.view_usuario")
+
+        self.assertEqual(compilados.grupos, ("Profesor",))
+
+    def test_los_cambios_en_los_grupos_invalidan_la_cache(self):
+        self.assertFalse(self.obtener_usuario().has_perm("usuarios.view_usuario"))
+
+        self.grupo.permissions.add(self.permiso)
+        self.assertTrue(self.obtener_usuario().has_perm("usuarios.view_usuario"))
+
+        self.usuario.grupos.remove(self.grupo)
+        usuario = self.obtener_usuario()
+        self.assertFalse(usuario.has_perm("usuarios.view_usuario"))
+        self.assertFalse(pertenece_grupo(usuario, "Profesor"))
+
+    def test_los_usuarios_inactivos_no_tienen_permisos(self):
+        self.grupo.permissions.add(self.permiso)
+        usuario = self.obtener_usuario()
+        usuario.is_active = False
+
+        self.assertFalse(usuario.has_perm("usuarios.view_usuario"))
+        self.assertFalse(pertenece_grupo(usuario, "Profesor"))
+
+
+class VistaSumaLotes:
+    """Vista de prueba para los trabajos: suma los elementos de cada lote y falla con los negativos"""
+
+    lotes: "list[list[str]]" = []
+
+    def procesar_lote_trabajo(self, trabajo: Trabajo, lote: "list[str]"):
+        if any(int(elemento) < 0 for elemento in lote):
+            raise ErrorTrabajo("Elemento negativo")
+
+        VistaSumaLotes.lotes.append(lote)
+        trabajo.resultado["suma"] = trabajo.resultado.get("suma", 0) + sum(
+            map(int, lote)
+        )
+
+
+# los trabajos cierran las conexiones al terminar, lo que no admiten las transacciones de TestCase
+class TrabajosTests(TransactionTestCase):
+    def setUp(self):
+        VistaSumaLotes.lotes = []
+        self.usuario = Usuario.objects.create_user("administrador")
+
+    def crear_trabajo(self, elementos: "list[str]", **campos) -> Trabajo:
+        return Trabajo.objects.create(
+            usuario=self.usuario,
+            vista=f"{__name__}.VistaSumaLotes",
+            tipo="put",
+            descripcion="Sumando",
+            elementos=elementos,
+            tamaño_lote=2,
+            **campos,
+        )
+
+    def interrumpir(self, trabajo: Trabajo):
+        """Simula que el proceso que lo ejecutaba se detuvo hace más de TIEMPO_INTERRUMPIDO"""
+
+        Trabajo.objects.filter(pk=trabajo.pk).update(
+            estado=EstadosTrabajo.EN_CURSO,
+            fecha_actualizacion=timezone.now()
+            - TIEMPO_INTERRUMPIDO
+            - datetime.timedelta(seconds=1),
+        )
+
+    def test_procesa_todos_los_lotes(self):
+        trabajo = self.crear_trabajo(["1", "2", "3", "4", "5"])
+
+        ejecutar_trabajo(trabajo.pk)
+        trabajo.refresh_from_db()
+
+        self.assertEqual(trabajo.estado, EstadosTrabajo.COMPLETADO)
+        self.assertEqual((trabajo.procesados, trabajo.resultado), (5, {"suma": 15}))
+        self.assertEqual(VistaSumaLotes.lotes, [["1", "2"], ["3", "4"], ["5"]])
+
+    def test_continua_los_trabajos_interrumpidos_desde_el_ultimo_lote(self):
+        trabajo = self.crear_trabajo(
+            ["1", "2", "3", "4"], procesados=2, resultado={"suma": 3}
+        )
+        self.interrumpir(trabajo)
+
+        self.assertEqual(ejecutar_pendientes(), 1)
+        trabajo.refresh_from_db()
+
+        self.assertEqual(VistaSumaLotes.lotes, [["3", "4"]])
+        self.assertEqual(trabajo.resultado, {"suma": 10})
+        self.assertEqual(ejecutar_pendientes(), 0)
+
+    def test_no_ejecuta_los_trabajos_en_curso(self):
+        trabajo = self.crear_trabajo(["1"], estado=EstadosTrabajo.EN_CURSO)
+
+        ejecutar_trabajo(trabajo.pk)
+
+        self.assertEqual(VistaSumaLotes.lotes, [])
+        self.assertEqual(ejecutar_pendientes(), 0)
+
+    def test_solo_se_ejecuta_un_trabajo_a_la_vez(self):
+        en_curso = self.crear_trabajo(["1"], estado=EstadosTrabajo.EN_CURSO)
+        pendiente = self.crear_trabajo(["2"])
+
+        ejecutar_trabajo(pendiente.pk)
+        pendiente.refresh_from_db()
+        self.assertEqual(pendiente.estado, EstadosTrabajo.PENDIENTE)
+
+        # al terminar el que estaba en curso (aquí, al interrumpirse) se ejecutan los que esperaban
+        self.interrumpir(en_curso)
+        ejecutar_trabajo(en_curso.pk)
+
+        self.assertEqual(VistaSumaLotes.lotes, [["1"], ["2"]])
+        self.assertFalse(Trabajo.objects.exclude(estado=EstadosTrabajo.COMPLETADO))
+
+    def test_los_errores_detienen_el_trabajo_sin_revertir_los_lotes_anteriores(self):
+        trabajo = self.crear_trabajo(["1", "2", "-3", "4"])
+
+        ejecutar_trabajo(trabajo.pk)
+        trabajo.refresh_from_db()
+
+        self.assertEqual(trabajo.estado, EstadosTrabajo.ERROR)
+        self.assertEqual(trabajo.error, "Elemento negativo")
+        self.assertEqual((trabajo.procesados, trabajo.resultado), (2, {"suma": 3}))
+
+    def test_solo_el_usuario_que_lo_inicio_obtiene_el_trabajo(self):
+        trabajo = self.crear_trabajo(["1"])
+        otro = Usuario.objects.create_user("otro")
+
+        self.assertEqual(obtener_trabajo(str(trabajo.pk), self.usuario), trabajo)
+        self.assertIsNone(obtener_trabajo(str(trabajo.pk), otro))
+        self.assertIsNone(obtener_trabajo("no-es-un-uuid", self.usuario))
@@ -3,14 +3,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import PasswordChangeView
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q, Count
+from django.db.models import Count
 from django.db.models.functions.datetime import TruncMinute
 from django.forms import ModelMultipleChoiceField
 from django.contrib.admin.models import LogEntry
 from django.contrib.sessions.models import Session
 from django.views.generic import UpdateView
 from django_group_model.models import Permission
-from app.util import nc, obtener_filtro_bool_o_nulo
+from app.util import nc
 from app.vistas.forms import VistaActualizarObjeto, VistaCrearObjeto
 from app.vistas.listas import VistaListaObjetos
 from usuarios.forms.auth import CambiarContraseñaForm
@@ -84,6 +84,12 @@ class ListaUsuarios(VistaListaObjetos):
     plantilla_lista = "usuarios/lista.html"
     form_filtros = UsuarioBusquedaForm
     paginate_by = 4
+    # además de las columnas, los campos de la foto
+    campos_requeridos = (
+        nc(Usuario.foto_perfil),  # type: ignore
+        nc(Usuario.miniatura_foto),  # type: ignore
+        nc(Usuario.date_joined),
+    )
     columnas_totales = (
         {"titulo": "Nombre", "clave": "username"},
         {"titulo": "Correo", "clave": "email"},
@@ -97,47 +103,10 @@ class ListaUsuarios(VistaListaObjetos):
         q = (
             Usuario.objects.prefetch_related("grupos")
             .annotate(fecha_añadido=TruncMinute("date_joined"))
-            .only(
-                "id",
-                nc(Usuario.foto_perfil),  # type: ignore
-                nc(Usuario.miniatura_foto),  # type: ignore
-                nc(Usuario.date_joined),
-                *(
-                    col["clave"]
-                    for col in self.columnas_totales
-                    if not col.get("anotada", False)
-                ),
-            )
             .filter(is_superuser=False)
         )
-        return super().get_queryset(q)
 
-    def aplicar_filtros(self, queryset, datos_form):
-        queryset = super().aplicar_filtros(queryset, datos_form)
-
-        if grupos := datos_form.get(UsuarioBusquedaForm.Campos.GRUPOS):
-            queryset = queryset.filter(grupos__in=grupos)
-
-        if (
-            tiene_email := obtener_filtro_bool_o_nulo(
-                UsuarioBusquedaForm.Campos.TIENE_EMAIL, datos_form
-            )
-        ) is not None:
-            valor_filtro = Q(email="")
-
-            if tiene_email:
-                queryset = queryset.exclude(valor_filtro)
-            else:
-                queryset = queryset.filter(valor_filtro)
-
-        if (
-            activo := obtener_filtro_bool_o_nulo(
-                UsuarioBusquedaForm.Campos.ACTIVO, datos_form
-            )
-        ) is not None:
-            queryset = queryset.filter(is_active=True if activo else False)
-
-        return queryset
+        return super().get_queryset(q)
 
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)